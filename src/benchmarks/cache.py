@@ -0,0 +1,34 @@
+from sys import argv
+from tempfile import TemporaryDirectory
+
+from lexer.streams import TextStream
+from lexer.lexers import Lexer
+
+from parser.parser import Parser
+from parser.cache import ProgramCache
+
+from benchmarks.utils import generate_source, measure, report
+
+
+def parse(text: str):
+    return Parser(Lexer(TextStream(text))).parse()
+
+
+def main(copies: int) -> None:
+    text = generate_source(copies)
+    source = text.encode()
+    print(f"Source: {len(text):,} chars")
+    with TemporaryDirectory() as directory:
+        cache = ProgramCache(directory)
+        elapsed = measure(lambda: parse(text))
+        report("Parser(Lexer(TextStream))", elapsed, len(text), "chars")
+        elapsed = measure(lambda: cache.store(source, parse(text)))
+        report("Parse and store", elapsed, len(text), "chars")
+        entry = cache.get_path(cache.get_digest(source))
+        print(f"{'Cache entry size':<44} {entry.stat().st_size:>10,} bytes")
+        elapsed = measure(lambda: cache.load(source))
+        report("ProgramCache.load", elapsed, len(text), "chars")
+
+
+if __name__ == "__main__":
+    main(int(argv[1]) if len(argv) > 1 else 1000)
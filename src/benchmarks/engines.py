@@ -0,0 +1,87 @@
+import io
+from contextlib import redirect_stdout
+from sys import argv
+
+from lexer.lexers import RegexLexer
+
+from parser.parser import Parser
+
+from interpreter.interpreter import Interpreter
+from interpreter.closures import ClosureInterpreter
+from interpreter.vm import BytecodeInterpreter
+from interpreter.transpiler import PythonInterpreter
+from interpreter.resolver import resolve
+
+from benchmarks.utils import measure, report
+
+
+FIB_SOURCE = """
+fn fib(n) {{
+    if (n < 2) return n;
+    return fib(n - 1) + fib(n - 2);
+}}
+print(fib({n}));
+"""
+LOOP_SOURCE = """
+fn main() {{
+    var i = 0;
+    var total = 0;
+    while (i < {iterations}) {{
+        i = i + 1;
+        if (i / 2 > 10 and not (i == 15)) total = total + i * 2 - i;
+    }}
+    print(total);
+}}
+main();
+"""
+ENGINES = (
+    ("tree", Interpreter),
+    ("closures", ClosureInterpreter),
+    ("bytecode", BytecodeInterpreter),
+    ("python", PythonInterpreter),
+)
+
+
+def fib_calls(n: int) -> int:
+    # Calls of `fib` made by `fib(n)`
+    a, b = 1, 1
+    for _ in range(n):
+        a, b = b, a + b + 1
+    return a
+
+
+def run(source: str, engine: type, resolved: bool) -> None:
+    program = Parser(RegexLexer(source)).parse()
+    interpreter = engine()
+    if resolved:
+        resolve(program, interpreter.environment)
+    with redirect_stdout(io.StringIO()):
+        program.accept(interpreter)
+
+
+def main(n: int) -> None:
+    iterations = fib_calls(n) * 4
+    programs = (
+        (f"fib({n})", FIB_SOURCE.format(n=n), fib_calls(n), "calls"),
+        (
+            f"Loop of {iterations:,}",
+            LOOP_SOURCE.format(iterations=iterations),
+            iterations,
+            "iterations"
+        ),
+    )
+    for name, source, amount, unit in programs:
+        for resolved in (False, True):
+            mode = "resolved" if resolved else "by name"
+            for engine_name, engine in ENGINES:
+                elapsed = measure(lambda: run(source, engine, resolved))
+                report(
+                    f"{name}, {engine_name}, {mode}",
+                    elapsed,
+                    amount,
+                    unit
+                )
+
+
+if __name__ == "__main__":
+    main(int(argv[1]) if len(argv) > 1 else 20)
@@ -0,0 +1,81 @@
+import tracemalloc
+from sys import argv
+from time import perf_counter
+
+from interpreter.models import Environment
+
+
+VARIABLES = 8
+DEPTH = 4
+LOOKUPS = 200_000
+
+
+def resident_size(environments: int) -> int:
+    # Environments of a scope share the names of its variables, as the
+    # calls of a resolved function do
+    names = {f"variable{i}": i for i in range(VARIABLES)}
+    tracemalloc.start()
+    frames = []
+    for _ in range(environments):
+        environment = Environment(None, names)
+        for name, slot in names.items():
+            environment.define(name, slot, slot % 2 == 0, slot)
+        frames.append(environment)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size
+
+
+def create_chain() -> Environment:
+    # The variable is defined at the top of `DEPTH` nested environments
+    environment = Environment()
+    environment.define("target", 1)
+    for _ in range(DEPTH):
+        environment = Environment(environment)
+        for i in range(VARIABLES):
+            environment.define(f"local{i}", i)
+    return environment
+
+
+def measure_lookups(function) -> float:
+    # Nanoseconds per call, the best of a few runs
+    best = None
+    for _ in range(3):
+        start = perf_counter()
+        for _ in range(LOOKUPS):
+            function()
+        elapsed = perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / LOOKUPS * 1e9
+
+
+def main(environments: int) -> None:
+    size = resident_size(environments)
+    variables = environments * VARIABLES
+    print(
+        f"{environments:,} environments with {VARIABLES} variables, "
+        f"half of them constant"
+    )
+    print(f"{'Resident size':<44} {size:>13,} bytes")
+    print(
+        f"{'Resident size per variable':<44} "
+        f"{size / variables:>13,.1f} bytes"
+    )
+    local = Environment()
+    local.define("target", 1)
+    chain = create_chain()
+    for name, function in [
+        ("get, local", lambda: local.get("target")),
+        (f"get, {DEPTH} scopes up", lambda: chain.get("target")),
+        ("get_at, local", lambda: local.get_at(0, 0, "target")),
+        (f"get_at, {DEPTH} scopes up",
+         lambda: chain.get_at(DEPTH, 0, "target")),
+        ("assign, local", lambda: local.assign("target", 2)),
+        ("assign_at, local", lambda: local.assign_at(0, 0, "target", 2)),
+        ("define", lambda: Environment().define("target", 1, True)),
+    ]:
+        print(f"{name:<44} {measure_lookups(function):>13,.1f} ns")
+
+
+if __name__ == "__main__":
+    main(int(argv[1]) if len(argv) > 1 else 10_000)
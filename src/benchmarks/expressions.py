@@ -0,0 +1,29 @@
+from sys import argv
+
+from lexer.lexers import RegexLexer
+
+from parser.parser import Parser
+
+from benchmarks.utils import measure, report
+
+
+EXPRESSION_TEMPLATE = (
+    "var value{i} = a * {i} + b / 4 - (c + 1) * -d >= 10 "
+    "and not e or f == g + h * (i - j) / k;\n"
+    "print(x{i}, y + 1, z * 2 - 1, 5, \"str\", nil, true);\n"
+)
+
+
+def generate_source(copies: int) -> str:
+    return "".join(EXPRESSION_TEMPLATE.format(i=i) for i in range(copies))
+
+
+def main(copies: int) -> None:
+    source = generate_source(copies)
+    print(f"Source: {len(source):,} chars")
+    elapsed = measure(lambda: Parser(RegexLexer(source)).parse())
+    report("Parser(RegexLexer)", elapsed, len(source), "chars")
+
+
+if __name__ == "__main__":
+    main(int(argv[1]) if len(argv) > 1 else 1000)
@@ -0,0 +1,46 @@
+from sys import argv
+from time import perf_counter
+
+from lexer.lexers import RegexLexer
+
+from parser.parser import Parser
+from parser.incremental import IncrementalParser
+
+from benchmarks.utils import generate_source, measure
+
+
+EDITS = 100
+
+
+def edit_and_parse(parser: IncrementalParser, index: int) -> float:
+    # Types and removes a digit in the middle of the source
+    start = perf_counter()
+    for _ in range(EDITS // 2):
+        parser.edit(index, index, "7")
+        parser.parse()
+        parser.edit(index, index + 1, "")
+        parser.parse()
+    return (perf_counter() - start) / EDITS
+
+
+def main(copies: int) -> None:
+    # An edit costs the same in a source of any size, so the time of an
+    # edit is also shown relative to the one in the smallest source
+    smallest = None
+    for size in (copies // 100, copies // 10, copies):
+        text = generate_source(size)
+        full = measure(lambda: Parser(RegexLexer(text)).parse())
+        parser = IncrementalParser(text)
+        parser.parse()
+        index = text.index(f"helper{size // 2}(") + len("helper")
+        incremental = min(edit_and_parse(parser, index) for _ in range(3))
+        smallest = smallest or incremental
+        print(
+            f"{len(text):>10,} chars   full parse {full * 1000:>10.3f}ms"
+            f"   incremental edit {incremental * 1000:>8.3f}ms"
+            f" ({incremental / smallest:.2f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main(int(argv[1]) if len(argv) > 1 else 1000)
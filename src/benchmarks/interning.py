@@ -0,0 +1,69 @@
+import tracemalloc
+from sys import argv
+
+from lexer.streams import TextStream
+from lexer.lexers import Lexer
+from lexer.symbols import SymbolTable
+
+from parser.parser import Parser
+
+from benchmarks.utils import measure, report
+
+
+SOURCE_TEMPLATE = """var counter{i} = 0;
+var message{i} = "counter value";
+while (counter{i} < 10) {{
+    counter{i} = counter{i} + total;
+    message{i} = message{i} + "counter value";
+    print(message{i}, counter{i}, total);
+}}
+"""
+
+
+class NoInterning(SymbolTable):
+    def intern(self, name: str) -> str:
+        return name
+
+    def intern_string(self, value: str) -> str:
+        return value
+
+
+def generate_source(copies: int) -> str:
+    return "var total = 1;\n" + "".join(
+        SOURCE_TEMPLATE.format(i=i) for i in range(copies)
+    )
+
+
+def parse(text: str, symbols: SymbolTable):
+    return Parser(Lexer(TextStream(text), symbols)).parse()
+
+
+def resident_size(text: str, symbols: SymbolTable) -> int:
+    tracemalloc.start()
+    program = parse(text, symbols)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del program
+    return size
+
+
+def main(copies: int) -> None:
+    source = generate_source(copies)
+    print(f"Source: {len(source):,} chars")
+    plain = resident_size(source, NoInterning())
+    symbols = SymbolTable()
+    interned = resident_size(source, symbols)
+    print(f"{'Program without interning':<44} {plain:>10,} bytes")
+    print(f"{'Program with interning':<44} {interned:>10,} bytes")
+    print(f"{'Saved':<44} {plain - interned:>10,} bytes")
+    print(f"{'Distinct symbols':<44} {len(symbols):>10,}")
+    for name, table in (
+        ("without interning", NoInterning),
+        ("with interning", SymbolTable)
+    ):
+        elapsed = measure(lambda: parse(source, table()))
+        report(f"Parser {name}", elapsed, len(source), "chars")
+
+
+if __name__ == "__main__":
+    main(int(argv[1]) if len(argv) > 1 else 1000)
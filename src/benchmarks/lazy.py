@@ -0,0 +1,63 @@
+import io
+from contextlib import redirect_stdout
+from sys import argv
+
+from lexer.lexers import RegexLexer
+
+from parser.parser import Parser
+
+from interpreter.interpreter import Interpreter
+
+from benchmarks.utils import measure, report
+
+
+FUNCTION_TEMPLATE = """// helper number {i}
+fn helper{i}(const a, b) {{
+    var result = a * 2 + b / 4 - "3.5";
+    if (result >= 10 and not (b == nil)) {{
+        result = result + "}} braces in strings are skipped {{";
+    }} else {{
+        result = -result;
+    }}
+    while (result < 0) result = result + 1.25;
+    match (result, b) {{
+        (Num and >0 as x, _): return x;
+        (_, Str): return "str";
+    }}
+    return result;
+}}
+"""
+
+
+def generate_source(functions: int, calls: int) -> str:
+    source = "".join(FUNCTION_TEMPLATE.format(i=i) for i in range(functions))
+    # Only some of the helpers are called
+    called = range(0, functions, max(functions // calls, 1))[:calls]
+    return source + "".join(f"print(helper{i}({i}, 1));\n" for i in called)
+
+
+def parse_and_run(source: str, lazy_functions: bool) -> None:
+    program = Parser(RegexLexer(source), lazy_functions).parse()
+    with redirect_stdout(io.StringIO()):
+        program.accept(Interpreter())
+
+
+def main(functions: int) -> None:
+    calls = max(functions // 100, 1)
+    source = generate_source(functions, calls)
+    print(
+        f"Source: {len(source):,} chars, {functions:,} functions, "
+        f"{calls:,} called"
+    )
+    for lazy_functions in (False, True):
+        name = "lazy" if lazy_functions else "eager"
+        elapsed = measure(
+            lambda: Parser(RegexLexer(source), lazy_functions).parse()
+        )
+        report(f"Parse, {name} bodies", elapsed, len(source), "chars")
+        elapsed = measure(lambda: parse_and_run(source, lazy_functions))
+        report(f"Parse and run, {name} bodies", elapsed, len(source), "chars")
+
+
+if __name__ == "__main__":
+    main(int(argv[1]) if len(argv) > 1 else 1000)
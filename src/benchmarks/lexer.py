@@ -0,0 +1,61 @@
+from sys import argv
+from tempfile import NamedTemporaryFile
+
+from lexer.streams import FileStream, BufferedFileStream, MappedFileStream
+from lexer.lexers import BaseLexer, Lexer, RegexLexer, PushLexer
+from lexer.tokens import TokenType
+
+from benchmarks.utils import generate_source, measure, report
+
+
+def count_tokens(lexer: BaseLexer) -> int:
+    count = 1
+    while not lexer.next_token().type == TokenType.EOF:
+        count += 1
+    return count
+
+
+def push_chunks(data: bytes, chunk_size: int) -> int:
+    lexer = PushLexer()
+    count = 0
+    for index in range(0, len(data), chunk_size):
+        count += len(lexer.feed(data[index:index + chunk_size]))
+    return count + len(lexer.close())
+
+
+def main(copies: int) -> None:
+    source = generate_source(copies)
+    with NamedTemporaryFile("w", suffix=".txt") as file:
+        file.write(source)
+        file.flush()
+
+        def lex_file(stream_class, mode="r"):
+            with open(file.name, mode) as f:
+                return count_tokens(Lexer(stream_class(f)))
+
+        def lex_mapped():
+            with open(file.name, "rb") as f:
+                stream = MappedFileStream(f)
+                count = count_tokens(Lexer(stream))
+                stream.close()
+                return count
+
+        tokens = lex_mapped()
+        print(f"Source: {len(source):,} chars, {tokens:,} tokens")
+        cases = (
+            ("Lexer(FileStream)", lambda: lex_file(FileStream)),
+            ("Lexer(BufferedFileStream)",
+             lambda: lex_file(BufferedFileStream)),
+            ("Lexer(MappedFileStream)", lex_mapped),
+            ("RegexLexer", lambda: count_tokens(RegexLexer(source))),
+            ("PushLexer, 4KB chunks",
+             lambda: push_chunks(source.encode(), 1 << 12)),
+            ("PushLexer, 64KB chunks",
+             lambda: push_chunks(source.encode(), 1 << 16)),
+        )
+        for name, run in cases:
+            report(name, measure(run), tokens, "tokens")
+
+
+if __name__ == "__main__":
+    main(int(argv[1]) if len(argv) > 1 else 1000)
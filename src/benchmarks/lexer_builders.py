@@ -0,0 +1,55 @@
+from sys import argv
+
+from lexer.streams import TextStream
+from lexer.lexers import Lexer
+from lexer.tokens import TokenType
+
+from benchmarks.utils import generate_source, measure, report
+
+
+# Sources made of a single kind of lexeme separated by whitespaces,
+# so that every builder call produces exactly one token
+BUILDER_SOURCES = (
+    ("operators", "try_build_operator_or_comment",
+     "( ) { } , - + : ; * = == != <= >= "),
+    ("comments", "try_build_operator_or_comment", "// comment line\n"),
+    ("strings", "try_build_string", '"string \\t value" '),
+    ("numbers", "try_build_number", "12345 3.1415 "),
+    ("identifiers", "try_build_ident_or_keyword",
+     "identifier while counter fn "),
+)
+
+
+def call_builder(builder_name: str, text: str) -> int:
+    lexer = Lexer(TextStream(text))
+    builder = getattr(lexer, builder_name)
+    count = 0
+    while lexer.stream.current_char:
+        builder()
+        lexer.skip_whitespaces()
+        count += 1
+    return count
+
+
+def call_next_token(text: str) -> int:
+    lexer = Lexer(TextStream(text))
+    count = 1
+    while not lexer.next_token().type == TokenType.EOF:
+        count += 1
+    return count
+
+
+def main(copies: int) -> None:
+    for name, builder_name, lexemes in BUILDER_SOURCES:
+        text = lexemes * copies
+        calls = call_builder(builder_name, text)
+        elapsed = measure(lambda: call_builder(builder_name, text))
+        report(f"{builder_name} ({name})", elapsed, calls, "calls")
+    text = generate_source(copies // 10)
+    tokens = call_next_token(text)
+    elapsed = measure(lambda: call_next_token(text))
+    report("next_token", elapsed, tokens, "tokens")
+
+
+if __name__ == "__main__":
+    main(int(argv[1]) if len(argv) > 1 else 5000)
@@ -0,0 +1,41 @@
+from sys import argv, getrecursionlimit
+
+from lexer.lexers import RegexLexer
+
+from parser.parser import Parser
+
+from benchmarks.utils import measure, report
+
+
+COMMENT_LINE = "// generated header line\n"
+
+
+def generate_sources(depth: int, comment_lines: int) -> dict[str, str]:
+    return {
+        "Nested groupings": (
+            "print(" + "(" * depth + "1" + ")" * depth + ");"
+        ),
+        "Nested calls": "f(" * depth + ")" * depth + ";",
+        "Call chain": "f" + "()" * depth + ";",
+        "Nested blocks": "while (a) {" * depth + "}" * depth,
+        "Nested ifs": "if (a) " * depth + "b;",
+        "Comment lines": COMMENT_LINE * comment_lines + "print(1);",
+    }
+
+
+def main(depth: int, comment_lines: int) -> None:
+    print(f"Recursion limit: {getrecursionlimit():,}")
+    print(f"Depth: {depth:,}, comment lines: {comment_lines:,}")
+    for name, source in generate_sources(depth, comment_lines).items():
+        elapsed = measure(
+            lambda: Parser(RegexLexer(source)).parse(),
+            repeat=1
+        )
+        report(name, elapsed, len(source), "chars")
+
+
+if __name__ == "__main__":
+    main(
+        int(argv[1]) if len(argv) > 1 else 100_000,
+        int(argv[2]) if len(argv) > 2 else 1_000_000
+    )
@@ -0,0 +1,64 @@
+import sys
+import tracemalloc
+from collections import Counter
+from dataclasses import fields
+from sys import argv
+
+from lexer.lexers import RegexLexer
+
+from parser.parser import Parser
+from parser.models import Program, Stmt
+
+from benchmarks.utils import generate_source
+
+
+def collect_nodes(program: Program) -> list[Stmt]:
+    nodes = []
+    stack = list(program.statements)
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        for node_field in fields(node):
+            value = getattr(node, node_field.name)
+            if isinstance(value, Stmt):
+                stack.append(value)
+            elif isinstance(value, list):
+                stack.extend(value)
+    return nodes
+
+
+def get_node_size(node: Stmt) -> int:
+    # Attributes of nodes without slots are held in a separate dict
+    size = sys.getsizeof(node)
+    if hasattr(node, "__dict__"):
+        size += sys.getsizeof(node.__dict__)
+    return size
+
+
+def main(statements: int) -> None:
+    # Every copy of the source holds two top-level statements
+    source = generate_source(statements // 2)
+    tracemalloc.start()
+    program = Parser(RegexLexer(source)).parse()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    nodes = collect_nodes(program)
+    objects_size = sum(map(get_node_size, nodes))
+    print(
+        f"Source: {len(source):,} chars, "
+        f"{len(program.statements):,} statements, {len(nodes):,} nodes"
+    )
+    print(f"{'Program resident size':<44} {size:>13,} bytes")
+    print(f"{'Resident size per node':<44} {size / len(nodes):>13,.1f} bytes")
+    print(
+        f"{'Node object size per node':<44} "
+        f"{objects_size / len(nodes):>13,.1f} bytes"
+    )
+    counts = Counter(type(node).__name__ for node in nodes)
+    for name, count in counts.most_common():
+        node = next(node for node in nodes if type(node).__name__ == name)
+        print(f"  {name:<42} {count:>13,} x {get_node_size(node):>4} bytes")
+
+
+if __name__ == "__main__":
+    main(int(argv[1]) if len(argv) > 1 else 100_000)
@@ -0,0 +1,30 @@
+import os
+from sys import argv
+
+from lexer.lexers import RegexLexer
+
+from parser.parser import Parser
+from parser.parallel import parse_parallel
+
+from benchmarks.utils import generate_source, measure, report
+
+
+WORKERS = (1, 2, 4, 8)
+
+
+def main(copies: int) -> None:
+    source = generate_source(copies)
+    print(f"Source: {len(source):,} chars, {os.cpu_count()} CPUs")
+    elapsed = measure(lambda: Parser(RegexLexer(source)).parse(), repeat=1)
+    report("Parser(RegexLexer)", elapsed, len(source), "chars")
+    for workers in WORKERS:
+        elapsed = measure(
+            lambda: parse_parallel(source, workers=workers),
+            repeat=1
+        )
+        report(f"parse_parallel, {workers} workers", elapsed, len(source),
+               "chars")
+
+
+if __name__ == "__main__":
+    main(int(argv[1]) if len(argv) > 1 else 5000)
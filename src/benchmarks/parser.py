@@ -0,0 +1,30 @@
+import tracemalloc
+from sys import argv
+
+from lexer.streams import TextStream
+from lexer.lexers import Lexer
+
+from parser.parser import Parser
+
+from benchmarks.utils import generate_source, measure, report
+
+
+def parse(text: str):
+    return Parser(Lexer(TextStream(text))).parse()
+
+
+def main(copies: int) -> None:
+    source = generate_source(copies)
+    tracemalloc.start()
+    program = parse(source)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    statements = len(program.statements)
+    print(f"Source: {len(source):,} chars, {statements:,} statements")
+    print(f"{'Program resident size':<44} {size:>10,} bytes")
+    elapsed = measure(lambda: parse(source))
+    report("Parser(Lexer(TextStream))", elapsed, len(source), "chars")
+
+
+if __name__ == "__main__":
+    main(int(argv[1]) if len(argv) > 1 else 1000)
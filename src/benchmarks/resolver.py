@@ -0,0 +1,64 @@
+import io
+from contextlib import redirect_stdout
+from sys import argv
+
+from lexer.lexers import RegexLexer
+
+from parser.parser import Parser
+
+from interpreter.interpreter import Interpreter
+from interpreter.resolver import resolve
+
+from benchmarks.utils import measure, report
+
+
+DEPTH = 8
+LOOP_TEMPLATE = """
+    while (i < {iterations}) {{
+        i = i + 1;
+        total = total + i * 2 - i;
+    }}
+"""
+
+
+def generate_source(iterations: int, deep: bool) -> str:
+    # The loop runs inside blocks nested `DEPTH` levels deep, with the
+    # variables declared either outside of the blocks or next to the loop
+    declarations = "    var i = 0;\n    var total = 0;\n"
+    body = LOOP_TEMPLATE.format(iterations=iterations)
+    if not deep:
+        body = declarations + body
+    for _ in range(DEPTH):
+        body = f"if (true) {{\n{body}}}\n"
+    if deep:
+        body = declarations + body
+    return f"fn main() {{\n{body}}}\nmain();\n"
+
+
+def run(source: str, resolved: bool) -> None:
+    program = Parser(RegexLexer(source)).parse()
+    interpreter = Interpreter()
+    if resolved:
+        resolve(program, interpreter.environment)
+    with redirect_stdout(io.StringIO()):
+        program.accept(interpreter)
+
+
+def main(iterations: int) -> None:
+    print(f"Loop: {iterations:,} iterations, {DEPTH} blocks deep")
+    for resolved in (False, True):
+        mode = "resolved" if resolved else "by name"
+        for deep in (False, True):
+            scope = "outer scope" if deep else "local scope"
+            source = generate_source(iterations, deep)
+            elapsed = measure(lambda: run(source, resolved))
+            report(
+                f"Variables in {scope}, {mode}",
+                elapsed,
+                iterations,
+                "iterations"
+            )
+
+
+if __name__ == "__main__":
+    main(int(argv[1]) if len(argv) > 1 else 20000)
@@ -0,0 +1,68 @@
+import io
+import os
+import tempfile
+import tracemalloc
+from contextlib import redirect_stdout
+from sys import argv
+
+from lexer.lexers import RegexLexer
+
+from parser.parser import Parser
+from parser.ast_printer import AstPrinter
+from parser.serialization import (
+    write_json_lines,
+    read_json_lines,
+    write_binary,
+    read_binary
+)
+
+from benchmarks.utils import generate_source, measure, report
+
+
+FORMATS = {
+    "JSON lines": ('w', 'r', write_json_lines, read_json_lines),
+    "Binary": ('wb', 'rb', write_binary, read_binary),
+}
+
+
+def write_traced(program, path: str, mode: str, write) -> tuple[int, int]:
+    # Number of nodes and the peak of the memory allocated while writing
+    with open(path, mode) as f:
+        tracemalloc.start()
+        count = write(program, f)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return count, peak
+
+
+def main(copies: int) -> None:
+    source = generate_source(copies)
+    program = Parser(RegexLexer(source)).parse()
+    print(f"Source: {len(source):,} chars")
+    with redirect_stdout(io.StringIO()):
+        elapsed = measure(lambda: program.accept(AstPrinter()), repeat=1)
+    report("AstPrinter", elapsed, len(source), "chars")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "program")
+        for name, (write_mode, read_mode, write, read) in FORMATS.items():
+            count, peak = write_traced(program, path, write_mode, write)
+            size = os.path.getsize(path)
+            print(
+                f"{name}: {count:,} nodes, {size:,} bytes, "
+                f"{peak:,} bytes peak while writing"
+            )
+
+            def write_file():
+                with open(path, write_mode) as f:
+                    write(program, f)
+
+            def read_file():
+                with open(path, read_mode) as f:
+                    read(f)
+
+            report(f"Write {name}", measure(write_file), count, "nodes")
+            report(f"Read {name}", measure(read_file), count, "nodes")
+
+
+if __name__ == "__main__":
+    main(int(argv[1]) if len(argv) > 1 else 30_000)
@@ -0,0 +1,58 @@
+import io
+import tracemalloc
+from contextlib import redirect_stdout
+from sys import argv
+
+from lexer.lexers import RegexLexer
+
+from parser.parser import Parser
+from parser.interning import NodeTable, share_nodes
+
+from interpreter.interpreter import Interpreter
+
+from benchmarks.utils import generate_source, measure, report
+
+
+def parse(source: str):
+    return Parser(RegexLexer(source)).parse()
+
+
+def resident_size(source: str, share: bool) -> int:
+    tracemalloc.start()
+    program = parse(source)
+    positions = share_nodes(program) if share else None
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del program, positions
+    return size
+
+
+def run(program, positions) -> None:
+    with redirect_stdout(io.StringIO()):
+        program.accept(Interpreter(positions))
+
+
+def main(copies: int) -> None:
+    source = generate_source(copies)
+    print(f"Source: {len(source):,} chars")
+    plain = resident_size(source, False)
+    shared = resident_size(source, True)
+    print(f"{'Program':<44} {plain:>13,} bytes")
+    print(f"{'Program with shared nodes and positions':<44} "
+          f"{shared:>13,} bytes")
+    program = parse(source)
+    nodes = NodeTable()
+    elapsed = measure(lambda: share_nodes(parse(source), nodes), repeat=1)
+    report("Parse and share nodes", elapsed, len(source), "chars")
+    positions = share_nodes(program, nodes)
+    print(f"{'Shared occurrences':<44} {len(positions):>13,}")
+    print(f"{'Distinct shared nodes':<44} {len(nodes):>13,}")
+    plain_program = parse(source)
+    elapsed = measure(lambda: run(plain_program, None))
+    report("Run", elapsed, len(source), "chars")
+    elapsed = measure(lambda: run(program, positions))
+    report("Run with shared nodes", elapsed, len(source), "chars")
+
+
+if __name__ == "__main__":
+    main(int(argv[1]) if len(argv) > 1 else 1000)
@@ -0,0 +1,83 @@
+import io
+import os
+import tempfile
+import tracemalloc
+from contextlib import redirect_stdout
+from sys import argv
+from time import perf_counter
+
+from lexer.streams import BufferedFileStream
+from lexer.lexers import Lexer
+
+from parser.parser import Parser
+
+from interpreter.interpreter import Interpreter
+
+
+STATEMENT_TEMPLATE = """// batch step {i}
+total = total + {i} * 2 - (count / 4);
+count = count + 1;
+if (count == {i} + 1 and total > nil) print("step " + count);
+"""
+
+
+class FirstWriteOutput(io.StringIO):
+    # Remembers when the first output was printed
+    def __init__(self):
+        super().__init__()
+        self.first_write = None
+
+    def write(self, text: str) -> int:
+        if self.first_write is None:
+            self.first_write = perf_counter()
+        return super().write(text)
+
+
+def generate_source(statements: int) -> str:
+    return "var total = 0;\nvar count = 0;\n" + "".join(
+        STATEMENT_TEMPLATE.format(i=i) for i in range(statements)
+    )
+
+
+def run_whole(file) -> None:
+    program = Parser(Lexer(BufferedFileStream(file))).parse()
+    program.accept(Interpreter())
+
+
+def run_streaming(file) -> None:
+    parser = Parser(Lexer(BufferedFileStream(file)))
+    Interpreter().execute_statements(parser.parse_statements())
+
+
+def measure_run(path: str, run) -> tuple[float, float, int]:
+    # Time to the first output, total time and peak traced memory
+    output = FirstWriteOutput()
+    tracemalloc.start()
+    start = perf_counter()
+    with open(path, 'r', newline='') as f, redirect_stdout(output):
+        run(f)
+    end = perf_counter()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return output.first_write - start, end - start, peak
+
+
+def main(statements: int) -> None:
+    source = generate_source(statements)
+    with tempfile.NamedTemporaryFile('w', suffix=".txt", delete=False) as f:
+        f.write(source)
+    print(f"Source: {len(source):,} chars, {statements:,} statements")
+    try:
+        for name, run in (("Parse, then run", run_whole),
+                          ("Streaming", run_streaming)):
+            first, total, peak = measure_run(f.name, run)
+            print(
+                f"{name:<20} first output {first:>9.4f}s, "
+                f"total {total:>9.4f}s, peak {peak:>13,} bytes"
+            )
+    finally:
+        os.remove(f.name)
+
+
+if __name__ == "__main__":
+    main(int(argv[1]) if len(argv) > 1 else 10_000)
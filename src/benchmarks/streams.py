@@ -0,0 +1,31 @@
+from sys import argv
+from tempfile import NamedTemporaryFile
+
+from lexer.streams import Stream, FileStream, BufferedFileStream
+
+from benchmarks.utils import generate_source, measure, report
+
+
+def read_all(stream: Stream) -> int:
+    count = 0
+    while stream.advance():
+        count += 1
+    return count
+
+
+def main(copies: int) -> None:
+    source = generate_source(copies)
+    with NamedTemporaryFile("w", suffix=".txt") as file:
+        file.write(source)
+        file.flush()
+        print(f"Source: {len(source):,} chars")
+        for stream_class in (FileStream, BufferedFileStream):
+            def run():
+                with open(file.name, "r") as f:
+                    read_all(stream_class(f))
+            elapsed = measure(run)
+            report(stream_class.__name__, elapsed, len(source), "chars")
+
+
+if __name__ == "__main__":
+    main(int(argv[1]) if len(argv) > 1 else 2000)
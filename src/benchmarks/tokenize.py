@@ -0,0 +1,47 @@
+import tracemalloc
+from sys import argv
+
+from lexer.buffers import tokenize
+from lexer.lexers import RegexLexer
+from lexer.streams import TextStream
+from lexer.tokens import TokenType
+
+from benchmarks.utils import generate_source, measure, report
+
+
+def token_list(text: str) -> list:
+    lexer = RegexLexer(text)
+    tokens = [lexer.next_token()]
+    while not tokens[-1].type == TokenType.EOF:
+        tokens.append(lexer.next_token())
+    return tokens
+
+
+def allocated(function, *args) -> tuple[int, int]:
+    tracemalloc.start()
+    result = function(*args)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size, len(result)
+
+
+def main(copies: int) -> None:
+    source = generate_source(copies)
+    print(f"Source: {len(source):,} chars")
+    for name, function in (
+        ("list[Token]", token_list),
+        ("TokenBuffer", tokenize),
+    ):
+        size, tokens = allocated(function, source)
+        print(f"{name:<44} {size / tokens:>10.1f} bytes/token")
+    tokens = len(tokenize(source))
+    for name, run in (
+        ("list[Token] (RegexLexer)", lambda: token_list(source)),
+        ("tokenize(str)", lambda: tokenize(source)),
+        ("tokenize(TextStream)", lambda: tokenize(TextStream(source))),
+    ):
+        report(name, measure(run), tokens, "tokens")
+
+
+if __name__ == "__main__":
+    main(int(argv[1]) if len(argv) > 1 else 1000)
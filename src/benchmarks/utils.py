@@ -0,0 +1,39 @@
+from math import inf
+from time import perf_counter
+from typing import Callable
+
+
+SOURCE_TEMPLATE = """// helper number {i}
+fn helper{i}(const a, b) {{
+    var result = a * 2 + b / 4 - "3.5";
+    if (result >= 10 and not (b == nil)) {{
+        print("big: " + result + "\\t\\"quoted\\"");
+    }} else {{
+        result = -result;
+    }}
+    while (result < 0) result = result + 1.25;
+    match (result, b) {{
+        (Num and >0 as x, _): return x;
+        (_, Str): return "str";
+    }}
+    return result;
+}}
+var value{i} = helper{i}({i}, {i}.5);
+"""
+
+
+def generate_source(copies: int) -> str:
+    return "".join(SOURCE_TEMPLATE.format(i=i) for i in range(copies))
+
+
+def measure(function: Callable[[], None], repeat: int = 3) -> float:
+    best = inf
+    for _ in range(repeat):
+        start = perf_counter()
+        function()
+        best = min(best, perf_counter() - start)
+    return best
+
+
+def report(name: str, elapsed: float, amount: int, unit: str) -> None:
+    print(f"{name:<44} {elapsed:>9.4f}s {amount / elapsed:>16,.0f} {unit}/s")
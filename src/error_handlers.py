@@ -22,8 +22,12 @@ class BaseErrorHandler(ABC):
 class ErrorHandler(BaseErrorHandler):
 
     def get_error_line(self, filename, line_n):
-        with open(filename, "r") as f:
-            lines = f.readlines()
+        # A script streamed from the standard input can't be read again
+        try:
+            with open(filename, "r") as f:
+                lines = f.readlines()
+        except OSError:
+            return None
         return lines[line_n - 1].strip()
 
     def print_error(self, exception, message=None):
@@ -0,0 +1,556 @@
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass, field
+from enum import IntEnum, auto
+
+from lexer.tokens import TokenType
+
+from parser.models import (
+    Program,
+    Expr,
+    Stmt,
+    BinaryExpr,
+    Visitor,
+    AssignmentExpr,
+    LiteralExpr,
+    UnaryExpr,
+    LogicalExpr,
+    GroupingExpr,
+    IdentifierExpr,
+    CallExpr,
+    BlockStmt,
+    FunctionStmt,
+    VariableStmt,
+    IfStmt,
+    WhileStmt,
+    ReturnStmt,
+    MatchStmt,
+    ComparePatternExpr,
+    TypePatternExpr
+)
+
+
+class Opcode(IntEnum):
+    # Operands of the instructions are listed in `OPERANDS`
+    CONST = 0
+    POP = auto()
+    GET_NAME = auto()
+    GET_SLOT = auto()
+    SET_NAME = auto()
+    SET_SLOT = auto()
+    DEFINE_NAME = auto()
+    DEFINE_SLOT = auto()
+    DEFINE_FUNCTION = auto()
+    ADD = auto()
+    SUBTRACT = auto()
+    MULTIPLY = auto()
+    DIVIDE = auto()
+    EQUAL = auto()
+    NOT_EQUAL = auto()
+    LESS = auto()
+    LESS_EQUAL = auto()
+    GREATER = auto()
+    GREATER_EQUAL = auto()
+    NEGATE = auto()
+    NOT = auto()
+    JUMP = auto()
+    POP_JUMP_IF_FALSE = auto()
+    JUMP_IF_TRUE_OR_POP = auto()
+    JUMP_IF_FALSE_OR_POP = auto()
+    CALL = auto()
+    RETURN = auto()
+    RAISE_RETURN = auto()
+    PUSH_SCOPE = auto()
+    POP_SCOPE = auto()
+    LOAD_MATCH = auto()
+    IS_TYPE = auto()
+    ALL = auto()
+    POP_N = auto()
+    MATCH_ERROR = auto()
+
+
+# Kinds of the operands following every opcode: an index in the constants
+# ("const"), the names ("name") or the nodes ("node") of the code, an
+# offset in the instructions ("jump"), or a number
+OPERANDS = {
+    Opcode.CONST: ("const",),
+    Opcode.POP: (),
+    Opcode.GET_NAME: ("name", "node"),
+    Opcode.GET_SLOT: ("depth", "slot", "name", "node"),
+    Opcode.SET_NAME: ("name", "node"),
+    Opcode.SET_SLOT: ("depth", "slot", "name", "node"),
+    Opcode.DEFINE_NAME: ("name", "is_const", "node"),
+    Opcode.DEFINE_SLOT: ("slot", "name", "is_const", "node"),
+    Opcode.DEFINE_FUNCTION: ("const", "node"),
+    Opcode.ADD: (),
+    Opcode.SUBTRACT: ("node",),
+    Opcode.MULTIPLY: ("node",),
+    Opcode.DIVIDE: ("node",),
+    Opcode.EQUAL: (),
+    Opcode.NOT_EQUAL: (),
+    Opcode.LESS: (),
+    Opcode.LESS_EQUAL: (),
+    Opcode.GREATER: (),
+    Opcode.GREATER_EQUAL: (),
+    Opcode.NEGATE: ("node",),
+    Opcode.NOT: (),
+    Opcode.JUMP: ("jump",),
+    Opcode.POP_JUMP_IF_FALSE: ("jump",),
+    Opcode.JUMP_IF_TRUE_OR_POP: ("jump",),
+    Opcode.JUMP_IF_FALSE_OR_POP: ("jump",),
+    Opcode.CALL: ("count", "node"),
+    Opcode.RETURN: (),
+    Opcode.RAISE_RETURN: ("node",),
+    Opcode.PUSH_SCOPE: ("const",),
+    Opcode.POP_SCOPE: (),
+    Opcode.LOAD_MATCH: ("index",),
+    Opcode.IS_TYPE: ("const",),
+    Opcode.ALL: ("count",),
+    Opcode.POP_N: ("count",),
+    Opcode.MATCH_ERROR: ("count", "count", "node"),
+}
+
+COMPARISONS = {
+    TokenType.GREATER_EQUAL: Opcode.GREATER_EQUAL,
+    TokenType.GREATER: Opcode.GREATER,
+    TokenType.LESS_EQUAL: Opcode.LESS_EQUAL,
+    TokenType.LESS: Opcode.LESS,
+    TokenType.EQUAL_EQUAL: Opcode.EQUAL,
+    TokenType.BANG_EQUAL: Opcode.NOT_EQUAL,
+}
+
+
+@dataclass(eq=False, slots=True)
+class Code:
+    """Instructions of a function body or of a node executed on its own,
+    each an opcode followed by its operands, and the pools the operands
+    refer to. Nodes are kept for the positions of the errors."""
+    name: str
+    instructions: array = field(default_factory=lambda: array("i"))
+    constants: list = field(default_factory=list)
+    names: list[str] = field(default_factory=list)
+    nodes: list[Stmt] = field(default_factory=list)
+    # Nodes an undefined variable error raised by the instruction at the
+    # offset goes through before it leaves the code, innermost first, see
+    # `Interpreter._locate_error`. Kept only for programs with shared nodes
+    locations: dict[int, tuple[Stmt, ...]] = field(default_factory=dict)
+
+
+class FunctionBody:
+    """Declaration of a function and its code, compiled on the first call
+    of any function created by it, so the body of a lazy block is parsed
+    then, and a syntax error in it is raised on every call."""
+
+    __slots__ = ("declaration", "locations", "_code")
+
+    def __init__(self, declaration: FunctionStmt, locations: bool):
+        self.declaration = declaration
+        self.locations = locations
+        self._code: Code | None = None
+
+    @property
+    def code(self) -> Code:
+        if self._code is None:
+            compiler = BytecodeCompiler(
+                self.declaration.name,
+                True,
+                self.locations
+            )
+            for statement in self.declaration.block.statements:
+                compiler.compile_statement(statement)
+            self._code = compiler.finish()
+        return self._code
+
+    def __repr__(self) -> str:
+        return f"<function {self.declaration.name}>"
+
+
+def compile_node(node: Stmt, locations: bool = False) -> Code:
+    """Compiles a node to be executed on its own. The code returns the
+    value of an expression, and `nil` after a statement."""
+    compiler = BytecodeCompiler("<node>", False, locations)
+    node.accept(compiler)
+    return compiler.finish(value=isinstance(node, Expr))
+
+
+def compile_program(program: Program, locations: bool = False) -> Code:
+    compiler = BytecodeCompiler("<program>", False, locations)
+    program.accept(compiler)
+    return compiler.finish()
+
+
+class BytecodeCompiler(Visitor):
+    """Compiles nodes into the instructions of a stack machine, see
+    `interpreter.vm`. Expressions push their values on the stack and
+    statements leave it as it was, except for the values of `match`,
+    which stay on the stack until its end. A `return` returns from the
+    code of a function, and raises `Return` outside of one, like in
+    `Interpreter`.
+
+    With `locations`, every instruction which can raise an undefined
+    variable error, including calls, gets the nodes it's compiled from,
+    so errors in shared nodes are located as by `Interpreter`."""
+
+    def __init__(self, name: str, in_function: bool, locations: bool):
+        self.code = Code(name)
+        self.in_function = in_function
+        self.track_locations = locations
+        self.ancestors: list[Stmt] = []
+        # Values of the enclosing `match` statements on the stack
+        self.match_values = 0
+        self._constant_indexes: dict[tuple, int] = {}
+        self._name_indexes: dict[str, int] = {}
+        self._node_indexes: dict[int, int] = {}
+
+    def compile(self, node: Stmt) -> None:
+        if self.track_locations:
+            self.ancestors.append(node)
+            node.accept(self)
+            self.ancestors.pop()
+        else:
+            node.accept(self)
+
+    def compile_statement(self, stmt: Stmt) -> None:
+        self.compile(stmt)
+        if isinstance(stmt, Expr):
+            self.emit(Opcode.POP)
+
+    def finish(self, value: bool = False) -> Code:
+        if not value:
+            self.emit(Opcode.CONST, self.constant(None))
+        self.emit(Opcode.RETURN)
+        return self.code
+
+    def emit(self, opcode: Opcode, *operands: int) -> int:
+        # Offset of the instruction
+        instructions = self.code.instructions
+        offset = len(instructions)
+        instructions.append(opcode)
+        instructions.extend(operands)
+        return offset
+
+    def emit_jump(self, opcode: Opcode) -> int:
+        # Offset of the operand to patch with the target
+        return self.emit(opcode, -1) + 1
+
+    def patch(self, operand: int) -> None:
+        self.code.instructions[operand] = len(self.code.instructions)
+
+    def locate(self, offset: int) -> None:
+        if self.track_locations:
+            self.code.locations[offset] = tuple(reversed(self.ancestors))
+
+    def constant(self, value: any) -> int:
+        # Literals are stored once, scopes and functions every time
+        key = (type(value), value) if _is_literal(value) else None
+        if key is not None and key in self._constant_indexes:
+            return self._constant_indexes[key]
+        index = len(self.code.constants)
+        self.code.constants.append(value)
+        if key is not None:
+            self._constant_indexes[key] = index
+        return index
+
+    def name(self, name: str) -> int:
+        index = self._name_indexes.get(name)
+        if index is None:
+            index = self._name_indexes[name] = len(self.code.names)
+            self.code.names.append(name)
+        return index
+
+    def node(self, node: Stmt) -> int:
+        index = self._node_indexes.get(id(node))
+        if index is None:
+            index = self._node_indexes[id(node)] = len(self.code.nodes)
+            self.code.nodes.append(node)
+        return index
+
+    def visit_program(self, program: Program):
+        for statement in program.statements:
+            self.compile_statement(statement)
+
+    def visit_assignment_expr(self, expr: AssignmentExpr):
+        self.compile(expr.value)
+        if expr.depth is None:
+            offset = self.emit(
+                Opcode.SET_NAME,
+                self.name(expr.name),
+                self.node(expr)
+            )
+        else:
+            offset = self.emit(
+                Opcode.SET_SLOT,
+                expr.depth,
+                expr.slot,
+                self.name(expr.name),
+                self.node(expr)
+            )
+        self.locate(offset)
+
+    def visit_binary(self, expr: BinaryExpr):
+        operator = expr.operator
+        if operator in COMPARISONS:
+            opcode, operands = COMPARISONS[operator], ()
+        elif operator == TokenType.PLUS:
+            opcode, operands = Opcode.ADD, ()
+        elif operator == TokenType.MINUS:
+            opcode, operands = Opcode.SUBTRACT, (self.node(expr),)
+        elif operator == TokenType.STAR:
+            opcode, operands = Opcode.MULTIPLY, (self.node(expr),)
+        elif operator == TokenType.SLASH:
+            opcode, operands = Opcode.DIVIDE, (self.node(expr),)
+        else:
+            self.emit(Opcode.CONST, self.constant(None))
+            return
+        self.compile(expr.left)
+        self.compile(expr.right)
+        self.emit(opcode, *operands)
+
+    def visit_literal(self, expr: LiteralExpr):
+        self.emit(Opcode.CONST, self.constant(expr.value))
+
+    def visit_unary(self, expr: UnaryExpr):
+        self.compile(expr.right)
+        match expr.operator:
+            case TokenType.MINUS:
+                self.emit(Opcode.NEGATE, self.node(expr))
+            case TokenType.NOT:
+                self.emit(Opcode.NOT)
+            case _:
+                self.emit(Opcode.POP)
+                self.emit(Opcode.CONST, self.constant(None))
+
+    def visit_logical(self, expr: LogicalExpr):
+        self.compile(expr.left)
+        if expr.operator == TokenType.OR:
+            end = self.emit_jump(Opcode.JUMP_IF_TRUE_OR_POP)
+        else:
+            end = self.emit_jump(Opcode.JUMP_IF_FALSE_OR_POP)
+        self.compile(expr.right)
+        self.patch(end)
+
+    def visit_grouping(self, expr: GroupingExpr):
+        self.compile(expr.expression)
+
+    def visit_identifier(self, expr: IdentifierExpr):
+        if expr.depth is None:
+            offset = self.emit(
+                Opcode.GET_NAME,
+                self.name(expr.name),
+                self.node(expr)
+            )
+        else:
+            offset = self.emit(
+                Opcode.GET_SLOT,
+                expr.depth,
+                expr.slot,
+                self.name(expr.name),
+                self.node(expr)
+            )
+        self.locate(offset)
+
+    def visit_call(self, expr: CallExpr):
+        self.compile(expr.callee)
+        for argument in expr.arguments:
+            self.compile(argument)
+        offset = self.emit(
+            Opcode.CALL,
+            len(expr.arguments),
+            self.node(expr)
+        )
+        self.locate(offset)
+
+    def visit_block_stmt(self, stmt: BlockStmt):
+        self.emit(Opcode.PUSH_SCOPE, self.constant(stmt.scope))
+        for statement in stmt.statements:
+            self.compile_statement(statement)
+        self.emit(Opcode.POP_SCOPE)
+
+    def visit_function_stmt(self, stmt: FunctionStmt):
+        body = FunctionBody(stmt, self.track_locations)
+        self.emit(
+            Opcode.DEFINE_FUNCTION,
+            self.constant(body),
+            self.node(stmt)
+        )
+
+    def visit_variable_stmt(self, stmt: VariableStmt):
+        if stmt.expression:
+            self.compile(stmt.expression)
+        else:
+            self.emit(Opcode.CONST, self.constant(None))
+        self._define(stmt.name, stmt.slot, stmt.is_const, stmt)
+
+    def _define(
+        self,
+        name: str,
+        slot: int | None,
+        is_const: bool,
+        node: Stmt
+    ) -> None:
+        if slot is None:
+            self.emit(
+                Opcode.DEFINE_NAME,
+                self.name(name),
+                is_const,
+                self.node(node)
+            )
+        else:
+            self.emit(
+                Opcode.DEFINE_SLOT,
+                slot,
+                self.name(name),
+                is_const,
+                self.node(node)
+            )
+
+    def visit_if_stmt(self, stmt: IfStmt):
+        self.compile(stmt.condition)
+        body_else = self.emit_jump(Opcode.POP_JUMP_IF_FALSE)
+        self.compile_statement(stmt.body)
+        if not stmt.body_else:
+            self.patch(body_else)
+            return
+        end = self.emit_jump(Opcode.JUMP)
+        self.patch(body_else)
+        self.compile_statement(stmt.body_else)
+        self.patch(end)
+
+    def visit_while_stmt(self, stmt: WhileStmt):
+        start = len(self.code.instructions)
+        self.compile(stmt.condition)
+        end = self.emit_jump(Opcode.POP_JUMP_IF_FALSE)
+        self.compile_statement(stmt.body)
+        self.emit(Opcode.JUMP, start)
+        self.patch(end)
+
+    def visit_return_stmt(self, stmt: ReturnStmt):
+        if stmt.expression is not None:
+            self.compile(stmt.expression)
+        else:
+            self.emit(Opcode.CONST, self.constant(None))
+        if self.in_function:
+            self.emit(Opcode.RETURN)
+        else:
+            self.emit(Opcode.RAISE_RETURN, self.node(stmt))
+
+    def visit_match_stmt(self, stmt: MatchStmt):
+        # The values stay on the stack and every case loads them by their
+        # index, counted from the bottom of the stack
+        base = self.match_values
+        for argument in stmt.arguments:
+            self.compile(argument)
+        count = len(stmt.arguments)
+        self.match_values += count
+        ends = []
+        for case in stmt.case_blocks:
+            if len(case.patterns) != count:
+                # Raised only if no case before matches
+                self.emit(
+                    Opcode.MATCH_ERROR,
+                    count,
+                    len(case.patterns),
+                    self.node(stmt)
+                )
+                break
+            # Every pattern is evaluated, as by `Interpreter`
+            for index, pattern in enumerate(case.patterns):
+                self._pattern(pattern.pattern, base + index)
+            if count == 0:
+                self.emit(Opcode.CONST, self.constant(True))
+            elif count > 1:
+                self.emit(Opcode.ALL, count)
+            next_case = [self.emit_jump(Opcode.POP_JUMP_IF_FALSE)]
+            if case.guard is not None:
+                self.compile(case.guard.condition)
+                next_case.append(self.emit_jump(Opcode.POP_JUMP_IF_FALSE))
+            self.emit(Opcode.PUSH_SCOPE, self.constant(case.scope))
+            for index, pattern in enumerate(case.patterns):
+                if pattern.name is not None:
+                    self.emit(Opcode.LOAD_MATCH, base + index)
+                    self._define(pattern.name, pattern.slot, False, pattern)
+            self.compile_statement(case.body)
+            self.emit(Opcode.POP_SCOPE)
+            ends.append(self.emit_jump(Opcode.JUMP))
+            for operand in next_case:
+                self.patch(operand)
+        for operand in ends:
+            self.patch(operand)
+        if count:
+            self.emit(Opcode.POP_N, count)
+        self.match_values -= count
+
+    def _pattern(self, pattern: Expr | None, index: int) -> None:
+        # Pushes whether the value at the index matches the pattern
+        if pattern is None:
+            self.emit(Opcode.CONST, self.constant(True))
+        elif isinstance(pattern, LogicalExpr):
+            self._pattern(pattern.left, index)
+            if pattern.operator == TokenType.OR:
+                end = self.emit_jump(Opcode.JUMP_IF_TRUE_OR_POP)
+            else:
+                end = self.emit_jump(Opcode.JUMP_IF_FALSE_OR_POP)
+            self._pattern(pattern.right, index)
+            self.patch(end)
+        else:
+            self.emit(Opcode.LOAD_MATCH, index)
+            pattern.accept(self)
+
+    def visit_compare_pattern_expr(self, stmt: ComparePatternExpr):
+        # The matched value is on the stack
+        self.compile(stmt.right)
+        self.emit(COMPARISONS[stmt.operator])
+
+    def visit_type_pattern_expr(self, stmt: TypePatternExpr):
+        self.emit(Opcode.IS_TYPE, self.constant(stmt.type))
+
+
+def _is_literal(value: any) -> bool:
+    return value is None or type(value) in (int, float, str, bool)
+
+
+def disassemble(code: Code) -> str:
+    """Lists the instructions of the code, with the values of their
+    operands, followed by the code of the functions declared in it."""
+    lines = [f"Code {code.name}:"]
+    instructions = code.instructions
+    offset = 0
+    functions = []
+    while offset < len(instructions):
+        opcode = Opcode(instructions[offset])
+        kinds = OPERANDS[opcode]
+        operands = instructions[offset + 1:offset + 1 + len(kinds)]
+        details = []
+        for kind, operand in zip(kinds, operands):
+            if kind == "const":
+                constant = code.constants[operand]
+                if isinstance(constant, FunctionBody):
+                    functions.append(constant)
+                details.append(_describe_constant(constant))
+            elif kind == "name":
+                details.append(code.names[operand])
+            elif kind == "jump":
+                details.append(f"to {operand}")
+            elif kind == "node":
+                position = code.nodes[operand].position
+                if position is not None:
+                    details.append(f"at {position.line}:{position.column}")
+        line = (
+            f"{offset:>6} {opcode.name:<21}"
+            f"{' '.join(str(operand) for operand in operands):<12}"
+        )
+        if details:
+            line += f" ({', '.join(details)})"
+        lines.append(line.rstrip())
+        offset += 1 + len(kinds)
+    for function in functions:
+        lines.append("")
+        lines.append(disassemble(function.code))
+    return "\n".join(lines)
+
+
+def _describe_constant(constant: any) -> str:
+    if isinstance(constant, TokenType):
+        return constant.name
+    return repr(constant)
@@ -0,0 +1,548 @@
+from __future__ import annotations
+
+import operator
+from functools import cache
+from typing import Callable as Function
+
+from lexer.tokens import TokenType
+
+from parser.models import (
+    Program,
+    Expr,
+    Stmt,
+    BinaryExpr,
+    Visitor,
+    AssignmentExpr,
+    LiteralExpr,
+    UnaryExpr,
+    LogicalExpr,
+    GroupingExpr,
+    IdentifierExpr,
+    CallExpr,
+    BlockStmt,
+    FunctionStmt,
+    VariableStmt,
+    IfStmt,
+    WhileStmt,
+    ReturnStmt,
+    MatchStmt,
+    ComparePatternExpr,
+    TypePatternExpr
+)
+
+from interpreter.interpreter import Interpreter, Literal, TYPE_CHECKS
+from interpreter.models import Environment, Callable, UserDefinedFunction
+from interpreter.exceptions import (
+    Return,
+    NumberConversionError,
+    UndefinedVariableError,
+    UndefinedFunctionError,
+    RedefinitionError,
+    ConstantRedefinitionError,
+    DivisionByZeroError,
+    InvalidArgumentNumberError
+)
+
+# An expression is compiled into a function of the environment returning
+# its value, a statement into one returning `None`, or the value and the
+# node of the `return` statement it reached
+Closure = Function[[Environment], any]
+# A pattern is compiled into a function of the matched value
+# and the environment
+PatternClosure = Function[[Literal, Environment], bool]
+
+COMPARISONS = {
+    TokenType.GREATER_EQUAL: operator.ge,
+    TokenType.GREATER: operator.gt,
+    TokenType.LESS_EQUAL: operator.le,
+    TokenType.LESS: operator.lt,
+    TokenType.EQUAL_EQUAL: operator.eq,
+    TokenType.BANG_EQUAL: operator.ne,
+}
+
+
+class CompiledFunction(UserDefinedFunction):
+    def __init__(
+        self,
+        declaration: FunctionStmt,
+        closure: Environment,
+        body: Function[[], Closure]
+    ):
+        super().__init__(declaration, closure)
+        # Compiles the body on the first call of any function created by
+        # the declaration, the body of a lazy block is parsed then
+        self.body = body
+
+    def call(self, interpreter, arguments):
+        declaration = self.declaration
+        environment = Environment(self.closure, declaration.block.scope)
+        for param, arg in zip(declaration.params, arguments):
+            environment.define(param.name, arg, param.is_const, param.slot)
+        result = self.body()(environment)
+        if result is not None:
+            return result[0]
+        return None
+
+
+class Compiler(Visitor):
+    """Compiles nodes into closures taking the environment they're
+    executed in. Everything decided by the node alone, like the function
+    of an operator, the slot of a variable or whether a statement has an
+    `else` branch, is decided once when it's compiled, and the closures
+    of the children are called directly, without going through `accept`.
+
+    Values are converted by the helpers of the interpreter, so the results
+    and errors are the same as of `Interpreter`. A `return` doesn't raise
+    an exception, its value is returned by the closures of the statements
+    around it up to the function."""
+
+    def __init__(self, interpreter: Interpreter):
+        self.interpreter = interpreter
+
+    def expression(self, expr: Expr) -> Closure:
+        return self._locate(expr.accept(self), expr)
+
+    def statement(self, stmt: Stmt) -> Closure:
+        if isinstance(stmt, Expr):
+            evaluate = self.expression(stmt)
+
+            def expression_stmt(environment):
+                evaluate(environment)
+            return expression_stmt
+        return self._locate(stmt.accept(self), stmt)
+
+    def _locate(self, closure: Closure, node: Stmt) -> Closure:
+        # Errors in shared nodes are located as in `Interpreter.execute`
+        interpreter = self.interpreter
+        if interpreter.positions is None:
+            return closure
+
+        def located(environment):
+            try:
+                return closure(environment)
+            except UndefinedVariableError as e:
+                interpreter._locate_error(e, node)
+                raise
+        return located
+
+    def visit_program(self, program: Program):
+        return self._sequence(program.statements)
+
+    def visit_assignment_expr(self, expr: AssignmentExpr):
+        value = self.expression(expr.value)
+        name, depth, slot = expr.name, expr.depth, expr.slot
+
+        def assignment(environment):
+            result = value(environment)
+            try:
+                if depth is None:
+                    environment.assign(name, result)
+                else:
+                    environment.assign_at(depth, slot, name, result)
+                return result
+            except (UndefinedVariableError, ConstantRedefinitionError) as e:
+                raise e.__class__(name, position=expr.position)
+        return assignment
+
+    def visit_binary(self, expr: BinaryExpr):
+        left = self.expression(expr.left)
+        right = self.expression(expr.right)
+        match expr.operator:
+            case TokenType.PLUS:
+                return self._plus(left, right)
+            case TokenType.MINUS:
+                return self._arithmetic(expr, left, right, operator.sub)
+            case TokenType.STAR:
+                return self._arithmetic(expr, left, right, operator.mul)
+            case TokenType.SLASH:
+                return self._divide(expr, left, right)
+        if expr.operator in COMPARISONS:
+            return self._comparison(left, right, COMPARISONS[expr.operator])
+        return lambda environment: None
+
+    def _plus(self, left: Closure, right: Closure) -> Closure:
+        cast = self.interpreter._cast_binary_operands_to_common_type
+        int_or_float = self.interpreter._int_or_float
+
+        def plus(environment):
+            left_value = left(environment)
+            right_value = right(environment)
+            if type(left_value) is int and type(right_value) is int:
+                return left_value + right_value
+            left_value, right_value = cast(left_value, right_value)
+            result = left_value + right_value
+            if isinstance(result, float):
+                return int_or_float(result)
+            return result
+        return plus
+
+    def _arithmetic(
+        self,
+        expr: BinaryExpr,
+        left: Closure,
+        right: Closure,
+        function: Function[[any, any], any]
+    ) -> Closure:
+        interpreter = self.interpreter
+        to_number = interpreter.try_cast_to_number
+        int_or_float = interpreter._int_or_float
+
+        def arithmetic(environment):
+            left_value = left(environment)
+            right_value = right(environment)
+            if type(left_value) is int and type(right_value) is int:
+                return function(left_value, right_value)
+            new_left = to_number(left_value)
+            new_right = to_number(right_value)
+            if new_left is not None and new_right is not None:
+                return int_or_float(function(new_left, new_right))
+            raise NumberConversionError(
+                left_value if new_left is None else right_value,
+                interpreter.get_operand_position(expr, new_left is None)
+            )
+        return arithmetic
+
+    def _divide(
+        self,
+        expr: BinaryExpr,
+        left: Closure,
+        right: Closure
+    ) -> Closure:
+        interpreter = self.interpreter
+        to_number = interpreter.try_cast_to_number
+        int_or_float = interpreter._int_or_float
+
+        def divide(environment):
+            left_value = left(environment)
+            right_value = right(environment)
+            new_left = to_number(left_value)
+            new_right = to_number(right_value)
+            if new_left is not None and new_right is not None:
+                if new_right == 0:
+                    raise DivisionByZeroError(
+                        interpreter.get_operand_position(expr, False)
+                    )
+                return int_or_float(new_left / new_right)
+            raise NumberConversionError(
+                left_value if new_left is None else right_value,
+                interpreter.get_operand_position(expr, new_left is None)
+            )
+        return divide
+
+    def _comparison(
+        self,
+        left: Closure,
+        right: Closure,
+        function: Function[[any, any], bool]
+    ) -> Closure:
+        cast = self.interpreter._cast_binary_operands_to_common_type
+
+        def comparison(environment):
+            left_value = left(environment)
+            right_value = right(environment)
+            if type(left_value) is int and type(right_value) is int:
+                return function(left_value, right_value)
+            return function(*cast(left_value, right_value))
+        return comparison
+
+    def visit_literal(self, expr: LiteralExpr):
+        value = expr.value
+
+        def literal(environment):
+            return value
+        return literal
+
+    def visit_unary(self, expr: UnaryExpr):
+        right = self.expression(expr.right)
+        match expr.operator:
+            case TokenType.MINUS:
+                to_number = self.interpreter.try_cast_to_number
+
+                def negation(environment):
+                    value = right(environment)
+                    number = to_number(value)
+                    if number is not None:
+                        return -number
+                    raise NumberConversionError(value, expr.position)
+                return negation
+            case TokenType.NOT:
+                def logical_not(environment):
+                    return not right(environment)
+                return logical_not
+
+        def unknown(environment):
+            right(environment)
+        return unknown
+
+    def visit_logical(self, expr: LogicalExpr):
+        left = self.expression(expr.left)
+        right = self.expression(expr.right)
+        if expr.operator == TokenType.OR:
+            def logical_or(environment):
+                value = left(environment)
+                if value:
+                    return value
+                return right(environment)
+            return logical_or
+
+        def logical_and(environment):
+            value = left(environment)
+            if not value:
+                return value
+            return right(environment)
+        return logical_and
+
+    def visit_grouping(self, expr: GroupingExpr):
+        return self.expression(expr.expression)
+
+    def visit_identifier(self, expr: IdentifierExpr):
+        name, depth, slot = expr.name, expr.depth, expr.slot
+        if depth is None:
+            def identifier(environment):
+                try:
+                    return environment.get(name)
+                except UndefinedVariableError:
+                    raise UndefinedVariableError(name, expr.position)
+            return identifier
+
+        def resolved_identifier(environment):
+            try:
+                return environment.get_at(depth, slot, name)
+            except UndefinedVariableError:
+                raise UndefinedVariableError(name, expr.position)
+        return resolved_identifier
+
+    def visit_call(self, expr: CallExpr):
+        callee = self.expression(expr.callee)
+        arguments = [self.expression(arg) for arg in expr.arguments]
+        interpreter = self.interpreter
+
+        def call(environment):
+            function = callee(environment)
+            values = []
+            for argument in arguments:
+                values.append(argument(environment))
+            if not isinstance(function, Callable):
+                raise UndefinedFunctionError(function, expr.position)
+            arity = function.arity
+            if arity is not None and len(values) != arity:
+                raise InvalidArgumentNumberError(
+                    function.name,
+                    arity,
+                    len(values),
+                    expr.position
+                )
+            return function.call(interpreter, values)
+        return call
+
+    def visit_block_stmt(self, stmt: BlockStmt):
+        body = self._sequence(stmt.statements)
+        scope = stmt.scope
+
+        def block(environment):
+            return body(Environment(environment, scope))
+        return block
+
+    def _sequence(self, statements: list[Stmt]) -> Closure:
+        closures = [self.statement(statement) for statement in statements]
+        if len(closures) == 1:
+            return closures[0]
+
+        def sequence(environment):
+            for closure in closures:
+                result = closure(environment)
+                if result is not None:
+                    return result
+            return None
+        return sequence
+
+    def visit_function_stmt(self, stmt: FunctionStmt):
+        name, slot = stmt.name, stmt.slot
+        # Not cached when compiling fails, so a syntax error in a lazy
+        # block is raised on every call
+        body = cache(lambda: self._sequence(stmt.block.statements))
+
+        def function(environment):
+            try:
+                environment.define_function(
+                    CompiledFunction(stmt, environment, body),
+                    slot
+                )
+            except ConstantRedefinitionError:
+                raise ConstantRedefinitionError(name, stmt.position)
+        return function
+
+    def visit_variable_stmt(self, stmt: VariableStmt):
+        name, is_const, slot = stmt.name, stmt.is_const, stmt.slot
+        value = None
+        if stmt.expression:
+            value = self.expression(stmt.expression)
+
+        def variable(environment):
+            result = None if value is None else value(environment)
+            try:
+                environment.define(name, result, is_const, slot)
+            except RedefinitionError:
+                raise RedefinitionError(name, stmt.position)
+        return variable
+
+    def visit_if_stmt(self, stmt: IfStmt):
+        condition = self.expression(stmt.condition)
+        body = self.statement(stmt.body)
+        if not stmt.body_else:
+            def if_stmt(environment):
+                if condition(environment):
+                    return body(environment)
+                return None
+            return if_stmt
+        body_else = self.statement(stmt.body_else)
+
+        def if_else_stmt(environment):
+            if condition(environment):
+                return body(environment)
+            return body_else(environment)
+        return if_else_stmt
+
+    def visit_while_stmt(self, stmt: WhileStmt):
+        condition = self.expression(stmt.condition)
+        body = self.statement(stmt.body)
+
+        def while_stmt(environment):
+            while condition(environment):
+                result = body(environment)
+                if result is not None:
+                    return result
+            return None
+        return while_stmt
+
+    def visit_return_stmt(self, stmt: ReturnStmt):
+        if stmt.expression is None:
+            def return_nil(environment):
+                return None, stmt
+            return return_nil
+        value = self.expression(stmt.expression)
+
+        def return_stmt(environment):
+            return value(environment), stmt
+        return return_stmt
+
+    def visit_match_stmt(self, stmt: MatchStmt):
+        arguments = [self.expression(arg) for arg in stmt.arguments]
+        cases = []
+        for case in stmt.case_blocks:
+            patterns = [
+                self._pattern(pattern.pattern) for pattern in case.patterns
+            ]
+            guard = None
+            if case.guard is not None:
+                guard = self.expression(case.guard.condition)
+            bindings = [
+                (index, pattern.name, pattern.slot)
+                for index, pattern in enumerate(case.patterns)
+                if pattern.name is not None
+            ]
+            body = self.statement(case.body)
+            cases.append((patterns, guard, bindings, case.scope, body))
+
+        def match(environment):
+            values = [argument(environment) for argument in arguments]
+            for patterns, guard, bindings, scope, body in cases:
+                if not len(patterns) == len(values):
+                    raise InvalidArgumentNumberError(
+                        "case",
+                        len(values),
+                        len(patterns),
+                        stmt.position
+                    )
+                # Every pattern is evaluated, as by `Interpreter`
+                if (
+                    all([
+                        pattern(value, environment)
+                        for pattern, value in zip(patterns, values)
+                    ])
+                    and (guard is None or guard(environment))
+                ):
+                    case_environment = Environment(environment, scope)
+                    for index, name, slot in bindings:
+                        case_environment.define(name, values[index], slot=slot)
+                    return body(case_environment)
+            return None
+        return match
+
+    def _pattern(self, pattern: Expr | None) -> PatternClosure:
+        if pattern is None:
+            return lambda value, environment: True
+        if not isinstance(pattern, LogicalExpr):
+            return pattern.accept(self)
+        left = self._pattern(pattern.left)
+        right = self._pattern(pattern.right)
+        if pattern.operator == TokenType.OR:
+            def pattern_or(value, environment):
+                if left(value, environment):
+                    return True
+                return right(value, environment)
+            return pattern_or
+
+        def pattern_and(value, environment):
+            if not left(value, environment):
+                return False
+            return right(value, environment)
+        return pattern_and
+
+    def visit_compare_pattern_expr(self, stmt: ComparePatternExpr):
+        right = self.expression(stmt.right)
+        function = COMPARISONS[stmt.operator]
+        cast = self.interpreter._cast_binary_operands_to_common_type
+
+        def compare_pattern(value, environment):
+            return function(*cast(value, right(environment)))
+        return compare_pattern
+
+    def visit_type_pattern_expr(self, stmt: TypePatternExpr):
+        check = TYPE_CHECKS.get(stmt.type, lambda value: None)
+
+        def type_pattern(value, environment):
+            return check(value)
+        return type_pattern
+
+
+class ClosureInterpreter(Interpreter):
+    """Executes every node given to it by compiling it with `Compiler` and
+    calling the closure. Nodes inside it are compiled once with it, and
+    bodies of functions on their first call, so a loop or a function runs
+    without dispatching on the types of its nodes and operators again."""
+
+    def __init__(self, positions=None):
+        super().__init__(positions)
+        self.compiler = Compiler(self)
+
+    def evaluate_compiled(self, expr: Expr):
+        return expr.accept(self.compiler)(self.environment)
+
+    def execute_compiled(self, stmt: Stmt):
+        result = stmt.accept(self.compiler)(self.environment)
+        if result is not None:
+            value, return_stmt = result
+            raise Return(value, return_stmt.position)
+
+    visit_assignment_expr = evaluate_compiled
+    visit_binary = evaluate_compiled
+    visit_literal = evaluate_compiled
+    visit_unary = evaluate_compiled
+    visit_logical = evaluate_compiled
+    visit_grouping = evaluate_compiled
+    visit_identifier = evaluate_compiled
+    visit_call = evaluate_compiled
+    visit_block_stmt = execute_compiled
+    visit_function_stmt = execute_compiled
+    visit_variable_stmt = execute_compiled
+    visit_if_stmt = execute_compiled
+    visit_while_stmt = execute_compiled
+    visit_return_stmt = execute_compiled
+    visit_match_stmt = execute_compiled
+
+    def visit_compare_pattern_expr(self, stmt: ComparePatternExpr):
+        pattern = stmt.accept(self.compiler)
+        return lambda value: pattern(value, self.environment)
+
+    visit_type_pattern_expr = visit_compare_pattern_expr
@@ -23,6 +23,9 @@ class UndefinedVariableError(RuntimeError):
             f"Undefined variable '{name}'",
             position
         )
+        # A shared identifier raising the error, until its position is
+        # found by its parent, see `Interpreter._locate_error`
+        self.node = None
 
 
 class UndefinedFunctionError(RuntimeError):
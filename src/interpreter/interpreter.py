@@ -1,3 +1,6 @@
+from typing import Iterable
+
+from lexer.streams import Position
 from lexer.tokens import TokenType
 
 from parser.models import (
@@ -24,6 +27,8 @@ from parser.models import (
     TypePatternExpr
 )
 
+from parser.interning import PositionTable
+
 from interpreter.models import Environment, Callable, UserDefinedFunction
 from interpreter.stdlib import PrintFunction
 from interpreter.exceptions import (
@@ -39,20 +44,44 @@ from interpreter.exceptions import (
 
 Literal = int | float | str | bool | None
 
+# Checks of the type patterns, shared by all the engines
+TYPE_CHECKS = {
+    TokenType.STRING_TYPE: lambda value: isinstance(value, str),
+    TokenType.NUMBER_TYPE: lambda value: isinstance(value, (int, float)),
+    TokenType.BOOL_TYPE: lambda value: isinstance(value, bool),
+    TokenType.FUNCTION_TYPE: lambda value: isinstance(value, Callable),
+    TokenType.NIL_TYPE: lambda value: value is None,
+}
+
 
 class Interpreter(Visitor):
-    def __init__(self):
+    def __init__(self, positions: PositionTable | None = None):
+        # Positions of shared nodes, see `parser.interning.share_nodes`
+        self.positions = positions
         self.environment = Environment()
         self.environment.define_function(PrintFunction())
 
     def visit_program(self, program: Program):
-        for statement in program.statements:
-            self.evaluate(statement)
+        self.execute_statements(program.statements)
+
+    def execute_statements(self, statements: Iterable[Stmt]):
+        # Statements can come from a parser while it reads the script, each
+        # is dropped after it's executed unless a function refers to it
+        for statement in statements:
+            self.execute(statement)
 
     def visit_assignment_expr(self, expr: AssignmentExpr):
         value = self.evaluate(expr.value)
         try:
-            self.environment.assign(expr.name, value)
+            if expr.depth is None:
+                self.environment.assign(expr.name, value)
+            else:
+                self.environment.assign_at(
+                    expr.depth,
+                    expr.slot,
+                    expr.name,
+                    value
+                )
             return value
         except (UndefinedVariableError, ConstantRedefinitionError) as e:
             raise e.__class__(expr.name, position=expr.position)
@@ -60,13 +89,13 @@ class Interpreter(Visitor):
     def visit_binary(self, expr: BinaryExpr):
         match expr.operator:
             case TokenType.MINUS:
-                return self._evaluate_binary_minus(expr.left, expr.right)
+                return self._evaluate_binary_minus(expr)
             case TokenType.PLUS:
-                return self._evaluate_binary_plus(expr.left, expr.right)
+                return self._evaluate_binary_plus(expr)
             case TokenType.STAR:
-                return self._evaluate_binary_multiply(expr.left, expr.right)
+                return self._evaluate_binary_multiply(expr)
             case TokenType.SLASH:
-                return self._evaluate_binary_divide(expr.left, expr.right)
+                return self._evaluate_binary_divide(expr)
             case (
                 TokenType.GREATER_EQUAL
                 | TokenType.GREATER
@@ -83,21 +112,21 @@ class Interpreter(Visitor):
                     expr.operator
                 )
 
-    def _evaluate_binary_minus(self, left_expr: Expr, right_expr: Expr):
-        left = self.evaluate(left_expr)
-        right = self.evaluate(right_expr)
+    def _evaluate_binary_minus(self, expr: BinaryExpr):
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
         new_left = self.try_cast_to_number(left)
         new_right = self.try_cast_to_number(right)
         if new_left is not None and new_right is not None:
             return self._int_or_float(new_left - new_right)
         raise NumberConversionError(
             left if new_left is None else right,
-            left_expr.position if new_left is None else right_expr.position
+            self.get_operand_position(expr, new_left is None)
         )
 
-    def _evaluate_binary_plus(self, left_expr: Expr, right_expr: Expr):
-        left = self.evaluate(left_expr)
-        right = self.evaluate(right_expr)
+    def _evaluate_binary_plus(self, expr: BinaryExpr):
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
         left, right = self._cast_binary_operands_to_common_type(left, right)
         result = left + right
         if isinstance(result, float):
@@ -115,30 +144,32 @@ class Interpreter(Visitor):
                 return new_left, new_right
         return self.cast_to_str(left), self.cast_to_str(right)
 
-    def _evaluate_binary_multiply(self, left_expr: Expr, right_expr: Expr):
-        left = self.evaluate(left_expr)
-        right = self.evaluate(right_expr)
+    def _evaluate_binary_multiply(self, expr: BinaryExpr):
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
         new_left = self.try_cast_to_number(left)
         new_right = self.try_cast_to_number(right)
         if new_left is not None and new_right is not None:
             return self._int_or_float(new_left * new_right)
         raise NumberConversionError(
             left if new_left is None else right,
-            left_expr.position if new_left is None else right_expr.position
+            self.get_operand_position(expr, new_left is None)
         )
 
-    def _evaluate_binary_divide(self, left_expr: Expr, right_expr: Expr):
-        left = self.evaluate(left_expr)
-        right = self.evaluate(right_expr)
+    def _evaluate_binary_divide(self, expr: BinaryExpr):
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
         new_left = self.try_cast_to_number(left)
         new_right = self.try_cast_to_number(right)
         if new_left is not None and new_right is not None:
             if new_right == 0:
-                raise DivisionByZeroError(right_expr.position)
+                raise DivisionByZeroError(
+                    self.get_operand_position(expr, False)
+                )
             return self._int_or_float(new_left / new_right)
         raise NumberConversionError(
             left if new_left is None else right,
-            left_expr.position if new_left is None else right_expr.position
+            self.get_operand_position(expr, new_left is None)
         )
 
     def _evaluate_binary_comparison(self, left, right, operator_type):
@@ -189,7 +220,9 @@ class Interpreter(Visitor):
 
     def visit_identifier(self, expr: IdentifierExpr):
         try:
-            return self.environment.get(expr.name)
+            if expr.depth is None:
+                return self.environment.get(expr.name)
+            return self.environment.get_at(expr.depth, expr.slot, expr.name)
         except UndefinedVariableError:
             raise UndefinedVariableError(expr.name, expr.position)
 
@@ -208,7 +241,10 @@ class Interpreter(Visitor):
         return callee.call(self, arguments)
 
     def visit_block_stmt(self, stmt: BlockStmt):
-        self.execute_block(stmt.statements, Environment(self.environment))
+        self.execute_block(
+            stmt.statements,
+            Environment(self.environment, stmt.scope)
+        )
 
     def execute_block(self, statements: list[Stmt], environment: Environment):
         previous = self.environment
@@ -222,7 +258,7 @@ class Interpreter(Visitor):
     def visit_function_stmt(self, stmt: FunctionStmt):
         function = UserDefinedFunction(stmt, self.environment)
         try:
-            self.environment.define_function(function)
+            self.environment.define_function(function, stmt.slot)
         except ConstantRedefinitionError:
             raise ConstantRedefinitionError(stmt.name, stmt.position)
 
@@ -231,7 +267,12 @@ class Interpreter(Visitor):
         if stmt.expression:
             value = self.evaluate(stmt.expression)
         try:
-            self.environment.define(stmt.name, value, stmt.is_const)
+            self.environment.define(
+                stmt.name,
+                value,
+                stmt.is_const,
+                stmt.slot
+            )
         except RedefinitionError:
             raise RedefinitionError(stmt.name, stmt.position)
 
@@ -266,13 +307,20 @@ class Interpreter(Visitor):
                     self._evaluate_pattern(pattern.pattern, arg)
                     for pattern, arg in zip(case.patterns, arguments)
                 ])
-                and (case.guard is None or self.evaluate(case.guard))
+                and (
+                    case.guard is None
+                    or self.is_truthy(self.evaluate(case.guard.condition))
+                )
             ):
                 previous = self.environment
-                environment = Environment(self.environment)
+                environment = Environment(self.environment, case.scope)
                 for pattern, arg in zip(case.patterns, arguments):
                     if pattern.name is not None:
-                        environment.define(pattern.name, arg)
+                        environment.define(
+                            pattern.name,
+                            arg,
+                            slot=pattern.slot
+                        )
                 self.environment = environment
                 self.execute(case.body)
                 self.environment = previous
@@ -302,18 +350,7 @@ class Interpreter(Visitor):
         return _evaluate_compare_pattern
 
     def visit_type_pattern_expr(self, stmt: TypePatternExpr):
-        def _evaluate_type_pattern(value: Literal) -> bool:
-            if stmt.type == TokenType.STRING_TYPE:
-                return isinstance(value, str)
-            if stmt.type == TokenType.NUMBER_TYPE:
-                return isinstance(value, (int, float))
-            if stmt.type == TokenType.BOOL_TYPE:
-                return isinstance(value, bool)
-            if stmt.type == TokenType.FUNCTION_TYPE:
-                return isinstance(value, Callable)
-            if stmt.type == TokenType.NIL_TYPE:
-                return value is None
-        return _evaluate_type_pattern
+        return TYPE_CHECKS.get(stmt.type, lambda value: None)
 
     def is_truthy(self, value: Literal) -> bool:
         if not value:
@@ -321,10 +358,39 @@ class Interpreter(Visitor):
         return True
 
     def execute(self, stmt: Stmt):
-        stmt.accept(self)
+        try:
+            stmt.accept(self)
+        except UndefinedVariableError as e:
+            self._locate_error(e, stmt)
+            raise
 
     def evaluate(self, expr: Expr):
-        return expr.accept(self)
+        try:
+            return expr.accept(self)
+        except UndefinedVariableError as e:
+            self._locate_error(e, expr)
+            raise
+
+    def _locate_error(self, error: UndefinedVariableError, node: Stmt):
+        # A shared identifier has no position, so it's remembered and its
+        # position is found in the table by its parent
+        if error.position is not None or self.positions is None:
+            return
+        if node.offset is None:
+            error.node = node
+        elif error.node is not None:
+            error.position = self.positions.find(node, error.node)
+            error.node = None
+
+    def get_operand_position(
+        self,
+        expr: BinaryExpr,
+        is_left: bool
+    ) -> Position | None:
+        operand = expr.left if is_left else expr.right
+        if operand.offset is None and self.positions is not None:
+            return self.positions.get(expr, 0 if is_left else 1)
+        return operand.position
 
     def is_number(self, value: Literal | UserDefinedFunction) -> bool:
         return type(value) == int or type(value) == float
@@ -9,40 +9,141 @@ from interpreter.exceptions import (
 )
 
 
+# Value in the slots of variables which aren't defined yet, as `None` is nil
+UNDEFINED = object()
+
+
 class Environment:
-    def __init__(self, enclosing=None):
+    """Variables of a scope. Every variable has a slot, its index in the
+    list of values, and the slots of a scope are numbered by the names of
+    its variables, which are shared by all of its environments. Slots of
+    resolved variables are given by `interpreter.resolver`, so they're
+    accessed by index, others get the next free slot on definition.
+
+    Values are kept in the list as they are, and whether they're constant
+    in the bits of a single integer, one per slot, so a variable takes
+    a list item and a bit."""
+
+    __slots__ = ("enclosing", "names", "_values", "_consts")
+
+    def __init__(
+        self,
+        enclosing: Environment | None = None,
+        names: dict[str, int] | None = None
+    ):
         self.enclosing = enclosing
-        self._values: dict[str, dict[any, bool]] = {}
-
-    def define(self, name: str, value: any, is_const: bool = False) -> None:
-        if name in self._values:
+        self.names = {} if names is None else names
+        self._values: list[any] = [UNDEFINED] * len(self.names)
+        # Bits of the slots of constants
+        self._consts = 0
+
+    def define(
+        self,
+        name: str,
+        value: any,
+        is_const: bool = False,
+        slot: int | None = None
+    ) -> None:
+        if slot is None:
+            slot = self.names.setdefault(name, len(self.names))
+        values = self._values
+        if slot >= len(values):
+            values.extend([UNDEFINED] * (slot + 1 - len(values)))
+        elif values[slot] is not UNDEFINED:
             raise RedefinitionError(name, position=None)
-        self._values[name] = {"value": value, "is_const": is_const}
-
-    def define_function(self, function: Callable) -> None:
+        values[slot] = value
+        if is_const:
+            self._consts |= 1 << slot
+
+    def define_function(
+        self,
+        function: Callable,
+        slot: int | None = None
+    ) -> None:
         name = function.name
-        if name in self._values:
+        if self._get_defined_slot(name, slot) is not None:
             self.assign(name, function)
         else:
-            self.define(name, function)
+            self.define(name, function, slot=slot)
 
     def get(self, name: str) -> any:
-        if name in self._values:
-            return self._values[name]["value"]
+        slot = self.names.get(name)
+        if slot is not None:
+            try:
+                value = self._values[slot]
+            except IndexError:
+                value = UNDEFINED
+            if value is not UNDEFINED:
+                return value
         if self.enclosing:
             return self.enclosing.get(name)
         raise UndefinedVariableError(name, position=None)
 
+    def get_at(self, depth: int, slot: int, name: str) -> any:
+        # The variable in the slot of the environment `depth` levels up
+        environment = self
+        while depth:
+            environment = environment.enclosing
+            depth -= 1
+        try:
+            value = environment._values[slot]
+        except IndexError:
+            value = UNDEFINED
+        if value is not UNDEFINED:
+            return value
+        # Not defined yet, it's looked up as it would be without the slot
+        if environment.enclosing:
+            return environment.enclosing.get(name)
+        raise UndefinedVariableError(name, position=None)
+
     def assign(self, name: str, value: any) -> None:
-        if name in self._values:
-            if self._values[name]["is_const"]:
+        slot = self._get_defined_slot(name)
+        if slot is not None:
+            if self._consts >> slot & 1:
                 raise ConstantRedefinitionError(name, position=None)
-            self._values[name]["value"] = value
+            self._values[slot] = value
         elif self.enclosing:
             self.enclosing.assign(name, value)
         else:
             raise UndefinedVariableError(name, position=None)
 
+    def assign_at(self, depth: int, slot: int, name: str, value: any) -> None:
+        environment = self
+        while depth:
+            environment = environment.enclosing
+            depth -= 1
+        values = environment._values
+        if slot >= len(values) or values[slot] is UNDEFINED:
+            if environment.enclosing:
+                return environment.enclosing.assign(name, value)
+            raise UndefinedVariableError(name, position=None)
+        if environment._consts >> slot & 1:
+            raise ConstantRedefinitionError(name, position=None)
+        values[slot] = value
+
+    def get_definitions(self) -> dict[str, bool]:
+        # Whether the variables defined in this environment are constant
+        return {
+            name: bool(self._consts >> slot & 1)
+            for name, slot in self.names.items()
+            if self._get_defined_slot(name, slot) is not None
+        }
+
+    def _get_defined_slot(
+        self,
+        name: str,
+        slot: int | None = None
+    ) -> int | None:
+        # The slot of the variable if it's defined in this environment
+        if slot is None:
+            slot = self.names.get(name)
+            if slot is None:
+                return None
+        values = self._values
+        if slot < len(values) and values[slot] is not UNDEFINED:
+            return slot
+        return None
+
 
 class Callable:
     @property
@@ -74,9 +175,13 @@ class UserDefinedFunction(Callable):
         return len(self.declaration.params)
 
     def call(self, interpreter, arguments):
-        environment = Environment(self.closure)
+        # Parameters share the scope of the body, see `Resolver`
+        environment = Environment(
+            self.closure,
+            self.declaration.block.scope
+        )
         for param, arg in zip(self.declaration.params, arguments):
-            environment.define(param.name, arg, param.is_const)
+            environment.define(param.name, arg, param.is_const, param.slot)
         try:
             interpreter.execute_block(
                 self.declaration.block.statements,
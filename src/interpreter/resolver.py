@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+from parser.models import (
+    Program,
+    Stmt,
+    BinaryExpr,
+    Visitor,
+    AssignmentExpr,
+    LiteralExpr,
+    UnaryExpr,
+    LogicalExpr,
+    GroupingExpr,
+    IdentifierExpr,
+    CallExpr,
+    BlockStmt,
+    FunctionStmt,
+    VariableStmt,
+    IfStmt,
+    WhileStmt,
+    ReturnStmt,
+    MatchStmt,
+    ComparePatternExpr,
+    TypePatternExpr
+)
+
+from interpreter.models import Environment
+from interpreter.exceptions import (
+    UndefinedVariableError,
+    ConstantRedefinitionError
+)
+
+
+@dataclass
+class Scope:
+    # Slots of the variables by their names, shared with the environments
+    # of the scope
+    names: dict[str, int]
+    # Variables certainly defined at the current point of the scope,
+    # with whether they are constant
+    defined: dict[str, bool] = field(default_factory=dict)
+    # Number of `if` and `while` bodies around the current point
+    conditional: int = 0
+
+
+def resolve(program: Program, environment: Environment) -> None:
+    """Binds the variables of the program to their slots in the scopes of
+    the environment it's going to be executed in, see `Resolver`."""
+    program.accept(Resolver(environment))
+
+
+class Resolver(Visitor):
+    """Gives every variable a slot in its scope, and every identifier and
+    assignment the depth of the scope, counted from the one they're in,
+    and the slot of the variable there. The interpreter then gets to the
+    variable by index, however deep its scope is.
+
+    All the declarations of a scope are collected before it's resolved,
+    so a name refers to the innermost scope declaring it anywhere. If the
+    variable isn't defined yet when it's used, for example because its
+    declaration comes later, it's looked up by name in the outer scopes,
+    as without the resolver. Names not declared in any scope and
+    assignments to constants certainly defined before are reported before
+    the program is executed, even if the code would never run.
+
+    Identifiers without an offset, which are shared by many places (see
+    `parser.interning`), are checked the same way but left to be looked
+    up by name. Programs are resolved before their nodes are shared, which
+    keeps the identifiers bound to slots, see `NodeTable`."""
+
+    def __init__(self, environment: Environment):
+        self.scopes: list[Scope] = []
+        while environment is not None:
+            self.scopes.append(
+                Scope(environment.names, environment.get_definitions())
+            )
+            environment = environment.enclosing
+        self.scopes.reverse()
+
+    def visit_program(self, program: Program):
+        self._declare(program.statements, self.scopes[-1].names)
+        for statement in program.statements:
+            statement.accept(self)
+
+    def visit_assignment_expr(self, expr: AssignmentExpr):
+        expr.value.accept(self)
+        depth, slot, scope = self._find(expr)
+        if expr.offset is not None:
+            expr.depth, expr.slot = depth, slot
+        if scope.defined.get(expr.name):
+            raise ConstantRedefinitionError(expr.name, expr.position)
+
+    def visit_binary(self, expr: BinaryExpr):
+        expr.left.accept(self)
+        expr.right.accept(self)
+
+    def visit_literal(self, expr: LiteralExpr):
+        pass
+
+    def visit_unary(self, expr: UnaryExpr):
+        expr.right.accept(self)
+
+    def visit_logical(self, expr: LogicalExpr):
+        expr.left.accept(self)
+        expr.right.accept(self)
+
+    def visit_grouping(self, expr: GroupingExpr):
+        expr.expression.accept(self)
+
+    def visit_identifier(self, expr: IdentifierExpr):
+        depth, slot, _ = self._find(expr)
+        if expr.offset is not None:
+            expr.depth, expr.slot = depth, slot
+
+    def visit_call(self, expr: CallExpr):
+        expr.callee.accept(self)
+        for argument in expr.arguments:
+            argument.accept(self)
+
+    def visit_block_stmt(self, stmt: BlockStmt):
+        stmt.scope = {}
+        self._resolve_scope(stmt.statements, Scope(stmt.scope))
+
+    def visit_function_stmt(self, stmt: FunctionStmt):
+        scope = self.scopes[-1]
+        # The function is assigned to a variable defined before
+        if scope.defined.get(stmt.name):
+            raise ConstantRedefinitionError(stmt.name, stmt.position)
+        stmt.slot = scope.names[stmt.name]
+        if not scope.conditional:
+            scope.defined[stmt.name] = False
+        # Parameters are defined in the scope of the body, which is
+        # executed without a block of its own
+        stmt.block.scope = {}
+        body = Scope(stmt.block.scope)
+        for param in stmt.params:
+            param.slot = body.names.setdefault(param.name, len(body.names))
+            body.defined[param.name] = param.is_const
+        self._resolve_scope(stmt.block.statements, body)
+
+    def visit_variable_stmt(self, stmt: VariableStmt):
+        if stmt.expression is not None:
+            stmt.expression.accept(self)
+        scope = self.scopes[-1]
+        stmt.slot = scope.names[stmt.name]
+        if not scope.conditional:
+            # A second definition fails, so the first one is kept
+            scope.defined.setdefault(stmt.name, stmt.is_const)
+
+    def visit_if_stmt(self, stmt: IfStmt):
+        stmt.condition.accept(self)
+        scope = self.scopes[-1]
+        scope.conditional += 1
+        stmt.body.accept(self)
+        if stmt.body_else:
+            stmt.body_else.accept(self)
+        scope.conditional -= 1
+
+    def visit_while_stmt(self, stmt: WhileStmt):
+        stmt.condition.accept(self)
+        scope = self.scopes[-1]
+        scope.conditional += 1
+        stmt.body.accept(self)
+        scope.conditional -= 1
+
+    def visit_return_stmt(self, stmt: ReturnStmt):
+        if stmt.expression is not None:
+            stmt.expression.accept(self)
+
+    def visit_match_stmt(self, stmt: MatchStmt):
+        for argument in stmt.arguments:
+            argument.accept(self)
+        for case in stmt.case_blocks:
+            # Patterns and guards are evaluated outside of the scope of
+            # the case, which only holds the names bound by patterns
+            for pattern in case.patterns:
+                if pattern.pattern is not None:
+                    pattern.pattern.accept(self)
+            if case.guard is not None:
+                case.guard.condition.accept(self)
+            case.scope = {}
+            scope = Scope(case.scope)
+            for pattern in case.patterns:
+                if pattern.name is not None:
+                    pattern.slot = scope.names.setdefault(
+                        pattern.name,
+                        len(scope.names)
+                    )
+                    scope.defined[pattern.name] = False
+            self._resolve_scope([case.body], scope)
+
+    def visit_compare_pattern_expr(self, stmt: ComparePatternExpr):
+        stmt.right.accept(self)
+
+    def visit_type_pattern_expr(self, stmt: TypePatternExpr):
+        pass
+
+    def _resolve_scope(self, statements: list[Stmt], scope: Scope) -> None:
+        self._declare(statements, scope.names)
+        self.scopes.append(scope)
+        for statement in statements:
+            statement.accept(self)
+        self.scopes.pop()
+
+    def _declare(self, statements: list[Stmt], names: dict[str, int]):
+        # Gives slots to the variables and functions declared by the
+        # statements, including bodies of `if` and `while` which aren't
+        # blocks, as they're executed in the same scope
+        stack = list(reversed(statements))
+        while stack:
+            statement = stack.pop()
+            node_type = type(statement)
+            if node_type is VariableStmt or node_type is FunctionStmt:
+                names.setdefault(statement.name, len(names))
+            elif node_type is IfStmt:
+                if statement.body_else is not None:
+                    stack.append(statement.body_else)
+                stack.append(statement.body)
+            elif node_type is WhileStmt:
+                stack.append(statement.body)
+
+    def _find(
+        self,
+        expr: IdentifierExpr | AssignmentExpr
+    ) -> tuple[int, int, Scope]:
+        # Depth and slot of the variable and its scope
+        for depth, scope in enumerate(reversed(self.scopes)):
+            slot = scope.names.get(expr.name)
+            if slot is not None:
+                return depth, slot, scope
+        raise UndefinedVariableError(expr.name, expr.position)
@@ -0,0 +1,30 @@
+import pytest
+
+from interpreter.interpreter import Interpreter
+from interpreter.closures import ClosureInterpreter
+from interpreter.vm import BytecodeInterpreter
+from interpreter.transpiler import PythonInterpreter
+from interpreter.tests import utils
+
+
+ENGINES = {
+    "tree": Interpreter,
+    "closures": ClosureInterpreter,
+    "bytecode": BytecodeInterpreter,
+    "python": PythonInterpreter,
+}
+
+
+def pytest_generate_tests(metafunc):
+    # Tests of modules creating an `Interpreter` are run by every engine
+    if hasattr(metafunc.module, "Interpreter"):
+        metafunc.parametrize("engine", list(ENGINES), indirect=True)
+
+
+@pytest.fixture(autouse=True)
+def engine(request, monkeypatch):
+    name = getattr(request, "param", "tree")
+    for module in (request.module, utils):
+        if hasattr(module, "Interpreter"):
+            monkeypatch.setattr(module, "Interpreter", ENGINES[name])
+    return name
@@ -0,0 +1,67 @@
+import pytest
+
+from lexer.lexers import RegexLexer
+
+from parser.parser import Parser
+
+from interpreter.bytecode import compile_program, compile_node, disassemble
+from interpreter.vm import BytecodeInterpreter
+
+
+def test_disassemble():
+    program = Parser(RegexLexer(
+        "fn add(a, b) { return a + b; }\n"
+        "if (add(1, 2) > 2 or x) print(-1);"
+    )).parse()
+    assert disassemble(compile_program(program)) == (
+        "Code <program>:\n"
+        "     0 DEFINE_FUNCTION      0 0          (<function add>, at 1:1)\n"
+        "     3 GET_NAME             0 1          (add, at 2:5)\n"
+        "     6 CONST                1            (1)\n"
+        "     8 CONST                2            (2)\n"
+        "    10 CALL                 2 2          (at 2:5)\n"
+        "    13 CONST                2            (2)\n"
+        "    15 GREATER\n"
+        "    16 JUMP_IF_TRUE_OR_POP  21           (to 21)\n"
+        "    18 GET_NAME             1 3          (x, at 2:22)\n"
+        "    21 POP_JUMP_IF_FALSE    34           (to 34)\n"
+        "    23 GET_NAME             2 4          (print, at 2:25)\n"
+        "    26 CONST                1            (1)\n"
+        "    28 NEGATE               5            (at 2:31)\n"
+        "    30 CALL                 1 6          (at 2:25)\n"
+        "    33 POP\n"
+        "    34 CONST                3            (None)\n"
+        "    36 RETURN\n"
+        "\n"
+        "Code add:\n"
+        "     0 GET_NAME             0 0          (a, at 1:23)\n"
+        "     3 GET_NAME             1 1          (b, at 1:27)\n"
+        "     6 ADD\n"
+        "     7 RETURN\n"
+        "     8 CONST                0            (None)\n"
+        "    10 RETURN"
+    )
+
+
+def test_function_body_is_compiled_once():
+    program = Parser(RegexLexer(
+        "fn inc(a) { return a + 1; }"
+        "var i = 0; while (i < 3) { i = inc(i); }"
+    )).parse()
+    interpreter = BytecodeInterpreter()
+    program.accept(interpreter)
+    function = interpreter.environment.get("inc")
+    assert interpreter.environment.get("i") == 3
+    assert function.body.code is function.body.code
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1 + 2 * 3", 7),
+    ('"a" + 1 < "b"', True),
+    ("nil or not 0", True),
+])
+def test_compile_expression(text, expected):
+    expr = Parser(RegexLexer(text + ";")).parse().statements[0]
+    code = compile_node(expr)
+    interpreter = BytecodeInterpreter()
+    assert interpreter.vm.run(code, interpreter.environment) == expected
@@ -0,0 +1,23 @@
+
+from interpreter.closures import ClosureInterpreter, Compiler
+from interpreter.tests.utils import run_program
+
+
+def test_nodes_are_compiled_once(monkeypatch):
+    compiled = []
+    visit_binary = Compiler.visit_binary
+
+    def count_binary(compiler, expr):
+        compiled.append(expr)
+        return visit_binary(compiler, expr)
+
+    monkeypatch.setattr(Compiler, "visit_binary", count_binary)
+    text = (
+        "fn add(a, b) { return a + b; }"
+        "var i = 0; while (i < 10) { i = add(i, 1); }"
+        "print(i);"
+    )
+    output, error = run_program(text, ClosureInterpreter, True, False)
+    assert (output, error) == ("10\n", None)
+    # The body of the function and the condition of the loop
+    assert len(compiled) == 2
@@ -0,0 +1,17 @@
+import pytest
+
+from interpreter.tests.conftest import ENGINES
+from interpreter.tests.utils import ENGINE_PROGRAMS, run_program
+
+
+@pytest.mark.parametrize(
+    "name",
+    [name for name in ENGINES if name != "tree"]
+)
+@pytest.mark.parametrize("resolved, shared", [
+    (False, False), (True, False), (False, True), (True, True),
+])
+@pytest.mark.parametrize("text", ENGINE_PROGRAMS)
+def test_same_as_tree(text, resolved, shared, name):
+    expected = run_program(text, ENGINES["tree"], resolved, shared)
+    assert run_program(text, ENGINES[name], resolved, shared) == expected
@@ -1,9 +1,18 @@
 import pytest
 
+from lexer.lexers import Lexer, RegexLexer
+from lexer.streams import BufferedFileStream, Position
+
+from parser.parser import Parser
+from parser.exceptions import MissingVariableNameError, InvalidSyntaxError
+from parser.interning import share_nodes
+
 from interpreter.tests.utils import create_program, test_text_raises_error
 
 from interpreter.interpreter import Interpreter
 from interpreter.exceptions import (
+    RuntimeError,
+    Return,
     UndefinedVariableError,
     UndefinedFunctionError,
     InvalidArgumentNumberError,
@@ -345,3 +354,122 @@ def test_function(text, expected_result):
 )
 def test_function_error(text, expected_error):
     test_text_raises_error(text, expected_error)
+
+
+@pytest.mark.parametrize(
+    "text, expected_error, position", (
+        ('var a = "€" + 1;\nb = 2;', UndefinedVariableError,
+         Position(2, 1, 19)),
+        ('var x = 1;\n  x = "a" - 1;', NumberConversionError,
+         Position(2, 7, 17)),
+        ('fn f() {\n  return 1 / 0;\n}\nprint(f());', DivisionByZeroError,
+         Position(2, 14, 22)),
+        ('var s = "ł";\nvar s = 1;', RedefinitionError, Position(2, 1, 14)),
+        ('const c = 1;\nfn c() {}', ConstantRedefinitionError,
+         Position(2, 1, 13)),
+        ('fn f(a) {}\nf(1, 2);', InvalidArgumentNumberError,
+         Position(2, 1, 11)),
+        ('var n = 1;\nn();', UndefinedFunctionError, Position(2, 1, 11)),
+        ('var x = -"a";', NumberConversionError, Position(1, 9, 8)),
+        ('return 5;', Return, Position(1, 1, 0)),
+        ('match (1) {\n  (_) if (1 - "x"): print(1);\n}',
+         NumberConversionError, Position(2, 15, 26)),
+    )
+)
+def test_error_position(text, expected_error, position):
+    program = create_program(text)
+    with pytest.raises(expected_error) as e:
+        program.accept(Interpreter())
+    assert e.value.position == position
+
+
+def test_match_guard(capsys):
+    program = create_program(
+        "var limit = 3;"
+        "fn size(n) {"
+        "  match (n) {"
+        '    (>0) if (n > limit): return "big";'
+        '    (>0) if (print("guard")): return "never";'
+        '    (_): return "other";'
+        "  }"
+        "}"
+        "print(size(5), size(-1), size(2));"
+    )
+    program.accept(Interpreter())
+    assert capsys.readouterr().out == "guard\nbig other other\n"
+
+
+def test_lazy_function_body():
+    text = (
+        "fn unused() { var; }"
+        "fn add(a, b) { return a + b; }"
+        "add(1, 2);"
+        "unused();"
+    )
+    program = Parser(RegexLexer(text), lazy_functions=True).parse()
+    interpreter = Interpreter()
+    for statement in program.statements[:2]:
+        statement.accept(interpreter)
+    assert program.statements[2].accept(interpreter) == 3
+    with pytest.raises(MissingVariableNameError):
+        program.statements[3].accept(interpreter)
+
+
+def test_execute_statements_while_parsing(tmp_path):
+    path = tmp_path / "script.txt"
+    path.write_text(
+        "var a = 0;\n"
+        "fn add(b) { a = a + b; }\n"
+        + "add(1);\n" * 1000
+        + "var;\n"
+    )
+    interpreter = Interpreter()
+    read = []
+
+    def statements(file):
+        parser = Parser(Lexer(BufferedFileStream(file, chunk_size=64)))
+        for statement in parser.parse_statements():
+            read.append(file.tell())
+            yield statement
+
+    with open(path, 'r', newline='') as f:
+        with pytest.raises(MissingVariableNameError):
+            interpreter.execute_statements(statements(f))
+    # Statements before the syntax error are executed, and the first one
+    # before the whole file is read
+    assert interpreter.environment.get("a") == 1000
+    assert read[0] < 1000 < read[-1]
+
+
+def test_execute_statements_reports_trailing_token():
+    interpreter = Interpreter()
+    parser = Parser(RegexLexer("var a = 1; )"))
+    with pytest.raises(InvalidSyntaxError):
+        interpreter.execute_statements(parser.parse_statements())
+    assert interpreter.environment.get("a") == 1
+
+
+@pytest.mark.parametrize("text", [
+    "print(1 + a);",
+    "a + a;",
+    "var a = 1; print(a / 0);",
+    "var a = 0; 0 / (a);",
+    "0 / 0;",
+    'print(1, "x" - 1);',
+    'print(1 * "x");',
+    "fn f() { return 1 + (-1) + b; } print(f());",
+    "print(1, x(1));",
+    "var a = not 1 or a; a = b;",
+    "var c = c;",
+])
+def test_shared_nodes_error_position(text):
+    def run(share: bool) -> tuple:
+        program = Parser(RegexLexer(text, "script.txt")).parse()
+        interpreter = Interpreter(share_nodes(program) if share else None)
+        with pytest.raises(RuntimeError) as e:
+            program.accept(interpreter)
+        return type(e.value), str(e.value), e.value.position
+
+    error = run(False)
+    assert error[2] is not None
+    assert run(True) == error
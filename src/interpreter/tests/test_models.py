@@ -0,0 +1,52 @@
+import pytest
+
+from interpreter.models import Environment
+from interpreter.stdlib import PrintFunction
+from interpreter.exceptions import (
+    UndefinedVariableError,
+    ConstantRedefinitionError,
+    RedefinitionError
+)
+
+
+def test_environment_semantics():
+    outer = Environment()
+    outer.define("a", None, is_const=True)
+    outer.define("b", 1)
+    inner = Environment(outer, {"b": 1, "c": 0})
+    # Nil values are defined, free slots aren't
+    assert inner.get("a") is None
+    assert inner.get("b") == 1
+    inner.define("b", 2, slot=1)
+    assert inner.get_at(0, 1, "b") == 2
+    assert inner.get_at(1, 1, "b") == 1
+    # Undefined slots are looked up by name in the outer environments
+    assert inner.get_at(0, 0, "a") is None
+    inner.assign_at(1, 1, "b", 3)
+    assert outer.get("b") == 3
+    inner.assign("b", 4)
+    assert (inner.get("b"), outer.get("b")) == (4, 3)
+    assert inner.get_definitions() == {"b": False}
+    assert outer.get_definitions() == {"a": True, "b": False}
+    assert not hasattr(inner, "__dict__")
+
+
+@pytest.mark.parametrize("action, error", [
+    (lambda env: env.define("a", 2), RedefinitionError),
+    (lambda env: env.define("x", 2, slot=0), RedefinitionError),
+    (lambda env: env.assign("a", 2), ConstantRedefinitionError),
+    (lambda env: env.assign_at(0, 0, "a", 2), ConstantRedefinitionError),
+    (lambda env: env.define_function(PrintFunction(), 2),
+     ConstantRedefinitionError),
+    (lambda env: env.get("c"), UndefinedVariableError),
+    (lambda env: env.get_at(0, 5, "c"), UndefinedVariableError),
+    (lambda env: env.assign("c", 1), UndefinedVariableError),
+    (lambda env: env.assign_at(0, 5, "c", 1), UndefinedVariableError),
+])
+def test_environment_errors(action, error):
+    environment = Environment()
+    environment.define("a", 1, is_const=True)
+    environment.define("b", 1)
+    environment.define("print", 1, is_const=True)
+    with pytest.raises(error):
+        action(environment)
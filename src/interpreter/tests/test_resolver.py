@@ -0,0 +1,149 @@
+import io
+from contextlib import redirect_stdout
+
+import pytest
+
+from lexer.lexers import RegexLexer
+from lexer.streams import Position
+
+from parser.parser import Parser
+from parser.interning import share_nodes
+
+from interpreter.interpreter import Interpreter
+from interpreter.resolver import resolve
+from interpreter.exceptions import (
+    RuntimeError,
+    UndefinedVariableError,
+    ConstantRedefinitionError
+)
+
+
+def parse(text: str):
+    return Parser(RegexLexer(text)).parse()
+
+
+def run(text: str, resolved: bool, shared: bool = False) -> tuple:
+    # Output of the program and its error
+    program = parse(text)
+    interpreter = Interpreter()
+    output = io.StringIO()
+    try:
+        with redirect_stdout(output):
+            if resolved:
+                resolve(program, interpreter.environment)
+            if shared:
+                interpreter.positions = share_nodes(program)
+            program.accept(interpreter)
+    except RuntimeError as e:
+        return output.getvalue(), (type(e), str(e), e.position)
+    return output.getvalue(), None
+
+
+@pytest.mark.parametrize("text", [
+    "var a = 1; if (a) { var b = 2; while (b) { if (b) { print(a + b); "
+    "a = a + b; b = nil; } } } print(a);",
+    "var a = 1; if (a) { print(a); var a = 2; print(a); } print(a);",
+    "fn f() { return x; } var x = 1; print(f()); x = 2; print(f());",
+    "if (true) { fn f() { return a; } var a = 2; print(f()); }",
+    "var a = 1; if (a) { fn f() { return a; } print(f()); var a = 2; "
+    "print(f()); }",
+    "fn f() { return a; } print(f());",
+    "var i = 0; while (i < 3) { var j = i; i = i + 1; print(j); }",
+    "var i = 0; while (i < 2) if (i == 0) var x = 5; else print(x); "
+    "var i = i;",
+    "if (false) var x = 1; else const x = 2; print(x); x = 3;",
+    "fn fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); } "
+    "print(fib(10));",
+    "fn counter() { var n = 0; fn inc() { n = n + 1; return n; } "
+    "return inc; } var c = counter(); c(); print(c());",
+    "fn f(a, const b) { var c = a + b; if (c) { a = c; } return a; } "
+    "print(f(1, 2));",
+    "fn f(a) { var a = 1; } f(1);",
+    "var a = 1; if (a) { a = 2; const a = 3; a = 4; }",
+    "const a = 1; if (a) { a = 2; var a; }",
+    "var c = c;",
+    "var a; const a = 1; a = 2;",
+    "fn f() {} fn f() { print(1); } f(); f = 1; print(f);",
+    "var x = 10; match (x, 2) { (>5 as y, _ as z): { print(y + z); "
+    "var w = y; print(w); } (_): print(x); } print(x);",
+    "var a = 1; match (a) { (_ as a): { print(a); a = 2; } } print(a);",
+    "match (1) { (_ as a): var b = a; } print(b);",
+    "print(print); print = 1; print;",
+])
+def test_resolved_same_as_dynamic(text):
+    assert run(text, True) == run(text, False)
+
+
+@pytest.mark.parametrize("text, error, position", [
+    ('print(1);\nprint(a);', UndefinedVariableError, Position(2, 7, 16)),
+    ("print(1);\nfn f() { b = 1; }", UndefinedVariableError,
+     Position(2, 10, 19)),
+    ("if (1) { var c = 1; }\nprint(c);", UndefinedVariableError,
+     Position(2, 7, 28)),
+    ("fn f(x) {}\nx;", UndefinedVariableError, Position(2, 1, 11)),
+    ("match (1) { (_ as y) if (y): print(y); }", UndefinedVariableError,
+     Position(1, 26, 25)),
+    ("print(1);\nconst a = 1;\na = 2;", ConstantRedefinitionError,
+     Position(3, 1, 23)),
+    ("const a = 1;\nfn f() { a = 2; }", ConstantRedefinitionError,
+     Position(2, 10, 22)),
+    ("fn f(const a) {\n  while (a) { a = 2; }\n}", ConstantRedefinitionError,
+     Position(2, 15, 30)),
+    ("const f = 1;\nfn f() {}", ConstantRedefinitionError, Position(2, 1, 13)),
+])
+def test_static_errors(text, error, position):
+    # Reported before the program starts, wherever they are
+    output, (error_type, _, error_position) = run(text, True)
+    assert output == ""
+    assert error_type is error
+    assert error_position == position
+
+
+def test_slots():
+    program = parse(
+        "var a = 1;"
+        "fn f(b) {"
+        "  while (true) { if (b) { return a + b; } }"
+        "}"
+    )
+    interpreter = Interpreter()
+    resolve(program, interpreter.environment)
+    function = program.statements[1]
+    loop_block = function.block.statements[0].body
+    binary = loop_block.statements[0].body.statements[0].expression
+    # Three scopes up to the global one, where `print` takes slot 0
+    assert (binary.left.depth, binary.left.slot) == (3, 1)
+    assert (binary.right.depth, binary.right.slot) == (2, 0)
+    assert function.block.scope == {"b": 0}
+    assert function.slot == 2
+
+
+@pytest.mark.parametrize("text", [
+    "var a = 1; if (a) { var b = a + 1; print(b + 1); } print(a + b);",
+    "fn f() { return 1 + (-1) + b; } print(f());",
+    "const a = 1; print(a + 1); fn f() { a = 2; }",
+    "var a = 1; fn f(a) { return a + -1; } print(f(2) + a);",
+])
+def test_resolved_and_shared(text):
+    # Sharing nodes changes neither the output nor the static errors
+    assert run(text, True, shared=True) == run(text, True)
+
+
+def test_resolved_identifiers_are_not_shared():
+    program = parse("var a = 1; fn f(a) { return a + 1; } print(a + 1);")
+    interpreter = Interpreter()
+    resolve(program, interpreter.environment)
+    share_nodes(program)
+    inner = program.statements[1].block.statements[0].expression
+    outer = program.statements[2].arguments[0]
+    assert inner.right is outer.right
+    assert inner.left is not outer.left
+    assert (inner.left.depth, inner.left.slot) == (0, 0)
+    assert (outer.left.depth, outer.left.slot) == (0, 1)
+
+
+def test_shared_identifiers_are_checked():
+    program = parse("print(a);")
+    share_nodes(program)
+    with pytest.raises(UndefinedVariableError):
+        resolve(program, Interpreter().environment)
@@ -0,0 +1,73 @@
+from lexer.lexers import RegexLexer
+
+from parser.parser import Parser
+
+from interpreter.interpreter import (
+    Interpreter as TreeInterpreter,
+    TYPE_CHECKS
+)
+from interpreter.resolver import resolve
+from interpreter.transpiler import (
+    TYPE_CHECK_SOURCES,
+    PythonInterpreter,
+    Transpiler,
+    transpile_program,
+    dump
+)
+from interpreter.tests.utils import run_program
+
+
+def test_type_checks_are_inlined_for_every_type():
+    assert TYPE_CHECK_SOURCES.keys() == TYPE_CHECKS.keys()
+
+
+def test_dump():
+    program = Parser(RegexLexer(
+        "fn half(a) {\n  return a / 2;\n}\n"
+        "if (half(3) > 1) print(-1);"
+    )).parse()
+    interpreter = PythonInterpreter()
+    resolve(program, interpreter.environment)
+    assert dump(transpile_program(program, interpreter)) == (
+        "def program(e0):\n"
+        "    e0.define_function(TranspiledFunction(_c0, e0), 1)  # at 1:1\n"
+        "    if ((_l1 > _r1 if type(_l1 :=\n"
+        "        call(  # at 4:5\n"
+        "        e0.get_at(0, 1, 'half'), 3)) is type(_r1 := 1) is int"
+        " else greater(_l1, _r1))):  # at 4:5\n"
+        "        (call(  # at 4:18\n"
+        "            e0.get_at(0, 0, 'print'),  # at 4:18\n"
+        "            negate(1)))  # at 4:24\n"
+        "\n"
+        "\n"
+        "def fn_half(e0):\n"
+        "    return (divide(  # at 2:12\n"
+        "        (_v if (_v := e0._values[0]) is not UNDEFINED"
+        " else e0.get_at(0, 0, 'a')), 2))  # at 2:10"
+    )
+
+
+def test_function_body_is_transpiled_once(monkeypatch):
+    transpiled = []
+    finish = Transpiler.finish
+
+    def count_finish(transpiler):
+        transpiled.append(transpiler.name)
+        return finish(transpiler)
+
+    monkeypatch.setattr(Transpiler, "finish", count_finish)
+    text = (
+        "fn inc(a) { return a + 1; }"
+        "var i = 0; while (i < 10) { i = inc(i); }"
+        "print(i);"
+    )
+    output, error = run_program(text, PythonInterpreter, True, False)
+    assert (output, error) == ("10\n", None)
+    assert transpiled == ["program", "fn_inc"]
+
+
+def test_nested_too_deeply_for_python():
+    # Nodes Python can't compile are executed by the tree interpreter
+    text = "print(" + "1 - (" * 100 + "1" + ")" * 100 + ", x);"
+    expected = run_program(text, TreeInterpreter)
+    assert run_program(text, PythonInterpreter) == expected
@@ -1,9 +1,61 @@
+import io
+from contextlib import redirect_stdout
+
 import pytest
 
+from lexer.lexers import RegexLexer
+
 from parser.tests.utils import create_parser
+from parser.parser import Parser
 from parser.models import Program
+from parser.interning import share_nodes
 from interpreter.exceptions import RuntimeError
 from interpreter.interpreter import Interpreter
+from interpreter.resolver import resolve
+
+
+# Programs run by every engine to compare their output and errors
+ENGINE_PROGRAMS = [
+    "fn fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); } "
+    "print(fib(15));",
+    "var i = 0; var s = 0; while (i < 50) { i = i + 1; s = s + i * 2 - 1; "
+    "if (s > 100 and i != 7) s = s / 3; } print(i, s);",
+    'print(1 + "2", "a" + 1, true + 1.5, 1 - true, "3" * "2", 7 / 2, '
+    "-\"4\", not 0, 1 < true, nil >= 0, print == print, 2.5 + 2.5);",
+    "fn counter() { var n = 0; fn inc() { n = n + 1; return n; } "
+    "return inc; } var c = counter(); c(); print(c(), counter()());",
+    "fn f(x) { while (true) { if (x > 3) { return x; } x = x + 1; } } "
+    "print(f(0)); fn g() { return; } print(g());",
+    "fn kind(a, b) { match (a, b) { (Num and >0 as x, _): return x; "
+    "(Str or Bool, Nil): return \"sb\"; (_, Func as f): return f; "
+    "(<=0 or \"x\" as y, _ as z): { print(y, z); } } return nil; } "
+    "print(kind(1, 2), kind(\"s\", nil), kind(0, print), kind(-1, 2));",
+    "fn f(a) { match (a, a + 1) { (>0 as x, _ as y): match (y) { "
+    "(>2 as z): return x + z; (_): return nil; } (_, _): print(a); } } "
+    "print(f(2), f(1), f(0));",
+    "var a = nil or 0 or \"\" or 3; var b = 1 and nil; print(a, b);",
+    "fn f() { return 1 + (-1) + b; } print(f());",
+    'print(1); print(1 - "x");',
+    "var n = 1; print(n / (n - 1));",
+    "match (1, 2) { (_): print(1); }",
+    "match (1, 2) { (1, 3): print(1); (_): print(2); }",
+    "const c = 1; fn f() { c = 2; } print(c); f();",
+    "var x = 1; x();",
+    "fn f(a) {} f(1, 2);",
+    "return 1;",
+    "fn f() { var s = 0; var i = 0; while (i < 4) { if (true) { "
+    "i = i + 1; } match (i) { (>2): { s = s + i; } (_): {} } } return s; } "
+    "print(f());",
+    "var g = nil; var i = 0; while (i < 2) { if (i) { if (true) { "
+    "fn h() { return i; } g = h; } } i = i + 1; } print(g());",
+    'var lim = 3; fn size(n) { match (n) { (>0) if (n > lim): return "big"; '
+    '(>0) if (n): return "small"; (_) if (0 or ""): return "never"; '
+    '(_): return "other"; } } print(size(5), size(2), size(0));',
+    'match (1) { (>5) if (print("guard")): print(1); (_) if (print("g")): '
+    'print(2); (_): print(3); }',
+    'match (1) { (_) if (1 - "x"): print(1); }',
+    "match (1) { (_ as y) if (y): print(y); }",
+]
 
 
 def create_program(text: str) -> Program:
@@ -11,6 +63,28 @@ def create_program(text: str) -> Program:
     return parser.parse()
 
 
+def run_program(
+    text: str,
+    engine: type,
+    resolved: bool = False,
+    shared: bool = False
+) -> tuple:
+    # Output of the program and its error
+    program = Parser(RegexLexer(text)).parse()
+    interpreter = engine()
+    output = io.StringIO()
+    try:
+        with redirect_stdout(output):
+            if resolved:
+                resolve(program, interpreter.environment)
+            if shared:
+                interpreter.positions = share_nodes(program)
+            program.accept(interpreter)
+    except RuntimeError as e:
+        return output.getvalue(), (type(e), str(e), e.position)
+    return output.getvalue(), None
+
+
 @pytest.mark.xfail(strict=True, reason="Utility function")
 def test_text_raises_error(text: str, error: type[RuntimeError]):
     program = create_program(text)
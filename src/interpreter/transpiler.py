@@ -0,0 +1,851 @@
+from __future__ import annotations
+
+import math
+import operator
+from dataclasses import dataclass, field
+from typing import Callable as Function
+
+from lexer.tokens import TokenType
+
+from parser.models import (
+    Program,
+    Expr,
+    Stmt,
+    BinaryExpr,
+    Visitor,
+    AssignmentExpr,
+    LiteralExpr,
+    UnaryExpr,
+    LogicalExpr,
+    GroupingExpr,
+    IdentifierExpr,
+    CallExpr,
+    BlockStmt,
+    FunctionStmt,
+    VariableStmt,
+    IfStmt,
+    WhileStmt,
+    ReturnStmt,
+    MatchStmt,
+    ComparePatternExpr,
+    TypePatternExpr
+)
+
+from interpreter.interpreter import Interpreter, TYPE_CHECKS
+from interpreter.models import (
+    UNDEFINED,
+    Environment,
+    Callable,
+    UserDefinedFunction
+)
+from interpreter.exceptions import (
+    RuntimeError,
+    Return,
+    NumberConversionError,
+    UndefinedVariableError,
+    UndefinedFunctionError,
+    DivisionByZeroError,
+    InvalidArgumentNumberError
+)
+
+# Node whose position a line of the generated code gives to an error
+# raised on it, and the nodes an undefined variable error goes through
+# before it leaves the code, innermost first, see `locate_error`
+Location = tuple[Stmt, tuple[Stmt, ...]]
+
+# Python operators and runtime helpers of the comparisons, the operators
+# are used for two integers and the helpers convert other operands
+COMPARISONS = {
+    TokenType.GREATER_EQUAL: (">=", "greater_equal"),
+    TokenType.GREATER: (">", "greater"),
+    TokenType.LESS_EQUAL: ("<=", "less_equal"),
+    TokenType.LESS: ("<", "less"),
+    TokenType.EQUAL_EQUAL: ("==", "equal"),
+    TokenType.BANG_EQUAL: ("!=", "not_equal"),
+}
+
+ARITHMETIC = {
+    TokenType.MINUS: ("-", "subtract"),
+    TokenType.STAR: ("*", "multiply"),
+}
+
+# Source of the checks of `TYPE_CHECKS` inlined into the generated code
+TYPE_CHECK_SOURCES = {
+    TokenType.STRING_TYPE: "isinstance({}, str)",
+    TokenType.NUMBER_TYPE: "isinstance({}, (int, float))",
+    TokenType.BOOL_TYPE: "isinstance({}, bool)",
+    TokenType.FUNCTION_TYPE: "isinstance({}, Callable)",
+    TokenType.NIL_TYPE: "{} is None",
+}
+
+# Types of numbers the helpers use as they are, without converting them
+NUMBERS = (int, float)
+
+# Separates a marker from the generated code around it, see `mark`
+MARKER = "\0"
+
+
+@dataclass(eq=False, slots=True)
+class Unit:
+    """Python source generated for a function body or for a node executed
+    on its own, a single function taking the environment, and the function
+    compiled from it. The function is `None` if the source is nested too
+    deeply for the compiler of Python."""
+    name: str
+    source: str
+    # Locations of the lines of the source which can raise an error,
+    # numbered from 1
+    source_map: dict[int, Location] = field(default_factory=dict)
+    functions: list[FunctionSource] = field(default_factory=list)
+    function: Function[[Environment], any] | None = None
+
+
+class FunctionSource:
+    """Declaration of a function and its body transpiled on the first call
+    of any function created by it, so the body of a lazy block is parsed
+    then, and a syntax error in it is raised on every call."""
+
+    __slots__ = ("declaration", "interpreter", "_unit")
+
+    def __init__(
+        self,
+        declaration: FunctionStmt,
+        interpreter: PythonInterpreter
+    ):
+        self.declaration = declaration
+        self.interpreter = interpreter
+        self._unit: Unit | None = None
+
+    @property
+    def unit(self) -> Unit:
+        if self._unit is None:
+            name = self.declaration.name
+            transpiler = Transpiler(
+                self.interpreter,
+                f"fn_{name}" if name.isidentifier() else "fn",
+                True
+            )
+            for statement in self.declaration.block.statements:
+                transpiler.statement(statement)
+            self._unit = transpiler.finish()
+        return self._unit
+
+    def __repr__(self) -> str:
+        return f"<function {self.declaration.name}>"
+
+
+class TranspiledFunction(UserDefinedFunction):
+    def __init__(self, source: FunctionSource, closure: Environment):
+        super().__init__(source.declaration, closure)
+        self.source = source
+
+    def call(self, interpreter, arguments):
+        function = self.source.unit.function
+        if function is None:
+            return super().call(interpreter, arguments)
+        declaration = self.declaration
+        environment = Environment(self.closure, declaration.block.scope)
+        for param, arg in zip(declaration.params, arguments):
+            environment.define(param.name, arg, param.is_const, param.slot)
+        return function(environment)
+
+
+def runtime(interpreter: Interpreter) -> dict[str, any]:
+    """Names the generated code refers to besides its constants. Values
+    are converted by the helpers of the interpreter, and errors are raised
+    without positions, which are found by `locate_error` from the lines
+    raising them."""
+    to_number = interpreter.try_cast_to_number
+    cast = interpreter._cast_binary_operands_to_common_type
+    int_or_float = interpreter._int_or_float
+
+    def conversion_error(left, right, new_left) -> NumberConversionError:
+        error = NumberConversionError(
+            left if new_left is None else right,
+            position=None
+        )
+        # The operand of a binary expression the position is taken from
+        error.is_left = new_left is None
+        return error
+
+    def add(left, right):
+        left, right = cast(left, right)
+        result = left + right
+        if isinstance(result, float):
+            return int_or_float(result)
+        return result
+
+    def subtract(left, right):
+        new_left = to_number(left)
+        new_right = to_number(right)
+        if new_left is None or new_right is None:
+            raise conversion_error(left, right, new_left)
+        return int_or_float(new_left - new_right)
+
+    def multiply(left, right):
+        new_left = to_number(left)
+        new_right = to_number(right)
+        if new_left is None or new_right is None:
+            raise conversion_error(left, right, new_left)
+        return int_or_float(new_left * new_right)
+
+    def divide(left, right):
+        if type(left) in NUMBERS and type(right) in NUMBERS and right:
+            return int_or_float(left / right)
+        new_left = to_number(left)
+        new_right = to_number(right)
+        if new_left is None or new_right is None:
+            raise conversion_error(left, right, new_left)
+        if new_right == 0:
+            raise DivisionByZeroError(position=None)
+        return int_or_float(new_left / new_right)
+
+    def negate(value):
+        number = to_number(value)
+        if number is None:
+            raise NumberConversionError(value, position=None)
+        return -number
+
+    def comparison(function: Function[[any, any], bool]) -> Function:
+        def compare(left, right):
+            if type(left) in NUMBERS and type(right) in NUMBERS:
+                return function(left, right)
+            return function(*cast(left, right))
+        return compare
+
+    def call(function, *arguments):
+        if not isinstance(function, Callable):
+            raise UndefinedFunctionError(function, position=None)
+        arity = function.arity
+        if arity is not None and len(arguments) != arity:
+            raise InvalidArgumentNumberError(
+                function.name,
+                arity,
+                len(arguments),
+                position=None
+            )
+        return function.call(interpreter, arguments)
+
+    def assign(environment, name, value):
+        environment.assign(name, value)
+        return value
+
+    def assign_at(environment, slot, name, value):
+        environment.assign_at(0, slot, name, value)
+        return value
+
+    def raise_return(value):
+        raise Return(value, position=None)
+
+    def match_error(expected, got):
+        raise InvalidArgumentNumberError("case", expected, got, position=None)
+
+    return {
+        "UNDEFINED": UNDEFINED,
+        "Environment": Environment,
+        "Callable": Callable,
+        "TranspiledFunction": TranspiledFunction,
+        "add": add,
+        "subtract": subtract,
+        "multiply": multiply,
+        "divide": divide,
+        "negate": negate,
+        "greater_equal": comparison(operator.ge),
+        "greater": comparison(operator.gt),
+        "less_equal": comparison(operator.le),
+        "less": comparison(operator.lt),
+        "equal": comparison(operator.eq),
+        "not_equal": comparison(operator.ne),
+        "call": call,
+        "assign": assign,
+        "assign_at": assign_at,
+        "raise_return": raise_return,
+        "match_error": match_error,
+    }
+
+
+def transpile_node(node: Stmt, interpreter: PythonInterpreter) -> Unit:
+    """Transpiles a node to be executed on its own. The function returns
+    the value of an expression, and `None` after a statement."""
+    transpiler = Transpiler(interpreter, "node", False)
+    if isinstance(node, Expr):
+        value = node.accept(transpiler)
+        transpiler.write(transpiler.wrap("return (", value, ")"))
+    else:
+        node.accept(transpiler)
+    return transpiler.finish()
+
+
+def transpile_program(
+    program: Program,
+    interpreter: PythonInterpreter
+) -> Unit:
+    transpiler = Transpiler(interpreter, "program", False)
+    program.accept(transpiler)
+    return transpiler.finish()
+
+
+def dump(unit: Unit) -> str:
+    """Lists the source of the unit, with the positions of the nodes of
+    its lines, followed by the sources of the functions declared in it,
+    which are transpiled if they haven't been called yet."""
+    lines = []
+    for number, line in enumerate(unit.source.splitlines(), 1):
+        location = unit.source_map.get(number)
+        position = None if location is None else location[0].position
+        if position is not None:
+            line += f"  # at {position.line}:{position.column}"
+        lines.append(line)
+    for function in unit.functions:
+        lines.append("")
+        lines.append("")
+        lines.append(dump(function.unit))
+    return "\n".join(lines)
+
+
+class Transpiler(Visitor):
+    """Generates the source of a Python function executing nodes in the
+    environment it takes. Expressions become Python expressions and
+    statements become statements, so loops, conditions and `return` run
+    as Python bytecode, with no dispatch on the types of the nodes.
+
+    Environments are kept as in `Interpreter`, in the locals `e0`, `e1`,
+    ... of the blocks the code is in, so a resolved variable is read
+    from its environment, and from its slot right away in environments
+    created by the code, which have all the slots of their scopes.
+    Operators on two integers are Python operators, other operands are
+    converted by the helpers of `runtime`.
+
+    Every node which can raise an error starts a line of its own, mapped
+    to the node and the nodes around it in the source map of the unit."""
+
+    def __init__(
+        self,
+        interpreter: PythonInterpreter,
+        name: str,
+        in_function: bool
+    ):
+        self.interpreter = interpreter
+        self.name = name
+        self.in_function = in_function
+        self.lines = [f"def {name}(e0):"]
+        self.source_map: dict[int, Location] = {}
+        self.constants: dict[str, any] = {}
+        self.functions: list[FunctionSource] = []
+        self.ancestors: list[Stmt] = []
+        # Locations of the markers, by their numbers
+        self.locations: list[Location] = []
+        # Locals of the environments of the scopes around the code, from
+        # the outermost, and whether they have all the slots of their scope
+        self.environments = [("e0", in_function)]
+        self.indent = 1
+        self.temporaries = 0
+        # Local holding the value a pattern is matched against
+        self.matched = ""
+
+    def finish(self) -> Unit:
+        if len(self.lines) == 1:
+            self.lines.append("    pass")
+        unit = Unit(
+            self.name,
+            "\n".join(self.lines) + "\n",
+            self.source_map,
+            self.functions
+        )
+        namespace = dict(self.interpreter.runtime)
+        namespace.update(self.constants)
+        namespace["_source_map"] = self.source_map
+        try:
+            code = compile(unit.source, f"<transpiled {self.name}>", "exec")
+        except (SyntaxError, RecursionError, MemoryError):
+            # Nested too deeply, the unit is executed by the tree
+            # interpreter instead
+            return unit
+        exec(code, namespace)
+        unit.function = namespace[self.name]
+        return unit
+
+    def write(self, text: str) -> None:
+        # Every marker in the text starts a line mapped to its location,
+        # which continues the statement inside its brackets
+        parts = text.split(MARKER)
+        lines = [(parts[0], None)]
+        for index in range(1, len(parts), 2):
+            location = self.locations[int(parts[index])]
+            lines.append((parts[index + 1], location))
+        if not parts[0] and len(lines) > 1:
+            del lines[0]
+        indent = "    " * self.indent
+        for line, location in lines:
+            self.lines.append((indent + line).rstrip())
+            if location is not None:
+                self.source_map[len(self.lines)] = location
+            indent = "    " * (self.indent + 1)
+
+    def wrap(self, prefix: str, text: str, suffix: str) -> str:
+        # A marker at the start of the text is moved before the prefix,
+        # which can't raise an error, so it doesn't take a line of its own
+        if text.startswith(MARKER):
+            end = text.index(MARKER, 1) + 1
+            return text[:end] + prefix + text[end:] + suffix
+        return prefix + text + suffix
+
+    def mark(self, node: Stmt) -> str:
+        # The text following the marker starts a line raising errors at
+        # the node. The node executed on its own isn't in the ancestors,
+        # it's located by `Interpreter.execute`
+        self.locations.append((node, tuple(reversed(self.ancestors))))
+        return f"{MARKER}{len(self.locations) - 1}{MARKER}"
+
+    def constant(self, value: any) -> str:
+        name = f"_c{len(self.constants)}"
+        self.constants[name] = value
+        return name
+
+    def temporary(self) -> int:
+        self.temporaries += 1
+        return self.temporaries
+
+    def expression(self, expr: Expr) -> str:
+        self.ancestors.append(expr)
+        text = expr.accept(self)
+        self.ancestors.pop()
+        return text
+
+    def statement(self, stmt: Stmt) -> None:
+        self.ancestors.append(stmt)
+        if isinstance(stmt, AssignmentExpr):
+            self._assignment_statement(stmt)
+        elif isinstance(stmt, Expr):
+            self.write(self.wrap("(", stmt.accept(self), ")"))
+        else:
+            stmt.accept(self)
+        self.ancestors.pop()
+
+    def suite(self, stmt: Stmt) -> None:
+        # The indented body of a Python statement
+        self.indent += 1
+        count = len(self.lines)
+        self.statement(stmt)
+        if len(self.lines) == count:
+            self.write("pass")
+        self.indent -= 1
+
+    def _environment(self, depth: int) -> tuple[str, bool]:
+        # The environment `depth` levels up, and whether it was created by
+        # the code with the slots of its scope. The environment the code
+        # is executed in is created so only for the body of a function
+        index = len(self.environments) - 1 - depth
+        if index < 0:
+            return "e0" + ".enclosing" * -index, False
+        return self.environments[index]
+
+    def _enter_scope(self, scope: dict[str, int] | None, body: Stmt) -> str:
+        # A resolved scope declaring no variables gets no environment of
+        # its own unless a function declared in it could capture one, its
+        # variables are looked up in the enclosing scopes anyway
+        current = self.environments[-1][0]
+        if scope == {} and not _declares_function(body):
+            self.environments.append(self.environments[-1])
+            return current
+        environment = f"e{len(self.environments)}"
+        self.write(
+            f"{environment} = Environment({current}, {self.constant(scope)})"
+        )
+        self.environments.append((environment, True))
+        return environment
+
+    def visit_program(self, program: Program):
+        for statement in program.statements:
+            self.statement(statement)
+
+    def visit_assignment_expr(self, expr: AssignmentExpr):
+        mark = self.mark(expr)
+        value = self.expression(expr.value)
+        name = repr(expr.name)
+        if expr.depth is None:
+            environment = self.environments[-1][0]
+            return f"{mark}assign({environment}, {name}, {value})"
+        environment, _ = self._environment(expr.depth)
+        return (
+            f"{mark}assign_at({environment}, {expr.slot}, {name}, {value})"
+        )
+
+    def _assignment_statement(self, expr: AssignmentExpr) -> None:
+        # The value isn't needed, and a variable of an environment created
+        # by the code is set in its slot if it's defined and not constant
+        mark = self.mark(expr)
+        value = self.expression(expr.value)
+        name = repr(expr.name)
+        if expr.depth is None:
+            environment = self.environments[-1][0]
+            self.write(f"{mark}{environment}.assign({name}, {value})")
+            return
+        environment, presized = self._environment(expr.depth)
+        slot = expr.slot
+        assign = (
+            f"{mark}{environment}.assign_at(0, {slot}, {name}, {value})"
+        )
+        if not presized:
+            self.write(assign)
+            return
+        self.write(
+            f"if {environment}._values[{slot}] is not UNDEFINED"
+            f" and not {environment}._consts >> {slot} & 1:"
+        )
+        self.indent += 1
+        self.write(
+            self.wrap(f"{environment}._values[{slot}] = (", value, ")")
+        )
+        self.indent -= 1
+        self.write("else:")
+        self.indent += 1
+        self.write(assign)
+        self.indent -= 1
+
+    def visit_binary(self, expr: BinaryExpr):
+        operator = expr.operator
+        if operator == TokenType.PLUS:
+            symbol, helper = "+", "add"
+        elif operator in ARITHMETIC:
+            symbol, helper = ARITHMETIC[operator]
+        elif operator in COMPARISONS:
+            symbol, helper = COMPARISONS[operator]
+        elif operator == TokenType.SLASH:
+            mark = self.mark(expr)
+            left = self.expression(expr.left)
+            right = self.expression(expr.right)
+            return f"{mark}divide({left}, {right})"
+        else:
+            return "None"
+        mark = self.mark(expr) if operator in ARITHMETIC else ""
+        left = self.expression(expr.left)
+        right = self.expression(expr.right)
+        number = self.temporary()
+        left_name, right_name = f"_l{number}", f"_r{number}"
+        # Both operands are evaluated before their types are compared
+        return (
+            f"{mark}({left_name} {symbol} {right_name}"
+            f" if type({left_name} := {left})"
+            f" is type({right_name} := {right}) is int"
+            f"{mark} else {helper}({left_name}, {right_name}))"
+        )
+
+    def visit_literal(self, expr: LiteralExpr):
+        value = expr.value
+        if isinstance(value, float) and not math.isfinite(value):
+            return self.constant(value)
+        return repr(value)
+
+    def visit_unary(self, expr: UnaryExpr):
+        if expr.operator == TokenType.MINUS:
+            mark = self.mark(expr)
+            return f"{mark}negate({self.expression(expr.right)})"
+        right = self.expression(expr.right)
+        if expr.operator == TokenType.NOT:
+            return f"(not {right})"
+        return f"({right}, None)[1]"
+
+    def visit_logical(self, expr: LogicalExpr):
+        left = self.expression(expr.left)
+        right = self.expression(expr.right)
+        if expr.operator == TokenType.OR:
+            return f"({left} or {right})"
+        return f"({left} and {right})"
+
+    def visit_grouping(self, expr: GroupingExpr):
+        return self.expression(expr.expression)
+
+    def visit_identifier(self, expr: IdentifierExpr):
+        mark = self.mark(expr)
+        name = repr(expr.name)
+        if expr.depth is None:
+            return f"{mark}{self.environments[-1][0]}.get({name})"
+        environment, presized = self._environment(expr.depth)
+        slot = expr.slot
+        get = f"{environment}.get_at(0, {slot}, {name})"
+        if not presized:
+            return f"{mark}{get}"
+        # `Environment.get_at` for a defined variable
+        return (
+            f"{mark}(_v if (_v := {environment}._values[{slot}])"
+            f" is not UNDEFINED else {get})"
+        )
+
+    def visit_call(self, expr: CallExpr):
+        mark = self.mark(expr)
+        values = [self.expression(expr.callee)]
+        values.extend(self.expression(arg) for arg in expr.arguments)
+        return f"{mark}call({', '.join(values)})"
+
+    def visit_block_stmt(self, stmt: BlockStmt):
+        self._enter_scope(stmt.scope, stmt)
+        for statement in stmt.statements:
+            self.statement(statement)
+        self.environments.pop()
+
+    def visit_function_stmt(self, stmt: FunctionStmt):
+        source = FunctionSource(stmt, self.interpreter)
+        self.functions.append(source)
+        environment = self.environments[-1][0]
+        self.write(
+            f"{self.mark(stmt)}{environment}.define_function("
+            f"TranspiledFunction({self.constant(source)}, {environment}),"
+            f" {stmt.slot})"
+        )
+
+    def visit_variable_stmt(self, stmt: VariableStmt):
+        mark = self.mark(stmt)
+        value = "None"
+        if stmt.expression:
+            value = self.expression(stmt.expression)
+        name, is_const, slot = repr(stmt.name), stmt.is_const, stmt.slot
+        environment, presized = self.environments[-1]
+        define = (
+            f"{mark}{environment}.define({name}, {value}, {is_const}, {slot})"
+        )
+        if slot is None or not presized:
+            self.write(define)
+            return
+        # `Environment.define` in a slot of the scope
+        self.write(f"if {environment}._values[{slot}] is UNDEFINED:")
+        self.indent += 1
+        self.write(
+            self.wrap(f"{environment}._values[{slot}] = (", value, ")")
+        )
+        if is_const:
+            self.write(f"{environment}._consts |= {1 << slot}")
+        self.indent -= 1
+        self.write("else:")
+        self.indent += 1
+        self.write(define)
+        self.indent -= 1
+
+    def visit_if_stmt(self, stmt: IfStmt):
+        condition = self.expression(stmt.condition)
+        self.write(self.wrap("if (", condition, "):"))
+        self.suite(stmt.body)
+        if stmt.body_else:
+            self.write("else:")
+            self.suite(stmt.body_else)
+
+    def visit_while_stmt(self, stmt: WhileStmt):
+        condition = self.expression(stmt.condition)
+        self.write(self.wrap("while (", condition, "):"))
+        self.suite(stmt.body)
+
+    def visit_return_stmt(self, stmt: ReturnStmt):
+        value = "None"
+        if stmt.expression is not None:
+            value = self.expression(stmt.expression)
+        if self.in_function:
+            self.write(self.wrap("return (", value, ")"))
+        else:
+            self.write(f"{self.mark(stmt)}raise_return({value})")
+
+    def visit_match_stmt(self, stmt: MatchStmt):
+        values = []
+        for argument in stmt.arguments:
+            name = f"_m{self.temporary()}"
+            value = self.expression(argument)
+            self.write(self.wrap(f"{name} = (", value, ")"))
+            values.append(name)
+        keyword = "if"
+        for case in stmt.case_blocks:
+            if len(case.patterns) != len(values):
+                # Raised only if no case before matches
+                if keyword != "if":
+                    self.write("else:")
+                    self.indent += 1
+                self.write(
+                    f"{self.mark(stmt)}match_error("
+                    f"{len(values)}, {len(case.patterns)})"
+                )
+                if keyword != "if":
+                    self.indent -= 1
+                break
+            # Every pattern is evaluated, as by `Interpreter`
+            patterns = [
+                self._pattern(pattern.pattern, value)
+                for pattern, value in zip(case.patterns, values)
+            ]
+            if not patterns:
+                condition = "True"
+            elif len(patterns) == 1:
+                condition = patterns[0]
+            else:
+                condition = f"all([{', '.join(patterns)}])"
+            if case.guard is not None:
+                guard = self.expression(case.guard.condition)
+                condition = f"{condition} and {guard}"
+            self.write(self.wrap(f"{keyword} (", condition, "):"))
+            keyword = "elif"
+            self.indent += 1
+            count = len(self.lines)
+            environment = self._enter_scope(case.scope, case.body)
+            for pattern, value in zip(case.patterns, values):
+                if pattern.name is not None:
+                    self.write(
+                        f"{environment}.define("
+                        f"{pattern.name!r}, {value}, False, {pattern.slot})"
+                    )
+            self.statement(case.body)
+            self.environments.pop()
+            if len(self.lines) == count:
+                self.write("pass")
+            self.indent -= 1
+
+    def _pattern(self, pattern: Expr | None, value: str) -> str:
+        # Whether the value in the local matches the pattern
+        if pattern is None:
+            return "True"
+        if isinstance(pattern, LogicalExpr):
+            left = self._pattern(pattern.left, value)
+            right = self._pattern(pattern.right, value)
+            if pattern.operator == TokenType.OR:
+                return f"({left} or {right})"
+            return f"({left} and {right})"
+        self.matched = value
+        return pattern.accept(self)
+
+    def visit_compare_pattern_expr(self, stmt: ComparePatternExpr):
+        value = self.matched
+        right = self.expression(stmt.right)
+        symbol, helper = COMPARISONS[stmt.operator]
+        right_name = f"_r{self.temporary()}"
+        return (
+            f"({value} {symbol} {right_name}"
+            f" if type({value}) is type({right_name} := {right}) is int"
+            f" else {helper}({value}, {right_name}))"
+        )
+
+    def visit_type_pattern_expr(self, stmt: TypePatternExpr):
+        if stmt.type not in TYPE_CHECKS:
+            return "None"
+        return TYPE_CHECK_SOURCES[stmt.type].format(self.matched)
+
+
+def _declares_function(stmt: Stmt) -> bool:
+    # Whether a function is declared in the statement or in the bodies of
+    # the statements in it
+    if isinstance(stmt, FunctionStmt):
+        return True
+    if isinstance(stmt, BlockStmt):
+        return any(_declares_function(child) for child in stmt.statements)
+    if isinstance(stmt, IfStmt):
+        return _declares_function(stmt.body) or (
+            stmt.body_else is not None
+            and _declares_function(stmt.body_else)
+        )
+    if isinstance(stmt, WhileStmt):
+        return _declares_function(stmt.body)
+    if isinstance(stmt, MatchStmt):
+        return any(
+            _declares_function(case.body) for case in stmt.case_blocks
+        )
+    return False
+
+
+def locate_error(error: RuntimeError, interpreter: Interpreter) -> None:
+    """Gives an error raised by the generated code the position of the
+    node of the line raising it, and locates an undefined variable error
+    in shared nodes through the lines of the functions it went through,
+    as `Interpreter.execute` does through the nodes.
+
+    Only frames up to the next unit executed by `PythonInterpreter` are
+    looked at, which has located the error already."""
+    locations = []
+    nested = False
+    # Whether the error comes from the call of a function, rather than
+    # from the line of the innermost unit
+    from_call = False
+    traceback = error.__traceback__.tb_next
+    while traceback is not None:
+        frame = traceback.tb_frame
+        if frame.f_code is PythonInterpreter.run_transpiled.__code__:
+            nested = True
+            break
+        source_map = frame.f_globals.get("_source_map")
+        if source_map is not None:
+            locations.append(source_map.get(traceback.tb_lineno))
+            from_call = False
+        elif frame.f_code is TranspiledFunction.call.__code__:
+            from_call = True
+        traceback = traceback.tb_next
+    if not locations:
+        return
+    innermost = locations[-1]
+    if (
+        error.position is None
+        and not nested
+        and not from_call
+        and innermost is not None
+    ):
+        node = innermost[0]
+        if isinstance(node, BinaryExpr):
+            error.position = interpreter.get_operand_position(
+                node,
+                getattr(error, "is_left", False)
+            )
+        else:
+            error.position = node.position
+    if isinstance(error, UndefinedVariableError):
+        for location in reversed(locations):
+            if location is not None:
+                for node in location[1]:
+                    interpreter._locate_error(error, node)
+
+
+def _transpiled(visit: Function) -> Function:
+    # A visit method running the transpiled node, or the method of the
+    # tree interpreter if the node is nested too deeply to be compiled
+    def run(interpreter: PythonInterpreter, node: Stmt):
+        return interpreter.run_transpiled(node, visit)
+    return run
+
+
+class PythonInterpreter(Interpreter):
+    """Executes every node given to it, and a program as a whole, by
+    transpiling it with `Transpiler` and calling the compiled function.
+    Nodes inside it are transpiled once with it, and bodies of functions
+    on their first call."""
+
+    def __init__(self, positions=None):
+        super().__init__(positions)
+        self.runtime = runtime(self)
+
+    def visit_program(self, program: Program):
+        unit = transpile_program(program, self)
+        if unit.function is None:
+            return super().visit_program(program)
+        try:
+            unit.function(self.environment)
+        except RuntimeError as e:
+            locate_error(e, self)
+            raise
+
+    def run_transpiled(self, node: Stmt, visit: Function):
+        unit = transpile_node(node, self)
+        if unit.function is None:
+            return visit(self, node)
+        try:
+            return unit.function(self.environment)
+        except RuntimeError as e:
+            locate_error(e, self)
+            raise
+
+    visit_assignment_expr = _transpiled(Interpreter.visit_assignment_expr)
+    visit_binary = _transpiled(Interpreter.visit_binary)
+    visit_literal = _transpiled(Interpreter.visit_literal)
+    visit_unary = _transpiled(Interpreter.visit_unary)
+    visit_logical = _transpiled(Interpreter.visit_logical)
+    visit_grouping = _transpiled(Interpreter.visit_grouping)
+    visit_identifier = _transpiled(Interpreter.visit_identifier)
+    visit_call = _transpiled(Interpreter.visit_call)
+    visit_block_stmt = _transpiled(Interpreter.visit_block_stmt)
+    visit_function_stmt = _transpiled(Interpreter.visit_function_stmt)
+    visit_variable_stmt = _transpiled(Interpreter.visit_variable_stmt)
+    visit_if_stmt = _transpiled(Interpreter.visit_if_stmt)
+    visit_while_stmt = _transpiled(Interpreter.visit_while_stmt)
+    visit_return_stmt = _transpiled(Interpreter.visit_return_stmt)
+    visit_match_stmt = _transpiled(Interpreter.visit_match_stmt)
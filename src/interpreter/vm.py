@@ -0,0 +1,472 @@
+from parser.models import Expr, Stmt
+
+from interpreter.interpreter import Interpreter, TYPE_CHECKS
+from interpreter.models import (
+    UNDEFINED,
+    Environment,
+    Callable,
+    UserDefinedFunction
+)
+from interpreter.bytecode import Opcode, Code, FunctionBody, compile_node
+from interpreter.exceptions import (
+    Return,
+    NumberConversionError,
+    UndefinedVariableError,
+    UndefinedFunctionError,
+    RedefinitionError,
+    ConstantRedefinitionError,
+    DivisionByZeroError,
+    InvalidArgumentNumberError
+)
+
+# Opcodes as plain integers, which are compared with the instructions
+# faster than the members of the enum
+CONST = Opcode.CONST.value
+POP = Opcode.POP.value
+GET_NAME = Opcode.GET_NAME.value
+GET_SLOT = Opcode.GET_SLOT.value
+SET_NAME = Opcode.SET_NAME.value
+SET_SLOT = Opcode.SET_SLOT.value
+DEFINE_NAME = Opcode.DEFINE_NAME.value
+DEFINE_SLOT = Opcode.DEFINE_SLOT.value
+DEFINE_FUNCTION = Opcode.DEFINE_FUNCTION.value
+ADD = Opcode.ADD.value
+SUBTRACT = Opcode.SUBTRACT.value
+MULTIPLY = Opcode.MULTIPLY.value
+DIVIDE = Opcode.DIVIDE.value
+EQUAL = Opcode.EQUAL.value
+NOT_EQUAL = Opcode.NOT_EQUAL.value
+LESS = Opcode.LESS.value
+LESS_EQUAL = Opcode.LESS_EQUAL.value
+GREATER = Opcode.GREATER.value
+GREATER_EQUAL = Opcode.GREATER_EQUAL.value
+NEGATE = Opcode.NEGATE.value
+NOT = Opcode.NOT.value
+JUMP = Opcode.JUMP.value
+POP_JUMP_IF_FALSE = Opcode.POP_JUMP_IF_FALSE.value
+JUMP_IF_TRUE_OR_POP = Opcode.JUMP_IF_TRUE_OR_POP.value
+JUMP_IF_FALSE_OR_POP = Opcode.JUMP_IF_FALSE_OR_POP.value
+CALL = Opcode.CALL.value
+RETURN = Opcode.RETURN.value
+RAISE_RETURN = Opcode.RAISE_RETURN.value
+PUSH_SCOPE = Opcode.PUSH_SCOPE.value
+POP_SCOPE = Opcode.POP_SCOPE.value
+LOAD_MATCH = Opcode.LOAD_MATCH.value
+IS_TYPE = Opcode.IS_TYPE.value
+ALL = Opcode.ALL.value
+POP_N = Opcode.POP_N.value
+MATCH_ERROR = Opcode.MATCH_ERROR.value
+
+
+class BytecodeFunction(UserDefinedFunction):
+    def __init__(self, body: FunctionBody, closure: Environment):
+        super().__init__(body.declaration, closure)
+        self.body = body
+
+    def call(self, interpreter, arguments):
+        declaration = self.declaration
+        environment = Environment(self.closure, declaration.block.scope)
+        for param, arg in zip(declaration.params, arguments):
+            environment.define(param.name, arg, param.is_const, param.slot)
+        return interpreter.vm.run(self.body.code, environment)
+
+
+class VirtualMachine:
+    """Executes the code made by `BytecodeCompiler` on a stack of values,
+    one iteration of a loop per instruction, with the most frequent
+    opcodes checked first. Every call of a function runs the code of its
+    body in a new `run`, in the environment of the call.
+
+    Values are converted by the helpers of the interpreter and variables
+    are kept in environments, so the results and errors are the same as
+    of `Interpreter`. Operators on two integers skip the conversions."""
+
+    def __init__(self, interpreter: Interpreter):
+        self.interpreter = interpreter
+
+    def run(self, code: Code, environment: Environment):
+        interpreter = self.interpreter
+        cast = interpreter._cast_binary_operands_to_common_type
+        instructions = code.instructions
+        constants = code.constants
+        names = code.names
+        nodes = code.nodes
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        # Offset of the current instruction, moved past it only after it
+        # succeeds, so the instruction raising an error can be located
+        ip = 0
+        try:
+            while True:
+                op = instructions[ip]
+                if op == GET_SLOT:
+                    # `Environment.get_at`, inlined for defined variables
+                    scope = environment
+                    depth = instructions[ip + 1]
+                    while depth:
+                        scope = scope.enclosing
+                        depth -= 1
+                    values = scope._values
+                    slot = instructions[ip + 2]
+                    if slot < len(values) and values[slot] is not UNDEFINED:
+                        push(values[slot])
+                    else:
+                        try:
+                            push(environment.get_at(
+                                instructions[ip + 1],
+                                slot,
+                                names[instructions[ip + 3]]
+                            ))
+                        except UndefinedVariableError:
+                            raise UndefinedVariableError(
+                                names[instructions[ip + 3]],
+                                nodes[instructions[ip + 4]].position
+                            )
+                    ip += 5
+                elif op == GET_NAME:
+                    name = names[instructions[ip + 1]]
+                    try:
+                        push(environment.get(name))
+                    except UndefinedVariableError:
+                        raise UndefinedVariableError(
+                            name,
+                            nodes[instructions[ip + 2]].position
+                        )
+                    ip += 3
+                elif op == CONST:
+                    push(constants[instructions[ip + 1]])
+                    ip += 2
+                elif op == ADD:
+                    right = pop()
+                    left = stack[-1]
+                    if type(left) is int and type(right) is int:
+                        stack[-1] = left + right
+                    else:
+                        left, right = cast(left, right)
+                        result = left + right
+                        if isinstance(result, float):
+                            result = interpreter._int_or_float(result)
+                        stack[-1] = result
+                    ip += 1
+                elif op == POP_JUMP_IF_FALSE:
+                    if pop():
+                        ip += 2
+                    else:
+                        ip = instructions[ip + 1]
+                elif op == SET_SLOT:
+                    # `Environment.assign_at`, inlined for defined variables
+                    scope = environment
+                    depth = instructions[ip + 1]
+                    while depth:
+                        scope = scope.enclosing
+                        depth -= 1
+                    values = scope._values
+                    slot = instructions[ip + 2]
+                    if (
+                        slot < len(values)
+                        and values[slot] is not UNDEFINED
+                        and not scope._consts >> slot & 1
+                    ):
+                        values[slot] = stack[-1]
+                    else:
+                        name = names[instructions[ip + 3]]
+                        try:
+                            environment.assign_at(
+                                instructions[ip + 1],
+                                slot,
+                                name,
+                                stack[-1]
+                            )
+                        except (
+                            UndefinedVariableError,
+                            ConstantRedefinitionError
+                        ) as e:
+                            raise e.__class__(
+                                name,
+                                position=nodes[instructions[ip + 4]].position
+                            )
+                    ip += 5
+                elif op == SET_NAME:
+                    name = names[instructions[ip + 1]]
+                    try:
+                        environment.assign(name, stack[-1])
+                    except (
+                        UndefinedVariableError,
+                        ConstantRedefinitionError
+                    ) as e:
+                        raise e.__class__(
+                            name,
+                            position=nodes[instructions[ip + 2]].position
+                        )
+                    ip += 3
+                elif op == POP:
+                    pop()
+                    ip += 1
+                elif op == LESS:
+                    right = pop()
+                    left = stack[-1]
+                    if type(left) is not int or type(right) is not int:
+                        left, right = cast(left, right)
+                    stack[-1] = left < right
+                    ip += 1
+                elif op == SUBTRACT:
+                    right = pop()
+                    left = stack[-1]
+                    if type(left) is int and type(right) is int:
+                        stack[-1] = left - right
+                    else:
+                        stack[-1] = self._arithmetic(
+                            op,
+                            left,
+                            right,
+                            nodes[instructions[ip + 1]]
+                        )
+                    ip += 2
+                elif op == CALL:
+                    count = instructions[ip + 1]
+                    if count:
+                        arguments = stack[-count:]
+                        del stack[-count:]
+                    else:
+                        arguments = []
+                    function = pop()
+                    if not isinstance(function, Callable):
+                        raise UndefinedFunctionError(
+                            function,
+                            nodes[instructions[ip + 2]].position
+                        )
+                    arity = function.arity
+                    if arity is not None and count != arity:
+                        raise InvalidArgumentNumberError(
+                            function.name,
+                            arity,
+                            count,
+                            nodes[instructions[ip + 2]].position
+                        )
+                    push(function.call(interpreter, arguments))
+                    ip += 3
+                elif op == RETURN:
+                    return pop()
+                elif op == JUMP:
+                    ip = instructions[ip + 1]
+                elif op == PUSH_SCOPE:
+                    environment = Environment(
+                        environment,
+                        constants[instructions[ip + 1]]
+                    )
+                    ip += 2
+                elif op == POP_SCOPE:
+                    environment = environment.enclosing
+                    ip += 1
+                elif op == MULTIPLY:
+                    right = pop()
+                    left = stack[-1]
+                    if type(left) is int and type(right) is int:
+                        stack[-1] = left * right
+                    else:
+                        stack[-1] = self._arithmetic(
+                            op,
+                            left,
+                            right,
+                            nodes[instructions[ip + 1]]
+                        )
+                    ip += 2
+                elif op == DIVIDE:
+                    right = pop()
+                    stack[-1] = self._arithmetic(
+                        op,
+                        stack[-1],
+                        right,
+                        nodes[instructions[ip + 1]]
+                    )
+                    ip += 2
+                elif op == EQUAL:
+                    right = pop()
+                    left = stack[-1]
+                    if type(left) is not int or type(right) is not int:
+                        left, right = cast(left, right)
+                    stack[-1] = left == right
+                    ip += 1
+                elif op == NOT_EQUAL:
+                    right = pop()
+                    left = stack[-1]
+                    if type(left) is not int or type(right) is not int:
+                        left, right = cast(left, right)
+                    stack[-1] = left != right
+                    ip += 1
+                elif op == LESS_EQUAL:
+                    right = pop()
+                    left = stack[-1]
+                    if type(left) is not int or type(right) is not int:
+                        left, right = cast(left, right)
+                    stack[-1] = left <= right
+                    ip += 1
+                elif op == GREATER:
+                    right = pop()
+                    left = stack[-1]
+                    if type(left) is not int or type(right) is not int:
+                        left, right = cast(left, right)
+                    stack[-1] = left > right
+                    ip += 1
+                elif op == GREATER_EQUAL:
+                    right = pop()
+                    left = stack[-1]
+                    if type(left) is not int or type(right) is not int:
+                        left, right = cast(left, right)
+                    stack[-1] = left >= right
+                    ip += 1
+                elif op == JUMP_IF_TRUE_OR_POP:
+                    if stack[-1]:
+                        ip = instructions[ip + 1]
+                    else:
+                        pop()
+                        ip += 2
+                elif op == JUMP_IF_FALSE_OR_POP:
+                    if not stack[-1]:
+                        ip = instructions[ip + 1]
+                    else:
+                        pop()
+                        ip += 2
+                elif op == NOT:
+                    stack[-1] = not stack[-1]
+                    ip += 1
+                elif op == NEGATE:
+                    value = stack[-1]
+                    number = interpreter.try_cast_to_number(value)
+                    if number is None:
+                        raise NumberConversionError(
+                            value,
+                            nodes[instructions[ip + 1]].position
+                        )
+                    stack[-1] = -number
+                    ip += 2
+                elif op == DEFINE_SLOT:
+                    name = names[instructions[ip + 2]]
+                    try:
+                        environment.define(
+                            name,
+                            stack[-1],
+                            instructions[ip + 3],
+                            instructions[ip + 1]
+                        )
+                    except RedefinitionError:
+                        raise RedefinitionError(
+                            name,
+                            nodes[instructions[ip + 4]].position
+                        )
+                    pop()
+                    ip += 5
+                elif op == DEFINE_NAME:
+                    name = names[instructions[ip + 1]]
+                    try:
+                        environment.define(
+                            name,
+                            stack[-1],
+                            instructions[ip + 2]
+                        )
+                    except RedefinitionError:
+                        raise RedefinitionError(
+                            name,
+                            nodes[instructions[ip + 3]].position
+                        )
+                    pop()
+                    ip += 4
+                elif op == DEFINE_FUNCTION:
+                    body = constants[instructions[ip + 1]]
+                    declaration = body.declaration
+                    try:
+                        environment.define_function(
+                            BytecodeFunction(body, environment),
+                            declaration.slot
+                        )
+                    except ConstantRedefinitionError:
+                        raise ConstantRedefinitionError(
+                            declaration.name,
+                            nodes[instructions[ip + 2]].position
+                        )
+                    ip += 3
+                elif op == LOAD_MATCH:
+                    push(stack[instructions[ip + 1]])
+                    ip += 2
+                elif op == IS_TYPE:
+                    check = TYPE_CHECKS.get(constants[instructions[ip + 1]])
+                    stack[-1] = None if check is None else check(stack[-1])
+                    ip += 2
+                elif op == ALL:
+                    count = instructions[ip + 1]
+                    matches = stack[-count:]
+                    del stack[-count:]
+                    push(all(matches))
+                    ip += 2
+                elif op == POP_N:
+                    del stack[-instructions[ip + 1]:]
+                    ip += 2
+                elif op == MATCH_ERROR:
+                    raise InvalidArgumentNumberError(
+                        "case",
+                        instructions[ip + 1],
+                        instructions[ip + 2],
+                        nodes[instructions[ip + 3]].position
+                    )
+                elif op == RAISE_RETURN:
+                    raise Return(
+                        pop(),
+                        nodes[instructions[ip + 1]].position
+                    )
+                else:
+                    raise ValueError(f"Unknown opcode {op} at {ip}")
+        except UndefinedVariableError as e:
+            if interpreter.positions is not None:
+                for node in code.locations.get(ip, ()):
+                    interpreter._locate_error(e, node)
+            raise
+
+    def _arithmetic(self, op: int, left, right, node: Stmt):
+        # Operands of other types than two integers, converted to numbers
+        interpreter = self.interpreter
+        new_left = interpreter.try_cast_to_number(left)
+        new_right = interpreter.try_cast_to_number(right)
+        if new_left is None or new_right is None:
+            raise NumberConversionError(
+                left if new_left is None else right,
+                interpreter.get_operand_position(node, new_left is None)
+            )
+        if op == SUBTRACT:
+            return interpreter._int_or_float(new_left - new_right)
+        if op == MULTIPLY:
+            return interpreter._int_or_float(new_left * new_right)
+        if new_right == 0:
+            raise DivisionByZeroError(
+                interpreter.get_operand_position(node, False)
+            )
+        return interpreter._int_or_float(new_left / new_right)
+
+
+class BytecodeInterpreter(Interpreter):
+    """Executes every node given to it by compiling it with
+    `BytecodeCompiler` and running the code in `VirtualMachine`."""
+
+    def __init__(self, positions=None):
+        super().__init__(positions)
+        self.vm = VirtualMachine(self)
+
+    def run_compiled(self, node: Expr | Stmt):
+        code = compile_node(node, self.positions is not None)
+        return self.vm.run(code, self.environment)
+
+    visit_assignment_expr = run_compiled
+    visit_binary = run_compiled
+    visit_literal = run_compiled
+    visit_unary = run_compiled
+    visit_logical = run_compiled
+    visit_grouping = run_compiled
+    visit_identifier = run_compiled
+    visit_call = run_compiled
+    visit_block_stmt = run_compiled
+    visit_function_stmt = run_compiled
+    visit_variable_stmt = run_compiled
+    visit_if_stmt = run_compiled
+    visit_while_stmt = run_compiled
+    visit_return_stmt = run_compiled
+    visit_match_stmt = run_compiled
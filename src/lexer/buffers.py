@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+from array import array
+
+from lexer.lexers import BaseLexer, Lexer, RegexLexer
+from lexer.streams import Stream, Position, LineIndex
+from lexer.tokens import Token, TokenType
+
+
+TOKEN_TYPES = {token_type.value: token_type for token_type in TokenType}
+
+
+class TokenBuffer:
+    """Stores the tokens of a whole source in parallel arrays instead of
+    a list of `Token` objects. Values are kept once in a pool and tokens
+    only refer to them by index, `0` stands for no value. Positions are
+    resolved from the offsets through the line index of the source."""
+
+    def __init__(self, line_index: LineIndex | None = None):
+        self.line_index = line_index or LineIndex()
+        self.types = array('B')
+        self.value_indices = array('I')
+        self.offsets = array('Q')
+        self.values: list[int | float | str | None] = [None]
+        self._value_index: dict[tuple[type, any], int] = {}
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def append(
+        self,
+        token_type: TokenType,
+        value: int | float | str | None,
+        offset: int
+    ) -> None:
+        self.types.append(token_type.value)
+        self.value_indices.append(self._intern_value(value))
+        self.offsets.append(offset)
+
+    def _intern_value(self, value: int | float | str | None) -> int:
+        if value is None:
+            return 0
+        # 1, 1.0 and True are equal dict keys, so the type is a part of it
+        key = (type(value), value)
+        index = self._value_index.get(key)
+        if index is None:
+            index = self._value_index[key] = len(self.values)
+            self.values.append(value)
+        return index
+
+    def get_type(self, index: int) -> TokenType:
+        return TOKEN_TYPES[self.types[index]]
+
+    def get_value(self, index: int) -> int | float | str | None:
+        return self.values[self.value_indices[index]]
+
+    def get_position(self, index: int) -> Position:
+        return self.line_index.resolve(self.offsets[index])
+
+    def get_token(self, index: int) -> Token:
+        return Token(
+            self.get_type(index),
+            self.get_value(index),
+            self.offsets[index],
+            self.line_index
+        )
+
+    def cursor(self) -> TokenCursor:
+        return TokenCursor(self)
+
+
+class TokenCursor(BaseLexer):
+    """Reads tokens back from a `TokenBuffer` with the lexer interface,
+    so that it can be passed to the `Parser` instead of a lexer. The
+    parser keeps tokens as the starts of nodes, so a `Token` is still
+    built for every token read."""
+
+    def __init__(self, buffer: TokenBuffer):
+        self.buffer = buffer
+        self.index = 0
+
+    def next_token(self) -> Token:
+        # The last token is always EOF and is returned on every next call
+        token = self.buffer.get_token(self.index)
+        if self.index < len(self.buffer) - 1:
+            self.index += 1
+        return token
+
+
+def tokenize(
+    source: Stream | str,
+    filename: str | None = None
+) -> TokenBuffer:
+    """Lexes the whole source at once. Text sources are scanned by the
+    `RegexLexer` without creating intermediate `Token` objects, tokens of
+    streams are built by the `Lexer` and copied into the buffer."""
+    if isinstance(source, str):
+        return _tokenize_text(source, filename)
+    buffer = TokenBuffer(source.line_index)
+    lexer = Lexer(source)
+    append = buffer.append
+    while True:
+        token = lexer.next_token()
+        append(token.type, token.value, token.offset)
+        if token.type == TokenType.EOF:
+            return buffer
+
+
+def _tokenize_text(text: str, filename: str | None) -> TokenBuffer:
+    lexer = RegexLexer(text, filename)
+    buffer = TokenBuffer(lexer.line_index)
+    next_raw_token, get_offset = lexer.next_raw_token, lexer.get_offset
+    append = buffer.append
+    while True:
+        token_type, value, start = next_raw_token()
+        append(token_type, value, get_offset(start))
+        if token_type == TokenType.EOF:
+            return buffer
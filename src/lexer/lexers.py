@@ -1,3 +1,5 @@
+import re
+from codecs import getincrementaldecoder
 from copy import copy
 
 from lexer.tokens import (
@@ -7,11 +9,18 @@ from lexer.tokens import (
     SINGLE_CHAR_MAP,
     COMPOSITE_CHAR_MAP,
     ESCAPE_SEQUENCE_MAP,
-    INDENTATION_CHARS,
-    COMMENT_CHAR
+    INDENTATION_CHARS_SET,
+    COMPOSITE_OR_COMMENT_FIRST_CHARS,
+    COMMENT_CHAR,
+    WHITESPACES_PATTERN,
+    IDENTIFIER_PATTERN,
+    DIGITS_PATTERN,
+    STRING_CHARS_PATTERN,
+    COMMENT_PATTERN
 )
-from lexer.utils import is_digit, is_letter, is_alphanumeric
-from lexer.streams import Stream
+from lexer.utils import DIGITS, LETTERS, ALPHANUMERIC
+from lexer.streams import Stream, MappedFileStream, Position, LineIndex
+from lexer.symbols import SymbolTable
 from lexer.exceptions import (
     UnexpecterCharacterError,
     UnterminatedStringError,
@@ -19,6 +28,7 @@ from lexer.exceptions import (
 )
 
 from abc import ABC, abstractmethod
+from typing import Callable
 
 
 class BaseLexer(ABC):
@@ -29,11 +39,15 @@ class BaseLexer(ABC):
 
 
 class Lexer(BaseLexer):
-    def __init__(self, stream: Stream):
+    def __init__(self, stream: Stream, symbols: SymbolTable | None = None):
         self.stream = stream
+        self.symbols = symbols if symbols is not None else SymbolTable()
+        # Mapped streams can hand out whole lexemes instead of single chars
+        self.can_slice = isinstance(stream, MappedFileStream)
+        self.builders = self._create_builders_table()
 
         self.stream.advance()
-        self.lexeme_start_pos = copy(self.stream.position)
+        self.lexeme_start = self.stream.position.offset
 
     def try_build_string(self) -> bool:
         if not self.stream.current_char == '"':
@@ -42,7 +56,7 @@ class Lexer(BaseLexer):
         value = []
         while self.stream.current_char and not self.stream.current_char == '"':
             if self.stream.current_char == "\\":
-                position = copy(self.stream.position)
+                escape_offset = self.stream.position.offset
                 self.stream.advance()
                 if self.stream.current_char == "":
                     raise UnterminatedStringError(self.lexeme_start_pos)
@@ -52,19 +66,30 @@ class Lexer(BaseLexer):
                 else:
                     raise InvalidEscapeSequenceError(
                         sequence=self.stream.current_char,
-                        position=position
+                        position=self.stream.line_index.resolve(
+                            escape_offset
+                        )
                     )
+            elif self.can_slice:
+                value.append(self.stream.take(STRING_CHARS_PATTERN))
+                continue
             else:
                 value.append(self.stream.current_char)
             self.stream.advance()
         self.ensureNotEOF(UnterminatedStringError)
         if self.stream.current_char == '"':
             self.stream.advance()
-        return self.create_token(TokenType.STRING, "".join(value))
+        return self.create_token(
+            TokenType.STRING,
+            self.symbols.intern_string("".join(value))
+        )
 
     def _parse_integer(self) -> tuple[int, int]:
+        if self.can_slice:
+            digits = self.stream.take(DIGITS_PATTERN)
+            return int(digits) if digits else 0, len(digits)
         integer, length = 0, 0
-        while is_digit(self.stream.current_char):
+        while self.stream.current_char in DIGITS:
             integer = integer * 10 + int(self.stream.current_char)
             length += 1
             self.stream.advance()
@@ -73,14 +98,14 @@ class Lexer(BaseLexer):
     def try_build_number(self) -> bool:
         # Allows leading zeros and float number without float part
         # For example: 000015.5 = 15.5, 15. = 15.0
-        if not is_digit(self.stream.current_char):
+        if self.stream.current_char not in DIGITS:
             return None
         integer = 0
         fraction = 0.0
         fraction_length = 0
         is_float = False
         integer, _ = self._parse_integer()
-        while is_digit(self.stream.current_char):
+        while self.stream.current_char in DIGITS:
             integer = integer * 10 + int(self.stream.current_char)
             self.stream.advance()
         if self.stream.current_char == '.':
@@ -95,26 +120,25 @@ class Lexer(BaseLexer):
         )
 
     def try_build_ident_or_keyword(self) -> bool:
-        if not is_letter(self.stream.current_char):
+        if self.stream.current_char not in LETTERS:
             return None
-        value = []
-        while is_alphanumeric(self.stream.current_char):
-            value.append(self.stream.current_char)
-            self.stream.advance()
-        value_str = "".join(value)
+        if self.can_slice:
+            value_str = self.stream.take(IDENTIFIER_PATTERN)
+        else:
+            value = []
+            while self.stream.current_char in ALPHANUMERIC:
+                value.append(self.stream.current_char)
+                self.stream.advance()
+            value_str = "".join(value)
         if value_str in KEYWORDS_MAP:
             return self.create_token(KEYWORDS_MAP[value_str])
         return self.create_token(
             TokenType.IDENTIFIER,
-            value_str
+            self.symbols.intern(value_str)
         )
 
     def _is_beginning_of_composite_operator_or_comment(self) -> bool:
-        char = self.stream.current_char
-        return (
-            char in [string[0] for string in COMPOSITE_CHAR_MAP.keys()]
-            or char == COMMENT_CHAR[0]
-        )
+        return self.stream.current_char in COMPOSITE_OR_COMMENT_FIRST_CHARS
 
     def try_build_operator_or_comment(self) -> bool:
         is_single_char_operator = self.stream.current_char in SINGLE_CHAR_MAP
@@ -135,14 +159,18 @@ class Lexer(BaseLexer):
         lexeme = previous + self.stream.current_char
         if lexeme == COMMENT_CHAR:
             self.stream.advance()
-            value = []
-            while (
-                self.stream.current_char and
-                not self.stream.current_char == "\n"
-            ):
-                value.append(self.stream.current_char)
-                self.stream.advance()
-            token = self.create_token(TokenType.COMMENT, "".join(value))
+            if self.can_slice:
+                value_str = self.stream.take(COMMENT_PATTERN)
+            else:
+                value = []
+                while (
+                    self.stream.current_char and
+                    not self.stream.current_char == "\n"
+                ):
+                    value.append(self.stream.current_char)
+                    self.stream.advance()
+                value_str = "".join(value)
+            token = self.create_token(TokenType.COMMENT, value_str)
         elif lexeme in COMPOSITE_CHAR_MAP:
             token = self.create_token(COMPOSITE_CHAR_MAP[lexeme])
             self.stream.advance()
@@ -166,29 +194,39 @@ class Lexer(BaseLexer):
         return None
 
     def skip_whitespaces(self) -> None:
-        while self.stream.current_char in INDENTATION_CHARS:
+        if self.can_slice:
+            self.stream.take(WHITESPACES_PATTERN)
+            return
+        while self.stream.current_char in INDENTATION_CHARS_SET:
             self.stream.advance()
 
+    def _create_builders_table(self) -> dict[str, Callable[[], Token]]:
+        # The first char of a lexeme decides which builder can accept it
+        builders = {'': self.try_build_eof, '"': self.try_build_string}
+        for char in SINGLE_CHAR_MAP.keys() | COMPOSITE_OR_COMMENT_FIRST_CHARS:
+            builders[char] = self.try_build_operator_or_comment
+        for char in DIGITS:
+            builders[char] = self.try_build_number
+        for char in LETTERS:
+            builders[char] = self.try_build_ident_or_keyword
+        return builders
+
     def next_token(self) -> Token | None:
-        funcs = (
-            self.try_build_operator_or_comment,
-            self.try_build_string,
-            self.try_build_number,
-            self.try_build_ident_or_keyword,
-            self.try_build_eof
-        )
         self.skip_whitespaces()
-        self.lexeme_start_pos = copy(self.stream.position)
-        for func in funcs:
-            token = func()
-            if token:
-                return token
+        self.lexeme_start = self.stream.position.offset
+        builder = self.builders.get(self.stream.current_char)
+        if builder:
+            return builder()
 
         raise UnexpecterCharacterError(
             character=self.stream.current_char,
             position=self.lexeme_start_pos
         )
 
+    @property
+    def lexeme_start_pos(self) -> Position:
+        return self.stream.line_index.resolve(self.lexeme_start)
+
     def ensureNotEOF(self, ErrorType):
         if not self.stream.current_char:
             raise ErrorType(self.lexeme_start_pos)
@@ -198,7 +236,12 @@ class Lexer(BaseLexer):
         token_type: TokenType,
         value: int | float | str | None = None
     ) -> None:
-        return Token(token_type, value, self.lexeme_start_pos)
+        return Token(
+            token_type,
+            value,
+            self.lexeme_start,
+            self.stream.line_index
+        )
 
 
 class LexerWithoutComments(BaseLexer):
@@ -210,3 +253,259 @@ class LexerWithoutComments(BaseLexer):
         while token and token.type == TokenType.COMMENT:
             token = self.lexer.next_token()
         return token
+
+
+def _alternatives(lexemes) -> str:
+    # Longer lexemes first, so that '==' is not matched as two '='
+    return "|".join(
+        re.escape(lexeme) for lexeme in sorted(lexemes, key=len, reverse=True)
+    )
+
+
+TOKEN_PATTERN = re.compile(
+    r"[ \r\t\n]*(?:"
+    + r"(?P<COMMENT>" + re.escape(COMMENT_CHAR)
+    + r"(?P<COMMENT_BODY>[^\r\n]*))"
+    + r"|(?P<OPERATOR>" + _alternatives(COMPOSITE_CHAR_MAP | SINGLE_CHAR_MAP)
+    + r")|(?P<NUMBER>[0-9]+(?:\.[0-9]*)?)"
+    + r"|(?P<IDENTIFIER>[A-Za-z][A-Za-z0-9_]*)"
+    + r'|(?P<STRING>"(?P<STRING_BODY>[^"\\]*(?:\\.[^"\\]*)*)(?P<QUOTE>"?))'
+    + r"|(?P<EOF>\Z)"
+    + r"|(?P<UNEXPECTED>.))",
+    re.DOTALL
+)
+ESCAPE_PATTERN = re.compile(r"\\.", re.DOTALL)
+LINE_BREAK_PATTERN = re.compile(r"\r\n?")
+# Braces outside of comments and strings
+BRACE_PATTERN = re.compile(
+    re.escape(COMMENT_CHAR) + r'[^\r\n]*|"(?:[^"\\]|\\.)*"?|(?P<BRACE>[{}])',
+    re.DOTALL
+)
+
+
+class RegexLexer(BaseLexer):
+    """Builds the same tokens as `Lexer`, but scans the whole source with
+    a single compiled regular expression instead of char by char."""
+
+    def __init__(
+        self,
+        text: str,
+        filename: str | None = None,
+        symbols: SymbolTable | None = None,
+        start: int = 0,
+        line_index: LineIndex | None = None
+    ):
+        # Scanning begins at the `start` index and offsets are counted
+        # from there, as if the text began at that index
+        self.text = text
+        self.symbols = symbols if symbols is not None else SymbolTable()
+        self.start = start
+        self.index = start
+        if line_index is None:
+            line_index = LineIndex.from_text(text[start:], filename)
+        self.line_index = line_index
+        self._is_ascii = text.isascii()
+        self._char_index = start
+        self._byte_offset = 0
+        self.operators = COMPOSITE_CHAR_MAP | SINGLE_CHAR_MAP
+
+    def next_token(self) -> Token:
+        token_type, value, start = self.next_raw_token()
+        return Token(
+            token_type,
+            value,
+            self.get_offset(start),
+            self.line_index
+        )
+
+    def next_raw_token(
+        self
+    ) -> tuple[TokenType, int | float | str | None, int]:
+        # Returns the token fields and the index of the lexeme start
+        # without building the token itself
+        match = TOKEN_PATTERN.match(self.text, self.index)
+        self.index = match.end()
+        return self.build_raw_token(match)
+
+    def build_raw_token(
+        self,
+        match: re.Match
+    ) -> tuple[TokenType, int | float | str | None, int]:
+        kind = match.lastgroup
+        start = match.start(kind)
+        if kind == "OPERATOR":
+            return self.operators[match.group(kind)], None, start
+        if kind == "IDENTIFIER":
+            value = match.group(kind)
+            if value in KEYWORDS_MAP:
+                return KEYWORDS_MAP[value], None, start
+            return TokenType.IDENTIFIER, self.symbols.intern(value), start
+        if kind == "NUMBER":
+            return TokenType.NUMBER, self._to_number(match.group(kind)), start
+        if kind == "STRING":
+            value = self.symbols.intern_string(self._build_string(match))
+            return TokenType.STRING, value, start
+        if kind == "COMMENT":
+            return TokenType.COMMENT, match.group("COMMENT_BODY"), start
+        if kind == "EOF":
+            return TokenType.EOF, None, start
+        raise UnexpecterCharacterError(
+            character=match.group(kind),
+            position=self.get_position(start)
+        )
+
+    def seek(self, index: int, offset: int) -> None:
+        # Continues scanning at the `index` of the text, whose offset is
+        # already known, for example from an earlier scan
+        self.index = self._char_index = index
+        self._byte_offset = offset
+
+    def skip_block(self) -> tuple["RegexLexer", int] | None:
+        # Moves past the end of a block, whose opening brace was the last
+        # token read, by matching braces in the text without building
+        # tokens. Returns a lexer reading the block from its opening brace
+        # and the offset after its closing brace, or `None` if the block
+        # isn't closed and nothing was skipped
+        depth = 1
+        for match in BRACE_PATTERN.finditer(self.text, self.index):
+            brace = match.group("BRACE")
+            if brace == "{":
+                depth += 1
+            elif brace == "}":
+                depth -= 1
+                if depth == 0:
+                    lexer = copy(self)
+                    lexer.index = self.index - 1
+                    self.index = match.end()
+                    return lexer, self.get_offset(self.index)
+        return None
+
+    def _to_number(self, lexeme: str) -> int | float:
+        # Same arithmetic as `Lexer.try_build_number`, so that
+        # '15.' stays an integer and fractions round the same way
+        integer, _, fraction = lexeme.partition(".")
+        if not fraction:
+            return int(integer)
+        return int(integer) + int(fraction) / (10 ** len(fraction))
+
+    def _build_string(self, match: re.Match) -> str:
+        body = match.group("STRING_BODY")
+        has_escapes = "\\" in body
+        if has_escapes:
+            for escape in ESCAPE_PATTERN.finditer(body):
+                if escape.group() not in ESCAPE_SEQUENCE_MAP:
+                    raise InvalidEscapeSequenceError(
+                        sequence=escape.group()[1].replace("\r", "\n"),
+                        position=self.get_position(
+                            match.start("STRING_BODY") + escape.start()
+                        )
+                    )
+        if "\r" in body:
+            # Line breaks are read as in text mode, like by the streams
+            body = LINE_BREAK_PATTERN.sub("\n", body)
+        if has_escapes:
+            body = ESCAPE_PATTERN.sub(
+                lambda escape: ESCAPE_SEQUENCE_MAP[escape.group()], body
+            )
+        if not match.group("QUOTE"):
+            raise UnterminatedStringError(
+                self.get_position(match.start("STRING"))
+            )
+        return body
+
+    def get_position(self, index: int) -> Position:
+        return self.line_index.resolve(self.get_offset(index))
+
+    def get_offset(self, index: int) -> int:
+        # Offsets are requested in increasing order, so only the text
+        # since the previous request has to be encoded
+        if self._is_ascii:
+            return index - self.start
+        self._byte_offset += len(
+            self.text[self._char_index:index].encode('utf-8')
+        )
+        self._char_index = index
+        return self._byte_offset
+
+
+class PushLexer(RegexLexer):
+    """Lexes a source arriving in chunks of UTF-8 bytes, for example from
+    a socket. `feed` returns the tokens completed by a chunk and `close`
+    the remaining ones with EOF. Lexemes cut by the end of a chunk,
+    including strings, escape sequences and comments, wait in the buffer
+    until the rest of them arrives."""
+
+    def __init__(
+        self,
+        filename: str | None = None,
+        symbols: SymbolTable | None = None
+    ):
+        super().__init__("", filename, symbols)
+        self.closed = False
+        self._decoder = getincrementaldecoder('utf-8')()
+        # Offset of the beginning of the buffer and of its end
+        self._buffer_offset = 0
+        self._end_offset = 0
+        # A `\r` ending a chunk waits, as it may begin a `\r\n`
+        self._carriage_return = ""
+
+    def feed(self, chunk: bytes) -> list[Token]:
+        if self.closed:
+            raise ValueError("Can't feed a closed lexer")
+        text = self._carriage_return + self._decoder.decode(chunk)
+        self._carriage_return = "\r" if text.endswith("\r") else ""
+        self._append(text.removesuffix(self._carriage_return))
+        return list(iter(self.next_token, None))
+
+    def close(self) -> list[Token]:
+        self._append(
+            self._carriage_return + self._decoder.decode(b"", final=True)
+        )
+        self.closed = True
+        tokens = [self.next_token()]
+        while tokens[-1].type != TokenType.EOF:
+            tokens.append(self.next_token())
+        return tokens
+
+    def next_token(self) -> Token | None:
+        # Returns `None` if the rest of the buffer may still be
+        # a beginning of a longer lexeme
+        match = TOKEN_PATTERN.match(self.text, self.index)
+        if not (self.closed or self._is_complete(match)):
+            return None
+        self.index = match.end()
+        token_type, value, start = self.build_raw_token(match)
+        return Token(
+            token_type,
+            value,
+            self.get_offset(start),
+            self.line_index
+        )
+
+    def get_offset(self, index: int) -> int:
+        return self._buffer_offset + super().get_offset(index)
+
+    def skip_block(self) -> None:
+        # The rest of the block may not have arrived yet
+        return None
+
+    def _is_complete(self, match: re.Match) -> bool:
+        # Only an unterminated string can be completed by a char
+        # which doesn't match its pattern
+        if match.lastgroup == "STRING":
+            return bool(match.group("QUOTE"))
+        if match.end() < len(self.text):
+            return True
+        return (
+            match.lastgroup == "OPERATOR"
+            and match.group("OPERATOR") not in COMPOSITE_OR_COMMENT_FIRST_CHARS
+        )
+
+    def _append(self, text: str) -> None:
+        # Consumed text is dropped, so the buffer holds only the lexeme
+        # in progress and the text after it
+        self._buffer_offset = self.get_offset(self.index)
+        self._end_offset = self.line_index.add_text(text, self._end_offset)
+        self.text = self.text[self.index:] + text
+        self._is_ascii = self.text.isascii()
+        self.start = self.index = self._char_index = self._byte_offset = 0
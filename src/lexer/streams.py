@@ -1,5 +1,11 @@
+from __future__ import annotations
+
+import re
 from abc import ABC, abstractmethod
-from typing import TextIO
+from array import array
+from bisect import bisect_left, bisect_right
+from mmap import mmap, ACCESS_READ
+from typing import IO, TextIO
 from dataclasses import dataclass, field
 
 
@@ -11,10 +17,86 @@ class Position:
     filename: str | None = None
 
 
+class LineIndex:
+    """Resolves byte offsets of a source into positions. Streams record
+    every line start and multi-byte char they pass, so tokens and nodes
+    can keep plain offsets and build a `Position` only when it is needed,
+    for example to report an error."""
+
+    def __init__(self, filename: str | None = None):
+        self.filename = filename
+        self.line_starts = array('Q', [0])
+        self.wide_char_offsets = array('Q')
+        # Extra bytes of all the multi-byte chars up to and including
+        # the one with the same index in `wide_char_offsets`
+        self.extra_bytes = array('Q')
+
+    @classmethod
+    def from_text(cls, text: str, filename: str | None = None) -> LineIndex:
+        line_index = cls(filename)
+        line_index.add_text(text)
+        return line_index
+
+    def add_text(self, text: str, offset: int = 0) -> int:
+        # Indexes a text starting at the byte `offset` of the source,
+        # returns the offset right after it
+        for match in LINE_INDEX_PATTERN.finditer(text):
+            if match.group()[0] in "\r\n":
+                self.add_line(match.end() + offset)
+            else:
+                size = len(match.group().encode('utf-8'))
+                self.add_wide_char(match.start() + offset, size)
+                offset += size - 1
+        return offset + len(text)
+
+    def add_line(self, offset: int) -> None:
+        self.line_starts.append(offset)
+
+    def add_wide_char(self, offset: int, size: int) -> None:
+        extra = self.extra_bytes[-1] if self.extra_bytes else 0
+        self.wide_char_offsets.append(offset)
+        self.extra_bytes.append(extra + size - 1)
+
+    def resolve(self, offset: int) -> Position:
+        line = bisect_right(self.line_starts, offset)
+        line_start = self.line_starts[line - 1]
+        chars = offset - line_start
+        if self.wide_char_offsets:
+            chars -= (
+                self._extra_bytes_before(offset)
+                - self._extra_bytes_before(line_start)
+            )
+        return Position(line, chars + 1, offset, self.filename)
+
+    def _extra_bytes_before(self, offset: int) -> int:
+        index = bisect_left(self.wide_char_offsets, offset)
+        return self.extra_bytes[index - 1] if index else 0
+
+
+# `\r\n` and a lone `\r` are line breaks as well, as in text mode
+LINE_INDEX_PATTERN = re.compile(r"\r\n?|\n|[^\x00-\x7f]")
+
+
+def resolve_position(
+    offset: int | None,
+    source: LineIndex | Position | None
+) -> Position | None:
+    # Objects built by hand may carry an already resolved position,
+    # anything else resolves offsets like a `LineIndex`
+    if source is None or isinstance(source, Position):
+        return source
+    return source.resolve(offset)
+
+
 @dataclass
 class Stream(ABC):
     position: Position = field(default_factory=lambda: Position(1, 0, 0))
     current_char: str = ''
+    line_index: LineIndex = field(default_factory=LineIndex)
+
+    def set_filename(self, filename: str | None) -> None:
+        self.position.filename = filename
+        self.line_index.filename = filename
 
     @abstractmethod
     def advance(self) -> str:
@@ -25,30 +107,204 @@ class FileStream(Stream):
     def __init__(self, file_handler: TextIO):
         super().__init__()
         self.file_handler = file_handler
-        self.position.filename = file_handler.name
+        self.set_filename(file_handler.name)
 
     def advance(self) -> str:
-        if self.current_char == "\n":
+        is_line_start = self.current_char == "\n"
+        if is_line_start:
             self.position.column = 1
             self.position.line += 1
         else:
             self.position.column += 1
         self.position.offset = self.file_handler.tell()
         self.current_char = self.file_handler.read(1)
+        if is_line_start:
+            self.line_index.add_line(self.position.offset)
+        if self.current_char >= "\x80":
+            self.line_index.add_wide_char(
+                self.position.offset,
+                len(self.current_char.encode('utf-8'))
+            )
         return self.current_char
 
 
+class BufferedFileStream(Stream):
+    def __init__(self, file_handler: TextIO, chunk_size: int = 1 << 16):
+        super().__init__()
+        self.file_handler = file_handler
+        self.chunk_size = chunk_size
+        self.set_filename(file_handler.name)
+        self._buffer = ''
+        self._index = 0
+
+    def advance(self) -> str:
+        position = self.position
+        char = self.current_char
+        if char:
+            position.offset += (
+                1 if char < "\x80" else len(char.encode('utf-8'))
+            )
+        if char == "\n":
+            position.column = 1
+            position.line += 1
+            self.line_index.add_line(position.offset)
+        else:
+            position.column += 1
+        if self._index >= len(self._buffer):
+            self._buffer = self.file_handler.read(self.chunk_size)
+            self._index = 0
+            if not self._buffer:
+                self.current_char = ''
+                return self.current_char
+        char = self.current_char = self._buffer[self._index]
+        self._index += 1
+        if char >= "\x80":
+            self.line_index.add_wide_char(
+                position.offset,
+                len(char.encode('utf-8'))
+            )
+        return char
+
+
+NON_ASCII_PATTERN = re.compile(rb"[\x80-\xff]")
+LINE_BREAK_PATTERN = re.compile(rb"\r\n?|\n")
+UTF8_LEAD_BYTE_PATTERN = re.compile(rb"[\xc0-\xff]")
+
+
+class MappedFileStream(Stream):
+    """Reads a file mapped into memory. Line breaks are read the same as
+    by a file opened in text mode: `\r\n` and `\r` become a single
+    `\n`, whose offset is the one of its first byte."""
+
+    def __init__(self, file_handler: IO):
+        super().__init__()
+        self.set_filename(file_handler.name)
+        try:
+            self._buffer = mmap(file_handler.fileno(), 0, access=ACCESS_READ)
+        except ValueError:
+            # Empty files can not be mapped
+            self._buffer = b''
+        self._view = memoryview(self._buffer)
+        self._size = len(self._buffer)
+        self.is_ascii = NON_ASCII_PATTERN.search(self._buffer) is None
+        self.has_carriage_returns = self._buffer.find(b"\r") != -1
+        self._next_offset = 0
+
+    def advance(self) -> str:
+        position = self.position
+        position.offset = self._next_offset
+        if self.current_char == "\n":
+            position.column = 1
+            position.line += 1
+            self.line_index.add_line(position.offset)
+        else:
+            position.column += 1
+        self._load_current_char()
+        return self.current_char
+
+    def take(self, pattern: re.Pattern[bytes]) -> str:
+        """Consumes the longest match of the pattern starting at the current
+        character and returns it without building it char by char."""
+        start = self.position.offset
+        end = pattern.match(self._buffer, start).end()
+        if end == start:
+            return ''
+        lexeme = str(self._view[start:end], 'utf-8')
+        if self.has_carriage_returns and "\r" in lexeme:
+            lexeme = lexeme.replace("\r\n", "\n").replace("\r", "\n")
+        position = self.position
+        newlines = lexeme.count("\n")
+        if newlines > 0:
+            position.line += newlines
+            position.column = len(lexeme) - lexeme.rfind("\n")
+            self._index_lines(start, end)
+        else:
+            position.column += len(lexeme)
+        if not self.is_ascii:
+            # The first char was indexed when it became the current one
+            for match in UTF8_LEAD_BYTE_PATTERN.finditer(
+                self._buffer, start + 1, end
+            ):
+                offset = match.start()
+                self.line_index.add_wide_char(
+                    offset,
+                    self._get_char_size(self._buffer[offset])
+                )
+        position.offset = end
+        self._load_current_char()
+        return lexeme
+
+    def _index_lines(self, start: int, end: int) -> None:
+        if self.has_carriage_returns:
+            for match in LINE_BREAK_PATTERN.finditer(
+                self._buffer, start, end
+            ):
+                self.line_index.add_line(match.end())
+            return
+        newline = self._buffer.find(b"\n", start, end)
+        while newline != -1:
+            self.line_index.add_line(newline + 1)
+            newline = self._buffer.find(b"\n", newline + 1, end)
+
+    def close(self) -> None:
+        self._view.release()
+        if isinstance(self._buffer, mmap):
+            self._buffer.close()
+
+    def _load_current_char(self) -> None:
+        offset = self.position.offset
+        if offset >= self._size:
+            self.current_char = ''
+            self._next_offset = offset
+            return
+        byte = self._buffer[offset]
+        if byte == 0x0d:
+            self.current_char = "\n"
+            self._next_offset = offset + (
+                2 if self._buffer[offset + 1:offset + 2] == b"\n" else 1
+            )
+            return
+        if self.is_ascii or byte < 0x80:
+            self.current_char = chr(byte)
+            self._next_offset = offset + 1
+            return
+        length = self._get_char_size(byte)
+        self._next_offset = offset + length
+        self.current_char = str(
+            self._view[offset:self._next_offset], 'utf-8'
+        )
+        self.line_index.add_wide_char(offset, length)
+
+    def _get_char_size(self, lead_byte: int) -> int:
+        if lead_byte >= 0xf0:
+            return 4
+        if lead_byte >= 0xe0:
+            return 3
+        return 2
+
+
 class TextStream(Stream):
     def __init__(self, text: str):
         super().__init__()
         self.it = iter(text)
 
     def advance(self) -> str:
-        if self.current_char == "\n":
-            self.position.column = 1
-            self.position.line += 1
+        position = self.position
+        char = self.current_char
+        if char:
+            position.offset += (
+                1 if char < "\x80" else len(char.encode('utf-8'))
+            )
+        if char == "\n":
+            position.column = 1
+            position.line += 1
+            self.line_index.add_line(position.offset)
         else:
-            self.position.column += 1
-        self.position.offset += len(self.current_char.encode('utf-8'))
-        self.current_char = next(self.it, '')
-        return self.current_char
+            position.column += 1
+        char = self.current_char = next(self.it, '')
+        if char >= "\x80":
+            self.line_index.add_wide_char(
+                position.offset,
+                len(char.encode('utf-8'))
+            )
+        return char
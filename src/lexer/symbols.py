@@ -0,0 +1,22 @@
+class SymbolTable:
+    """Keeps one copy of every identifier name (and string literal) met
+    during a compilation. Equal names share the same object, so they are
+    stored once and compare by identity when used as dictionary keys."""
+
+    def __init__(self, intern_strings: bool = True):
+        self.intern_strings = intern_strings
+        self.symbols: dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def __contains__(self, value: str) -> bool:
+        return value in self.symbols
+
+    def intern(self, name: str) -> str:
+        return self.symbols.setdefault(name, name)
+
+    def intern_string(self, value: str) -> str:
+        if not self.intern_strings:
+            return value
+        return self.symbols.setdefault(value, value)
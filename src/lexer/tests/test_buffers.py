@@ -0,0 +1,76 @@
+import pytest
+
+from lexer.buffers import TokenBuffer, TokenCursor, tokenize
+from lexer.streams import TextStream
+from lexer.tokens import TokenType
+from lexer.tests.utils import create_lexer, get_all_tokens
+from lexer.tests.test_regex_lexer import CORPUS, tokens_or_error
+from lexer.exceptions import LexerError
+
+from parser.parser import Parser
+from parser.tests.utils import create_parser
+
+
+VALID_CORPUS = [
+    text for text in CORPUS
+    if not isinstance(tokens_or_error(create_lexer(text))[-1], tuple)
+]
+
+
+@pytest.mark.parametrize("text", VALID_CORPUS)
+def test_tokenize_stream(text: str):
+    buffer = tokenize(TextStream(text))
+    tokens = [buffer.get_token(i) for i in range(len(buffer))]
+    assert tokens == get_all_tokens(create_lexer(text))
+
+
+@pytest.mark.parametrize("text", VALID_CORPUS)
+def test_tokenize_text(text: str):
+    buffer = tokenize(text)
+    tokens = [buffer.get_token(i) for i in range(len(buffer))]
+    assert tokens == get_all_tokens(create_lexer(text))
+
+
+@pytest.mark.parametrize("text", ('"unterminated', 'var a = 1; $', '"\\q"'))
+def test_tokenize_error(text: str):
+    with pytest.raises(LexerError) as stream_error:
+        tokenize(TextStream(text))
+    with pytest.raises(LexerError) as text_error:
+        tokenize(text)
+    assert type(stream_error.value) is type(text_error.value)
+    assert stream_error.value.position == text_error.value.position
+
+
+def test_token_buffer_values_are_pooled():
+    buffer = tokenize('a = 1; a = 1.0; b = "a"; b = "a"; c = 1;')
+    values = [buffer.get_value(i) for i in range(len(buffer))]
+    assert values == [
+        "a", None, 1, None, "a", None, 1.0, None,
+        "b", None, "a", None, "b", None, "a", None,
+        "c", None, 1, None, None
+    ]
+    assert type(values[6]) is float
+    assert buffer.values == [None, "a", 1, 1.0, "b", "c"]
+
+
+def test_token_cursor_repeats_eof():
+    cursor = TokenCursor(tokenize("a"))
+    assert cursor.next_token().type == TokenType.IDENTIFIER
+    assert cursor.next_token().type == TokenType.EOF
+    assert cursor.next_token().type == TokenType.EOF
+
+
+def test_token_buffer_filename():
+    buffer = tokenize("a", filename="script.txt")
+    assert buffer.get_position(0).filename == "script.txt"
+    assert TokenBuffer().line_index.filename is None
+
+
+@pytest.mark.parametrize("text", (
+    "var a = 5; // comment\nconst b = a / 10;",
+    "fn add(a, b) { return a + b; } print(add(1, 2)(3));",
+    'match (x, "y") { (Num and >0 as n, _) if (n): print(n); (_, _): x; }',
+))
+def test_parser_with_token_cursor(text: str):
+    expected = create_parser(text).parse()
+    assert Parser(tokenize(text).cursor()).parse() == expected
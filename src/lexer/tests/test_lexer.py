@@ -2,7 +2,8 @@ import pytest
 from sys import maxsize
 
 from lexer.lexers import Lexer, LexerWithoutComments
-from lexer.streams import TextStream, Position
+from lexer.streams import TextStream, MappedFileStream, Position
+from lexer.symbols import SymbolTable
 from lexer.tokens import (
     Token,
     TokenType,
@@ -11,6 +12,7 @@ from lexer.tokens import (
     KEYWORDS_MAP
 )
 from lexer.exceptions import (
+    LexerError,
     UnexpecterCharacterError,
     UnterminatedStringError,
     InvalidEscapeSequenceError
@@ -520,3 +522,105 @@ def test_lexer(text: str, tokens: list[Token]):
     lexer = Lexer(stream)
 
     assert get_all_tokens(lexer) == tokens
+
+
+def _get_all_tokens_or_error(lexer: Lexer) -> list:
+    try:
+        return get_all_tokens(lexer)
+    except LexerError as e:
+        return [(type(e), str(e), e.position)]
+
+
+@pytest.mark.parametrize("text", [text for text, _ in TEST_TEXT_TOKENS_MAP] + [
+    '// comment ł€\nvar a = "ż\\n\\"ź";\nfn f() { return 00015.25; }',
+    'var x = "multi\nline\nstring" + 15.;\n// end',
+    'var ąę = 1;',
+    'const a = "s\nt\\rring\\a";',
+    '"unterminated\n\\t',
+    'a != b; c ! d',
+    '',
+])
+def test_lexer_mapped_file_stream(text: str, tmp_path):
+    file = tmp_path / "test.txt"
+    file.write_bytes(text.encode('utf-8'))
+    text_stream = TextStream(text)
+    text_stream.set_filename(str(file))
+    expected = _get_all_tokens_or_error(Lexer(text_stream))
+    with open(file, "rb") as f:
+        stream = MappedFileStream(f)
+        lexer = Lexer(stream)
+        assert lexer.can_slice
+        assert _get_all_tokens_or_error(lexer) == expected
+        stream.close()
+
+
+@pytest.mark.parametrize("text", [
+    '// comment ł\r\nvar a = "multi\r\nline\rstring";\r\nprint(a);\r\n',
+    "// old\rvar b = 1;\r// mixed\n\r\nb;",
+    'fn f() {\r\n  return "€\r\n";\r\n}\r\n"unterminated\r\n',
+    "a\r\n\r\n  @",
+])
+def test_lexer_mapped_file_stream_line_breaks(text: str, tmp_path):
+    # Lines, columns and lexemes are the same as read in text mode, while
+    # offsets stay the ones of the bytes of the file
+    file = tmp_path / "test.txt"
+    file.write_bytes(text.encode('utf-8'))
+    with open(file, "r", encoding="utf-8") as f:
+        expected = _get_all_tokens_or_error(Lexer(TextStream(f.read())))
+    with open(file, "rb") as f:
+        stream = MappedFileStream(f)
+        tokens = _get_all_tokens_or_error(Lexer(stream))
+        stream.close()
+
+    def without_offsets(items: list) -> list:
+        return [
+            (item.type, item.value, item.position.line, item.position.column)
+            if isinstance(item, Token)
+            else (item[0], item[1], item[2].line, item[2].column)
+            for item in items
+        ]
+
+    assert without_offsets(tokens) == without_offsets(expected)
+    data = text.encode('utf-8')
+    for token in tokens:
+        if isinstance(token, Token) and token.type == TokenType.IDENTIFIER:
+            offset = token.position.offset
+            assert data[offset:offset + len(token.value)] == (
+                token.value.encode('utf-8')
+            )
+
+
+INTERNING_TEXT = (
+    'var count = "ab"; count = count + "ab"; print(count, "ab");'
+)
+
+
+def _values_of(tokens: list[Token], token_type: TokenType) -> list[str]:
+    return [token.value for token in tokens if token.type == token_type]
+
+
+def test_lexer_interns_identifiers_and_strings(tmp_path):
+    file = tmp_path / "test.txt"
+    file.write_text(INTERNING_TEXT)
+    with open(file, "rb") as f:
+        stream = MappedFileStream(f)
+        mapped_tokens = get_all_tokens(Lexer(stream))
+        stream.close()
+    text_tokens = get_all_tokens(Lexer(TextStream(INTERNING_TEXT)))
+    for tokens in (text_tokens, mapped_tokens):
+        names = _values_of(tokens, TokenType.IDENTIFIER)
+        strings = _values_of(tokens, TokenType.STRING)
+        assert names.count("count") == 4
+        assert all(name is names[0] for name in names if name == "count")
+        assert len(strings) == 3
+        assert all(string is strings[0] for string in strings)
+
+
+def test_lexer_shared_symbol_table():
+    symbols = SymbolTable(intern_strings=False)
+    first = get_all_tokens(Lexer(TextStream(INTERNING_TEXT), symbols))
+    second = get_all_tokens(Lexer(TextStream(INTERNING_TEXT), symbols))
+    assert first[1].value is second[1].value
+    assert "count" in symbols and "print" in symbols
+    assert "ab" not in symbols
+    assert len(symbols) == 2
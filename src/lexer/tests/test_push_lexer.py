@@ -0,0 +1,86 @@
+import pytest
+
+from lexer.lexers import RegexLexer, PushLexer
+from lexer.tokens import TokenType
+from lexer.exceptions import LexerError
+from lexer.tests.test_regex_lexer import (
+    CORPUS,
+    LINE_BREAK_CORPUS,
+    tokens_or_error
+)
+
+
+def push_tokens_or_error(text: str, chunk_size: int) -> tuple[list, tuple]:
+    data = text.encode('utf-8')
+    lexer = PushLexer()
+    tokens = []
+    try:
+        for index in range(0, len(data), chunk_size):
+            tokens += lexer.feed(data[index:index + chunk_size])
+        return tokens + lexer.close(), None
+    except LexerError as e:
+        return tokens, (type(e), str(e), e.position)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 1 << 16])
+@pytest.mark.parametrize("text", CORPUS + LINE_BREAK_CORPUS)
+def test_push_lexer_matches_regex_lexer(text: str, chunk_size: int):
+    expected = tokens_or_error(RegexLexer(text))
+    tokens, error = push_tokens_or_error(text, chunk_size)
+    if error is None:
+        assert tokens == expected
+    else:
+        # Tokens completed by the chunk with the error are not returned
+        assert error == expected[-1]
+        assert tokens == expected[:len(tokens)]
+
+
+def test_push_lexer_emits_complete_tokens():
+    lexer = PushLexer()
+    tokens = lexer.feed(b"var abc = 12")
+    assert [token.type for token in tokens] == [
+        TokenType.VAR, TokenType.IDENTIFIER, TokenType.EQUAL
+    ]
+    assert [token.type for token in lexer.feed(b";")] == [
+        TokenType.NUMBER, TokenType.SEMICOLON
+    ]
+    token, = lexer.feed(b" a =")
+    assert token.value == "a"
+    assert token.position.column == 15
+
+
+@pytest.mark.parametrize("chunks, value", [
+    ([b'"ab', b'c"'], "abc"),
+    ([b'"a\\', b'n"'], "a\n"),
+    ([b'"a\\', b'"', b'b"'], 'a"b'),
+    ([b'"\xe2\x82', b'\xac"'], "€"),
+])
+def test_push_lexer_waits_for_strings(chunks: list[bytes], value: str):
+    lexer = PushLexer()
+    tokens = []
+    for chunk in chunks[:-1]:
+        tokens += lexer.feed(chunk)
+    assert tokens == []
+    token, = lexer.feed(chunks[-1])
+    assert token.type == TokenType.STRING
+    assert token.value == value
+
+
+def test_push_lexer_waits_for_comment_end():
+    lexer = PushLexer()
+    assert lexer.feed(b"// comm") == []
+    assert lexer.feed(b"ent") == []
+    token, = lexer.feed(b"\n")
+    assert token.value == " comment"
+
+
+def test_push_lexer_closed():
+    lexer = PushLexer(filename="script.txt")
+    lexer.feed(b"a =")
+    tokens = lexer.close()
+    assert [token.type for token in tokens] == [
+        TokenType.EQUAL, TokenType.EOF
+    ]
+    assert tokens[-1].position.filename == "script.txt"
+    with pytest.raises(ValueError):
+        lexer.feed(b"b")
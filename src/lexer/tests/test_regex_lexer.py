@@ -0,0 +1,106 @@
+import pytest
+from pathlib import Path
+
+from lexer.lexers import BaseLexer, Lexer, RegexLexer
+from lexer.streams import TextStream, MappedFileStream, Position
+from lexer.symbols import SymbolTable
+from lexer.tokens import (
+    TokenType,
+    COMPOSITE_CHAR_MAP,
+    SINGLE_CHAR_MAP,
+    KEYWORDS_MAP
+)
+from lexer.exceptions import LexerError
+from lexer.tests.test_lexer import TEST_TEXT_TOKENS_MAP
+from lexer.tests.test_streams import TEST_SAMPLES
+
+
+RESOURCES = Path(__file__).parents[2] / "interpreter" / "tests" / "resources"
+
+CORPUS = (
+    [text for text, _ in TEST_TEXT_TOKENS_MAP]
+    + ["".join(sample) for sample in TEST_SAMPLES]
+    + [path.read_text() for path in sorted(RESOURCES.glob("*.txt"))]
+    + list(SINGLE_CHAR_MAP | COMPOSITE_CHAR_MAP | KEYWORDS_MAP)
+    + [
+        '', ' \t\r\n ', '_while', '5while', 'fn52.14+5', '000015.',
+        '00156.', '3.999999', '000000501.503', '15.abc', '1.2.3',
+        'ąęóż', '%', '$', '@', '!', '!abc', '!=', '#', "'", '~',
+        '"s\\%tring"', '"s\nt\\$ring"', '"s\nt\\rring\\a"', '"pre\\#post"',
+        '"unterminated', '"^&\\nhello\n', '"string\\', '"str\\ning',
+        '"\\"\\nłć$\\n', '"ł€"ż + 1', '// comment', '//ab"e\tf\nafter',
+        '// "string1" \n // "string2" \n "string3"', 'a\r\nb\r\n',
+        'var ł = 1;', '"a" "b" "\\\\" "\\t\\b\\r"',
+    ]
+)
+# Sources with Windows and old Mac line breaks, read from files
+LINE_BREAK_CORPUS = [
+    "// c\rprint(1);\r",
+    'print("a\r\nb" == "a\nb");\r\n',
+    '// ł€ comment\r\nvar a = "multi\r\nline\rł";\r\n\r\nprint(a);',
+    'fn f() {\r  return "€\r\n";\r}\r"unterminated\r\n',
+    '"a\\\r\nb"',
+    "a\r\n\r\n  @",
+]
+
+
+def tokens_or_error(lexer: BaseLexer) -> list:
+    tokens = []
+    try:
+        while True:
+            tokens.append(lexer.next_token())
+            if tokens[-1].type == TokenType.EOF:
+                return tokens
+    except LexerError as e:
+        return tokens + [(type(e), str(e), e.position)]
+
+
+@pytest.mark.parametrize("text", CORPUS)
+def test_regex_lexer_matches_lexer(text: str):
+    expected = tokens_or_error(Lexer(TextStream(text)))
+    assert tokens_or_error(RegexLexer(text)) == expected
+
+
+@pytest.mark.parametrize("text", LINE_BREAK_CORPUS)
+def test_regex_lexer_matches_mapped_file_stream(text: str, tmp_path):
+    # Files are read by the regex lexer with their line breaks kept, so
+    # that offsets are the same as of the bytes of the file
+    file = tmp_path / "script.txt"
+    file.write_bytes(text.encode('utf-8'))
+    with open(file, "rb") as f:
+        stream = MappedFileStream(f)
+        expected = tokens_or_error(Lexer(stream))
+        stream.close()
+    with open(file, "r", encoding="utf-8", newline="") as f:
+        lexer = RegexLexer(f.read(), filename=f.name)
+    assert tokens_or_error(lexer) == expected
+
+
+def test_regex_lexer_eof_repeats():
+    lexer = RegexLexer("a ")
+    lexer.next_token()
+    first = lexer.next_token()
+    second = lexer.next_token()
+    assert first.type == second.type == TokenType.EOF
+    assert first.position == second.position
+
+
+def test_regex_lexer_filename():
+    token = RegexLexer("var", filename="script.txt").next_token()
+    assert token.position.filename == "script.txt"
+
+
+def test_regex_lexer_interns_identifiers_and_strings():
+    symbols = SymbolTable()
+    tokens = tokens_or_error(RegexLexer('ab "cd" ab "cd" e', symbols=symbols))
+    assert tokens[0].value is tokens[2].value
+    assert tokens[1].value is tokens[3].value
+    assert symbols.symbols == {"ab": "ab", "cd": "cd", "e": "e"}
+
+
+def test_regex_lexer_start():
+    lexer = RegexLexer('var ł = "€";\nvar b;', start=8)
+    tokens = tokens_or_error(lexer)
+    assert [token.value for token in tokens[:2]] == ["€", None]
+    assert tokens[0].position == Position(1, 1, 0)
+    assert tokens[3].position == Position(2, 5, 11)
@@ -1,6 +1,15 @@
 import pytest
+from copy import copy
 
-from lexer.streams import TextStream, FileStream
+from lexer.streams import (
+    TextStream,
+    FileStream,
+    BufferedFileStream,
+    MappedFileStream,
+    LineIndex,
+    Position
+)
+from lexer.tokens import IDENTIFIER_PATTERN, STRING_CHARS_PATTERN
 
 
 TEST_SAMPLES = (
@@ -69,6 +78,7 @@ def _test_stream(stream, text):
     assert stream.position.offset == 0
 
     offset = 0
+    positions = []
     for line_n, line in enumerate(text):
         for col_n, char in enumerate(line):
             stream.advance()
@@ -76,7 +86,13 @@ def _test_stream(stream, text):
             assert stream.position.line == line_n + 1
             assert stream.position.column == col_n + 1
             assert stream.position.offset == offset
+            positions.append(copy(stream.position))
             offset += len(stream.current_char.encode('utf-8'))
+    stream.advance()
+    positions.append(copy(stream.position))
+
+    for position in positions:
+        assert stream.line_index.resolve(position.offset) == position
 
 
 @pytest.mark.parametrize('text', TEST_SAMPLES)
@@ -92,3 +108,80 @@ def test_file_stream(text, tmpdir):
     with open(file, "r") as f:
         stream = FileStream(f)
         _test_stream(stream, text)
+
+
+@pytest.mark.parametrize('chunk_size', (1, 3, 1 << 16))
+@pytest.mark.parametrize('text', TEST_SAMPLES)
+def test_buffered_file_stream(text, chunk_size, tmpdir):
+    file = tmpdir.join("test.txt")
+    file.write("".join(text))
+    with open(file, "r") as f:
+        stream = BufferedFileStream(f, chunk_size)
+        _test_stream(stream, text)
+
+
+@pytest.mark.parametrize('text', TEST_SAMPLES)
+def test_mapped_file_stream(text, tmpdir):
+    file = tmpdir.join("test.txt")
+    file.write_binary("".join(text).encode('utf-8'))
+    with open(file, "rb") as f:
+        stream = MappedFileStream(f)
+        _test_stream(stream, text)
+        stream.close()
+
+
+@pytest.mark.parametrize('text, is_ascii', (
+    ("abc", True), ("", True), ("ab€c", False), ("łć", False)
+))
+def test_mapped_file_stream_is_ascii(text, is_ascii, tmpdir):
+    file = tmpdir.join("test.txt")
+    file.write_binary(text.encode('utf-8'))
+    with open(file, "rb") as f:
+        stream = MappedFileStream(f)
+        assert stream.is_ascii is is_ascii
+        stream.close()
+
+
+@pytest.mark.parametrize('text, pattern, lexeme, line, column, offset', (
+    ('ident_1+', IDENTIFIER_PATTERN, 'ident_1', 1, 8, 7),
+    ('+ident', IDENTIFIER_PATTERN, '', 1, 1, 0),
+    ('str\ning"', STRING_CHARS_PATTERN, 'str\ning', 2, 4, 7),
+    ('€ł\nżź"', STRING_CHARS_PATTERN, '€ł\nżź', 2, 3, 10),
+    ('a\n\nb', STRING_CHARS_PATTERN, 'a\n\nb', 3, 2, 4),
+))
+def test_mapped_file_stream_take(
+    text, pattern, lexeme, line, column, offset, tmpdir
+):
+    file = tmpdir.join("test.txt")
+    file.write_binary(text.encode('utf-8'))
+    with open(file, "rb") as f:
+        stream = MappedFileStream(f)
+        stream.advance()
+        assert stream.take(pattern) == lexeme
+        assert stream.position.line == line
+        assert stream.position.column == column
+        assert stream.position.offset == offset
+        assert stream.current_char == text[len(lexeme):len(lexeme) + 1]
+        stream.close()
+
+
+@pytest.mark.parametrize('text', TEST_SAMPLES)
+def test_line_index_from_text(text):
+    stream = TextStream("".join(text))
+    while stream.advance():
+        pass
+    line_index = LineIndex.from_text("".join(text))
+    assert line_index.line_starts == stream.line_index.line_starts
+    assert line_index.wide_char_offsets == stream.line_index.wide_char_offsets
+    assert line_index.extra_bytes == stream.line_index.extra_bytes
+
+
+@pytest.mark.parametrize('offset, line, column', (
+    (0, 1, 1), (1, 1, 2), (4, 1, 3), (6, 1, 4), (7, 1, 5),
+    (8, 2, 1), (10, 2, 2), (12, 2, 3), (13, 2, 4), (14, 3, 1),
+))
+def test_line_index_resolve(offset, line, column):
+    line_index = LineIndex.from_text("a€łb\nżźc\n", "file.txt")
+    assert line_index.resolve(offset) == Position(
+        line, column, offset, "file.txt"
+    )
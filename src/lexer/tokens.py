@@ -1,7 +1,6 @@
+import re
 from enum import Enum, auto
-from dataclasses import dataclass
-
-from lexer.streams import Position
+from lexer.streams import Position, LineIndex, resolve_position
 
 
 class TokenType(Enum):
@@ -143,6 +142,15 @@ SINGLE_CHAR_MAP = {
 COMMENT_CHAR = "//"
 
 INDENTATION_CHARS = [" ", "\r", "\t", "\n"]
+INDENTATION_CHARS_SET = frozenset(INDENTATION_CHARS)
+
+# Byte patterns used to slice whole lexemes out of mapped sources
+WHITESPACES_PATTERN = re.compile(rb"[ \r\t\n]*")
+IDENTIFIER_PATTERN = re.compile(rb"[A-Za-z0-9_]*")
+DIGITS_PATTERN = re.compile(rb"[0-9]*")
+STRING_CHARS_PATTERN = re.compile(rb'[^"\\]*')
+# A comment ends at any line break, as `\r` is one in text mode as well
+COMMENT_PATTERN = re.compile(rb"[^\r\n]*")
 
 ESCAPE_SEQUENCE_MAP = {
     '\\n': '\n',
@@ -160,9 +168,49 @@ COMPOSITE_CHAR_MAP = {
     ">=": TokenType.GREATER_EQUAL
 }
 
+COMPOSITE_OR_COMMENT_FIRST_CHARS = frozenset(
+    [lexeme[0] for lexeme in COMPOSITE_CHAR_MAP] + [COMMENT_CHAR[0]]
+)
+
 
-@dataclass
 class Token:
-    type: TokenType
-    value: int | float | str | None
-    position: Position
+    """A token keeps only the offset of its lexeme, the position is
+    resolved through the line index of the source when it is requested.
+    Tokens built by hand may be given a ready `Position` instead."""
+
+    __slots__ = ("type", "value", "offset", "source")
+
+    def __init__(
+        self,
+        type: TokenType,
+        value: int | float | str | None,
+        position: Position | int,
+        source: LineIndex | None = None
+    ):
+        self.type = type
+        self.value = value
+        if isinstance(position, Position):
+            self.offset = position.offset
+            self.source = position
+        else:
+            self.offset = position
+            self.source = source
+
+    @property
+    def position(self) -> Position | None:
+        return resolve_position(self.offset, self.source)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Token):
+            return NotImplemented
+        return (
+            self.type == other.type
+            and self.value == other.value
+            and self.position == other.position
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"Token(type={self.type!r}, value={self.value!r}, "
+            f"position={self.position!r})"
+        )
@@ -1,28 +1,23 @@
+from string import ascii_letters, digits
+
+
+DIGITS = frozenset(digits)
+LETTERS = frozenset(ascii_letters)
+ALPHA = LETTERS | {'_'}
+ALPHANUMERIC = ALPHA | DIGITS
+
+
 def is_digit(c: str) -> bool:
-    if not len(c) == 1:
-        return False
-    return c >= '0' and c <= '9'
+    return c in DIGITS
 
 
 def is_letter(c: str) -> bool:
-    if not len(c) == 1:
-        return False
-    return (
-        (c >= 'a' and c <= 'z') or
-        (c >= 'A' and c <= 'Z')
-    )
+    return c in LETTERS
 
 
 def is_alpha(c: str) -> bool:
-    if not len(c) == 1:
-        return False
-    return (
-        is_letter(c) or
-        c == '_'
-    )
+    return c in ALPHA
 
 
 def is_alphanumeric(c: str) -> bool:
-    if not len(c) == 1:
-        return False
-    return is_alpha(c) or is_digit(c)
+    return c in ALPHANUMERIC
@@ -1,41 +1,199 @@
-from sys import argv
+import sys
+from argparse import ArgumentParser
+from typing import Callable, TextIO
 
-from lexer.streams import FileStream, TextStream, Stream
-from lexer.lexers import Lexer  # , LexerWithoutComments
+from lexer.streams import BufferedFileStream, MappedFileStream, TextStream
+from lexer.lexers import Lexer, RegexLexer  # , LexerWithoutComments
 from lexer.exceptions import LexerError
 
 from parser.parser import Parser
+from parser.models import Program
+from parser.cache import ProgramCache
+from parser.interning import share_nodes
+from parser.serialization import write_binary, write_json_lines
 from parser.exceptions import ParserError
 
 from interpreter.interpreter import Interpreter
+from interpreter.closures import ClosureInterpreter
+from interpreter.vm import BytecodeInterpreter
+from interpreter.bytecode import compile_program, disassemble
+from interpreter.transpiler import (
+    PythonInterpreter,
+    transpile_program,
+    dump
+)
+from interpreter.resolver import resolve
 from interpreter.exceptions import RuntimeError
 
 from error_handlers import ErrorHandler
 
 
-def run_prompt() -> None:
+ENGINES = {
+    "tree": Interpreter,
+    "closures": ClosureInterpreter,
+    "bytecode": BytecodeInterpreter,
+    "python": PythonInterpreter,
+}
+
+
+def run_prompt(
+    lexer_type: str,
+    shared_nodes: bool = False,
+    resolve_names: bool = False,
+    engine: str = "tree"
+) -> None:
     while True:
         text = input("> ")
-        stream = TextStream(text)
-        run(stream)
 
+        def parse() -> Program:
+            if lexer_type == "regex":
+                return Parser(RegexLexer(text)).parse()
+            return Parser(Lexer(TextStream(text))).parse()
 
-def run_file(path: str) -> None:
-    with open(path, 'r') as f:
-        stream = FileStream(f)
-        run(stream)
+        run(parse, shared_nodes, resolve_names, engine)
 
 
-def run(stream: Stream) -> None:
-    error_handler = ErrorHandler()
-    try:
-        lexer = Lexer(stream)
+def parse_file(
+    path: str,
+    lexer_type: str,
+    lazy_functions: bool = False
+) -> Program:
+    if lexer_type == "regex":
+        # Line breaks are kept as is, so offsets match the file contents
+        with open(path, 'r', newline='') as f:
+            lexer = RegexLexer(f.read(), filename=f.name)
+        return Parser(lexer, lazy_functions).parse()
+    with open(path, 'rb') as f:
+        stream = MappedFileStream(f)
+        try:
+            return Parser(Lexer(stream)).parse()
+        finally:
+            stream.close()
+
+
+def run_file(
+    path: str,
+    lexer_type: str,
+    cache: ProgramCache | None = None,
+    lazy_functions: bool = False,
+    shared_nodes: bool = False,
+    resolve_names: bool = False,
+    engine: str = "tree"
+) -> None:
+    if cache is None:
+        run(
+            lambda: parse_file(path, lexer_type, lazy_functions),
+            shared_nodes,
+            resolve_names,
+            engine
+        )
+        return
+    with open(path, 'rb') as f:
+        source = f.read()
+    # Entries are only shared by runs parsing the script the same way
+    options = {
+        "lexer": lexer_type,
+        "lazy_functions": lazy_functions,
+        "share_nodes": shared_nodes
+    }
+    run(lambda: cache.get_or_parse(
+        source,
+        lambda: parse_file(path, lexer_type, lazy_functions),
+        filename=path,
+        options=options
+    ), shared_nodes, resolve_names, engine)
+
+
+def dump_ast(
+    parse: Callable[[], Program],
+    output: str,
+    ast_format: str = "json"
+) -> None:
+    # The tree is written instead of being executed
+    def write() -> None:
+        program = parse()
+        if ast_format == "binary":
+            with open(output, 'wb') as f:
+                write_binary(program, f)
+        else:
+            with open(output, 'w', encoding='utf-8') as f:
+                write_json_lines(program, f)
+
+    handle_errors(write)
+
+
+def print_bytecode(
+    parse: Callable[[], Program],
+    resolve_names: bool = False
+) -> None:
+    # The bytecode of the script is listed instead of being executed
+    def write() -> None:
+        program = parse()
+        if resolve_names:
+            resolve(program, Interpreter().environment)
+        print(disassemble(compile_program(program)))
+
+    handle_errors(write)
+
+
+def dump_python(
+    parse: Callable[[], Program],
+    output: str,
+    resolve_names: bool = False
+) -> None:
+    # The Python source generated for the script is written instead of
+    # being executed, with the bodies of all its functions
+    def write() -> None:
+        program = parse()
+        interpreter = PythonInterpreter()
+        if resolve_names:
+            resolve(program, interpreter.environment)
+        source = dump(transpile_program(program, interpreter))
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(source + "\n")
+
+    handle_errors(write)
+
+
+def run_stream(file: TextIO, engine: str = "tree") -> None:
+    # Top-level statements are executed as soon as they're parsed and the
+    # file is read in chunks, so neither the source nor the whole program
+    # is kept in memory. Earlier statements are executed before a syntax
+    # error later in the file is reported
+    parser = Parser(Lexer(BufferedFileStream(file)))
+    handle_errors(
+        lambda: ENGINES[engine]().execute_statements(
+            parser.parse_statements()
+        )
+    )
+
+
+def run(
+    parse: Callable[[], Program],
+    shared_nodes: bool = False,
+    resolve_names: bool = False,
+    engine: str = "tree"
+) -> None:
+    def execute() -> None:
         # lexer = LexerWithoutComments(lexer)
-        parser = Parser(lexer)
-        program = parser.parse()
+        program = parse()
         # program.accept(AstPrinter())
+        interpreter = ENGINES[engine]()
+        # Nodes are shared after the program is resolved, which keeps
+        # the identifiers bound to their slots
+        if resolve_names:
+            resolve(program, interpreter.environment)
+        if shared_nodes:
+            interpreter.positions = share_nodes(program)
+        program.accept(interpreter)
+
+    handle_errors(execute)
+
 
-        program.accept(Interpreter())
+def handle_errors(execute: Callable[[], None]) -> None:
+    error_handler = ErrorHandler()
+    try:
+        execute()
     except LexerError as e:
         error_handler.handle_lexer_error(e)
     except ParserError as e:
@@ -45,10 +203,130 @@ def run(stream: Stream) -> None:
 
 
 if __name__ == "__main__":
-    if (len(argv) == 2):
-        run_file(argv[1])
-    elif (len(argv) == 1):
-        run_prompt()
+    argument_parser = ArgumentParser()
+    argument_parser.add_argument(
+        "script",
+        nargs="?",
+        help="path of the script, '-' streams it from the standard input"
+    )
+    argument_parser.add_argument(
+        "--lexer",
+        choices=("default", "regex"),
+        default="default",
+        help="lexer engine used to tokenize the source"
+    )
+    argument_parser.add_argument(
+        "--cache-dir",
+        help="directory where parsed scripts are cached between runs"
+    )
+    argument_parser.add_argument(
+        "--lazy-functions",
+        action="store_true",
+        help="parse function bodies on their first call, syntax errors in"
+        " them are reported then (requires --lexer regex)"
+    )
+    argument_parser.add_argument(
+        "--share-nodes",
+        action="store_true",
+        help="share equal literals, identifiers and constant subtrees"
+        " of the parsed script to keep it smaller in memory"
+    )
+    argument_parser.add_argument(
+        "--resolve",
+        action="store_true",
+        help="bind variables to slots of their scopes before running,"
+        " undefined variables and assignments to constants are reported"
+        " before the script starts"
+    )
+    argument_parser.add_argument(
+        "--engine",
+        choices=tuple(ENGINES),
+        default="tree",
+        help="execution engine, 'closures' compiles the syntax tree into"
+        " Python closures, 'bytecode' into instructions of a virtual"
+        " machine and 'python' into Python source before running it"
+    )
+    argument_parser.add_argument(
+        "--disassemble",
+        action="store_true",
+        help="print the bytecode of the script compiled for the 'bytecode'"
+        " engine instead of running it"
+    )
+    argument_parser.add_argument(
+        "--dump-python",
+        metavar="OUTPUT",
+        help="write the Python source generated for the script by the"
+        " 'python' engine to a file instead of running it"
+    )
+    argument_parser.add_argument(
+        "--dump-ast",
+        metavar="OUTPUT",
+        help="write the syntax tree of the script to a file instead of"
+        " running it"
+    )
+    argument_parser.add_argument(
+        "--ast-format",
+        choices=("json", "binary"),
+        default="json",
+        help="format of the dumped syntax tree, JSON lines or binary"
+    )
+    argument_parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="execute each top-level statement as soon as it's parsed"
+    )
+    args = argument_parser.parse_args()
+    if args.lazy_functions and args.lexer != "regex":
+        # Only the regex lexer can skip a function body without lexing it
+        argument_parser.error("--lazy-functions requires --lexer regex")
+    if args.stream or args.script == "-":
+        # Statements are executed one by one as they're parsed by the
+        # default lexer, so options of the whole program don't apply
+        ignored = [
+            option for option, used in (
+                ("--lexer regex", args.lexer != "default"),
+                ("--cache-dir", args.cache_dir),
+                ("--lazy-functions", args.lazy_functions),
+                ("--share-nodes", args.share_nodes),
+                ("--resolve", args.resolve),
+            ) if used
+        ]
+        if ignored:
+            argument_parser.error(
+                f"{', '.join(ignored)} can't be used with a streamed script"
+            )
+    if args.script == "-":
+        run_stream(sys.stdin, args.engine)
+    elif args.script and args.dump_ast:
+        dump_ast(
+            lambda: parse_file(args.script, args.lexer, args.lazy_functions),
+            args.dump_ast,
+            args.ast_format
+        )
+    elif args.script and args.disassemble:
+        print_bytecode(
+            lambda: parse_file(args.script, args.lexer, args.lazy_functions),
+            args.resolve
+        )
+    elif args.script and args.dump_python:
+        dump_python(
+            lambda: parse_file(args.script, args.lexer, args.lazy_functions),
+            args.dump_python,
+            args.resolve
+        )
+    elif args.script and args.stream:
+        with open(args.script, 'r') as f:
+            run_stream(f, args.engine)
+    elif args.script:
+        cache = ProgramCache(args.cache_dir) if args.cache_dir else None
+        run_file(
+            args.script,
+            args.lexer,
+            cache,
+            args.lazy_functions,
+            args.share_nodes,
+            args.resolve,
+            args.engine
+        )
     else:
-        print("Usage: python main.py [script]")
-        exit()
+        run_prompt(args.lexer, args.share_nodes, args.resolve, args.engine)
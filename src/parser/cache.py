@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import os
+import struct
+import sys
+import tempfile
+import time
+import zlib
+from array import array
+from copy import copy
+from hashlib import sha256
+from io import BytesIO
+from pathlib import Path
+from typing import Callable
+
+from version import __version__
+from lexer.lexers import RegexLexer
+from lexer.streams import LineIndex
+from parser.models import Program, LazyBlock
+from parser.parser import Parser
+from parser.serialization import (
+    SerializationError,
+    write_binary,
+    read_binary
+)
+
+
+# Bumped whenever the layout of the entries or of the tree nodes changes
+FORMAT_VERSION = 4
+MAGIC = b"PRGC"
+# magic, format version, key digest, payload length, payload checksum
+HEADER = struct.Struct("<4sH32sQI")
+# Lengths of the line starts, wide char offsets and their extra bytes
+LINE_INDEX_HEADER = struct.Struct("<3Q")
+ENTRY_SUFFIX = ".prg"
+
+
+class ProgramCache:
+    """Stores parsed programs in a directory, so that unchanged sources
+    don't have to be lexed and parsed again.
+
+    Entries are keyed by a hash of the source, the interpreter version,
+    the format version and the options the source was parsed with, which
+    change the tree. Each one starts with a header holding the format
+    version, the key and the length and checksum of the compressed
+    payload, which are checked before the program is loaded. The payload
+    is the line index of the source followed by the tree in the binary
+    format of `parser.serialization`, with function bodies not parsed yet
+    written as their spans, so loading an entry never runs code from it.
+    Invalid entries are removed, and after every store the entries older
+    than `max_age` seconds are removed, followed by the least recently
+    used ones until the directory fits in `max_size` bytes."""
+
+    def __init__(
+        self,
+        directory: str | os.PathLike,
+        max_size: int = 64 << 20,
+        max_age: float = 7 * 24 * 60 * 60
+    ):
+        self.directory = Path(directory)
+        self.max_size = max_size
+        self.max_age = max_age
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def get_digest(
+        self,
+        source: bytes,
+        options: dict[str, object] | None = None
+    ) -> bytes:
+        key = f"{__version__}\0{FORMAT_VERSION}\0"
+        if options:
+            key += repr(sorted(options.items()))
+        return sha256(key.encode() + b"\0" + source).digest()
+
+    def get_path(self, digest: bytes) -> Path:
+        return self.directory / (digest.hex() + ENTRY_SUFFIX)
+
+    def load(
+        self,
+        source: bytes,
+        filename: str | None = None,
+        options: dict[str, object] | None = None
+    ) -> Program | None:
+        digest = self.get_digest(source, options)
+        path = self.get_path(digest)
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        program = self._decode(data, digest, source, filename)
+        if program is None:
+            path.unlink(missing_ok=True)
+            return None
+        # Access time is kept by hand, as file systems often don't update it
+        os.utime(path)
+        return program
+
+    def store(
+        self,
+        source: bytes,
+        program: Program,
+        options: dict[str, object] | None = None
+    ) -> None:
+        digest = self.get_digest(source, options)
+        payload = BytesIO()
+        _write_line_index(payload, _find_line_index(program))
+        write_binary(program, payload, lazy_blocks=True)
+        payload = zlib.compress(payload.getvalue())
+        header = HEADER.pack(
+            MAGIC, FORMAT_VERSION, digest, len(payload), zlib.crc32(payload)
+        )
+        # Entries are written to a temporary file and renamed, so other
+        # processes never read a partially written entry
+        fd, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(header + payload)
+            os.replace(temporary, self.get_path(digest))
+        except OSError:
+            Path(temporary).unlink(missing_ok=True)
+            return
+        self.evict()
+
+    def get_or_parse(
+        self,
+        source: bytes,
+        parse: Callable[[], Program],
+        filename: str | None = None,
+        options: dict[str, object] | None = None
+    ) -> Program:
+        program = self.load(source, filename, options)
+        if program is None:
+            program = parse()
+            self.store(source, program, options)
+        return program
+
+    def evict(self) -> None:
+        entries = []
+        now = time.time()
+        for path in self.directory.glob("*" + ENTRY_SUFFIX):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if now - stat.st_mtime > self.max_age:
+                path.unlink(missing_ok=True)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            path.unlink(missing_ok=True)
+            total_size -= size
+
+    def clear(self) -> None:
+        for path in self.directory.glob("*" + ENTRY_SUFFIX):
+            path.unlink(missing_ok=True)
+
+    def _decode(
+        self,
+        data: bytes,
+        digest: bytes,
+        source: bytes,
+        filename: str | None
+    ) -> Program | None:
+        if len(data) < HEADER.size:
+            return None
+        magic, version, entry_digest, length, checksum = HEADER.unpack_from(
+            data
+        )
+        payload = data[HEADER.size:]
+        if (
+            magic != MAGIC
+            or version != FORMAT_VERSION
+            or entry_digest != digest
+            or length != len(payload)
+            or checksum != zlib.crc32(payload)
+        ):
+            return None
+        try:
+            file = BytesIO(zlib.decompress(payload))
+            line_index = _read_line_index(file, filename)
+            return read_binary(
+                file, line_index, _block_opener(source, line_index)
+            )
+        except (zlib.error, struct.error, SerializationError, ValueError):
+            return None
+
+
+def _write_line_index(file: BytesIO, line_index: LineIndex | None) -> None:
+    # The arrays are written with their lengths, little-endian, and
+    # a program without a line index gets an empty one
+    if line_index is None:
+        line_index = LineIndex()
+    arrays = (
+        line_index.line_starts,
+        line_index.wide_char_offsets,
+        line_index.extra_bytes
+    )
+    file.write(LINE_INDEX_HEADER.pack(*map(len, arrays)))
+    for values in arrays:
+        if sys.byteorder == "big":
+            values = array(values.typecode, values)
+            values.byteswap()
+        file.write(values.tobytes())
+
+
+def _read_line_index(file: BytesIO, filename: str | None) -> LineIndex:
+    line_index = LineIndex(filename)
+    lengths = LINE_INDEX_HEADER.unpack(file.read(LINE_INDEX_HEADER.size))
+    arrays = []
+    for length in lengths:
+        values = array('Q')
+        data = file.read(length * values.itemsize)
+        if len(data) != length * values.itemsize:
+            raise SerializationError("Unexpected end of the line index")
+        values.frombytes(data)
+        if sys.byteorder == "big":
+            values.byteswap()
+        arrays.append(values)
+    (
+        line_index.line_starts,
+        line_index.wide_char_offsets,
+        line_index.extra_bytes
+    ) = arrays
+    return line_index
+
+
+def _block_opener(
+    source: bytes,
+    line_index: LineIndex
+) -> Callable[[int, int], LazyBlock]:
+    # Lazy function bodies are read again from the source, by copies of
+    # a lexer placed at their opening brace like the one of the parser.
+    # They are opened in the order of their offsets, so the source is
+    # decoded only once, up to the brace of each one
+    base = None
+    char_index = byte_offset = 0
+
+    def open_block(offset: int, end_offset: int) -> LazyBlock:
+        nonlocal base, char_index, byte_offset
+        if base is None:
+            base = RegexLexer(source.decode('utf-8'), line_index=line_index)
+        if offset < byte_offset:
+            char_index = byte_offset = 0
+        char_index += len(source[byte_offset:offset].decode('utf-8'))
+        byte_offset = offset
+        lexer = copy(base)
+        lexer.seek(char_index, offset)
+        return LazyBlock(
+            lexer, Parser, end_offset, offset=offset, source=line_index
+        )
+
+    return open_block
+
+
+def _find_line_index(program: Program) -> LineIndex | None:
+    # All the nodes of a parsed program share the line index of its source
+    for statement in program.statements:
+        if isinstance(statement.source, LineIndex):
+            return statement.source
+    return None
@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+
+from lexer.tokens import (
+    TokenType,
+    KEYWORDS_MAP,
+    SINGLE_CHAR_MAP,
+    COMPOSITE_CHAR_MAP
+)
+
+
+# Rules of the grammar, which are produced by the lexer as single tokens
+TOKEN_RULES = {
+    "IDENTIFIER": TokenType.IDENTIFIER,
+    "NUMBER": TokenType.NUMBER,
+    "STRING": TokenType.STRING,
+    "EOF": TokenType.EOF
+}
+LEXEMES_MAP = {**KEYWORDS_MAP, **SINGLE_CHAR_MAP, **COMPOSITE_CHAR_MAP}
+
+EBNF_PATTERN = re.compile(r"""
+    \s+ | \(\*.*?\*\)
+    | (?P<terminal>"(?:\\.|[^"\\])*")
+    | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+    | (?P<symbol>\.\.\.|[=;|,\-\[\]{}()])
+""", re.VERBOSE | re.DOTALL)
+
+
+@dataclass(frozen=True)
+class Terminal:
+    lexeme: str
+
+
+@dataclass(frozen=True)
+class RuleRef:
+    name: str
+
+
+@dataclass(frozen=True)
+class Alternation:
+    alternatives: tuple
+
+
+@dataclass(frozen=True)
+class Sequence:
+    items: tuple
+
+
+@dataclass(frozen=True)
+class Optional:
+    item: object
+
+
+@dataclass(frozen=True)
+class Repetition:
+    item: object
+
+
+class GrammarError(Exception):
+    pass
+
+
+class Grammar:
+    """Rules read from an EBNF file, used to compute the FIRST sets of
+    the syntactic rules in terms of token types."""
+
+    def __init__(self, text: str):
+        self.rules: dict[str, object] = {}
+        self._symbols = _tokenize(text)
+        self._index = 0
+        while self._index < len(self._symbols):
+            name = self._expect("name")
+            self._expect("symbol", "=")
+            self.rules[name] = self._parse_alternation()
+            self._expect("symbol", ";")
+        self._first: dict[str, tuple[frozenset[TokenType], bool]] = {}
+        self._in_progress: set[str] = set()
+
+    def get_first(self, name: str) -> frozenset[TokenType]:
+        return self._first_of(RuleRef(name))[0]
+
+    def get_alternatives_first(
+        self,
+        name: str
+    ) -> dict[str, frozenset[TokenType]]:
+        # FIRST sets of the alternatives of a rule by their names. An
+        # alternative referring to a syntactic rule, which is only a choice
+        # of other rules, is replaced by the alternatives of that rule
+        alternatives = {}
+        rule = self.rules[name]
+        items = rule.alternatives if isinstance(rule, Alternation) else (rule,)
+        for item in items:
+            if not isinstance(item, RuleRef):
+                raise GrammarError(f"Unnamed alternative in rule '{name}'")
+            referenced = self.rules.get(item.name)
+            if item.name.islower() and isinstance(referenced, Alternation):
+                alternatives.update(self.get_alternatives_first(item.name))
+            else:
+                alternatives[item.name] = self._first_of(item)[0]
+        return alternatives
+
+    def _first_of(self, item) -> tuple[frozenset[TokenType], bool]:
+        # Returns the token types starting the item and if it can be empty
+        if isinstance(item, Terminal):
+            if item.lexeme not in LEXEMES_MAP:
+                raise GrammarError(f"Unknown lexeme '{item.lexeme}'")
+            return frozenset([LEXEMES_MAP[item.lexeme]]), False
+        if isinstance(item, RuleRef):
+            return self._first_of_rule(item.name)
+        if isinstance(item, (Optional, Repetition)):
+            return self._first_of(item.item)[0], True
+        if isinstance(item, Alternation):
+            first = frozenset()
+            nullable = False
+            for alternative in item.alternatives:
+                alternative_first, alternative_nullable = self._first_of(
+                    alternative
+                )
+                first |= alternative_first
+                nullable = nullable or alternative_nullable
+            return first, nullable
+        first = frozenset()
+        for sequence_item in item.items:
+            item_first, item_nullable = self._first_of(sequence_item)
+            first |= item_first
+            if not item_nullable:
+                return first, False
+        return first, True
+
+    def _first_of_rule(self, name: str) -> tuple[frozenset[TokenType], bool]:
+        if name in TOKEN_RULES:
+            return frozenset([TOKEN_RULES[name]]), False
+        if name in self._first:
+            return self._first[name]
+        if name not in self.rules:
+            raise GrammarError(f"Undefined rule '{name}'")
+        if name in self._in_progress:
+            raise GrammarError(f"Left recursive rule '{name}'")
+        self._in_progress.add(name)
+        self._first[name] = self._first_of(self.rules[name])
+        self._in_progress.remove(name)
+        return self._first[name]
+
+    def _parse_alternation(self):
+        # sequence {"|" sequence}
+        alternatives = [self._parse_sequence()]
+        while self._match("symbol", "|"):
+            # The elided alternatives of a range, like "a" | ... | "z"
+            if not self._match("symbol", "..."):
+                alternatives.append(self._parse_sequence())
+        if len(alternatives) == 1:
+            return alternatives[0]
+        return Alternation(tuple(alternatives))
+
+    def _parse_sequence(self):
+        # item {[","] item}
+        items = []
+        while True:
+            self._match("symbol", ",")
+            item = self._parse_item()
+            if item is None:
+                break
+            items.append(item)
+        if len(items) == 1:
+            return items[0]
+        return Sequence(tuple(items))
+
+    def _parse_item(self):
+        # Exceptions of the lexical rules don't change the first tokens
+        # of the syntactic ones, so they are skipped
+        item = self._parse_primary()
+        while item is not None and self._match("symbol", "-"):
+            self._parse_primary()
+        return item
+
+    def _parse_primary(self):
+        if (lexeme := self._match("terminal")) is not None:
+            return Terminal(_unquote(lexeme))
+        if (name := self._match("name")) is not None:
+            return RuleRef(name)
+        for opening, closing, node_type in (
+            ("[", "]", Optional),
+            ("{", "}", Repetition),
+            ("(", ")", None)
+        ):
+            if self._match("symbol", opening):
+                item = self._parse_alternation()
+                self._expect("symbol", closing)
+                return node_type(item) if node_type else item
+        return None
+
+    def _match(self, kind: str, value: str | None = None) -> str | None:
+        if self._index == len(self._symbols):
+            return None
+        symbol_kind, symbol_value = self._symbols[self._index]
+        if symbol_kind != kind or value not in (None, symbol_value):
+            return None
+        self._index += 1
+        return symbol_value
+
+    def _expect(self, kind: str, value: str | None = None) -> str:
+        result = self._match(kind, value)
+        if result is None:
+            raise GrammarError(
+                f"Expected {value or kind} at symbol {self._index}"
+            )
+        return result
+
+
+def _tokenize(text: str) -> list[tuple[str, str]]:
+    symbols = []
+    index = 0
+    while index < len(text):
+        match = EBNF_PATTERN.match(text, index)
+        if not match:
+            raise GrammarError(f"Invalid character at index {index}")
+        if match.lastgroup:
+            symbols.append((match.lastgroup, match.group(match.lastgroup)))
+        index = match.end()
+    return symbols
+
+
+def _unquote(lexeme: str) -> str:
+    return re.sub(r"\\(.)", r"\1", lexeme[1:-1])
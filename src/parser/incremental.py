@@ -0,0 +1,321 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Callable
+
+from lexer.lexers import BaseLexer, RegexLexer
+from lexer.streams import Position
+from lexer.symbols import SymbolTable
+from lexer.tokens import Token, TokenType
+from lexer.exceptions import LexerError
+
+from parser.models import Program, Stmt
+from parser.parser import Parser
+
+
+@dataclass
+class Segment:
+    """A top-level statement together with the comments and whitespace
+    before it. Offsets of its tokens and nodes are counted from the start
+    of the segment, so they stay valid when the text before it changes.
+    The last segment has no statement and holds the trailing comments
+    and EOF. The segments hold the text between them, and an edit puts
+    the text it changed into a segment which isn't parsed yet."""
+    start: int
+    end: int = 0
+    # The parser decides where a statement ends by the token after it,
+    # for example an `if` without `else`, so an edit up to the end of
+    # that token changes the statement as well
+    lookahead_end: int = 0
+    statement: Stmt | None = None
+    tokens: list[Token] = field(default_factory=list)
+    text: str = ""
+    parsed: bool = True
+    # Segments after the last edit count their indexes back from the end
+    # of the text, see `IncrementalParser.gap`
+    from_end: bool = False
+
+    def move(self, delta: int) -> None:
+        self.start += delta
+        self.end += delta
+        self.lookahead_end += delta
+
+
+class SegmentSource:
+    """Resolves offsets of a segment into positions in the whole text."""
+
+    def __init__(self, parser: IncrementalParser, segment: Segment):
+        self.parser = parser
+        self.segment = segment
+
+    def resolve(self, offset: int) -> Position:
+        text = self.parser.text
+        start = self.segment.start
+        if self.segment.from_end:
+            start += len(text)
+        if text.isascii():
+            index = byte_offset = start + offset
+        else:
+            prefix = text[start:start + offset].encode('utf-8')[:offset]
+            index = start + len(prefix.decode('utf-8'))
+            byte_offset = len(text[:start].encode('utf-8')) + offset
+        line_start = text.rfind("\n", 0, index) + 1
+        return Position(
+            text.count("\n", 0, index) + 1,
+            index - line_start + 1,
+            byte_offset,
+            self.parser.filename
+        )
+
+
+class _WindowTooSmall(Exception):
+    # The lexer reached the end of the text it was given before the end
+    # of the whole text
+    pass
+
+
+class _RecordingLexer(BaseLexer):
+    # Keeps every token read by the parser with the index of its end
+    def __init__(self, lexer: RegexLexer, partial: bool):
+        self.lexer = lexer
+        self.partial = partial
+        self.tokens: list[Token] = []
+        self.ends: list[int] = []
+
+    def next_token(self) -> Token:
+        try:
+            token = self.lexer.next_token()
+        except LexerError:
+            self._check_end()
+            raise
+        self._check_end()
+        self.tokens.append(token)
+        self.ends.append(self.lexer.index)
+        return token
+
+    def _check_end(self) -> None:
+        # A lexeme reaching the end of a part of the text may go on
+        # after it, for example a string whose quote is in the next part
+        if self.partial and self.lexer.index == len(self.lexer.text):
+            raise _WindowTooSmall
+
+
+class IncrementalParser:
+    """Keeps the program of a text that is edited over time up to date.
+
+    The text is split into segments, one per top-level statement. An edit
+    replaces the segments it touches with the text they hold after the
+    edit, then `parse` lexes and parses again only from the end of the
+    last segment before the edit until a statement ends exactly where one
+    of the kept segments starts. Only the text of the segments from there
+    is joined for the lexer, so neither step depends on the length of the
+    whole text. The statements, tokens and offsets of the kept segments
+    are reused as they are, and the statements of the program are
+    replaced in place, so the same program is returned by every call of
+    `parse`."""
+
+    def __init__(self, text: str = "", filename: str | None = None):
+        self.filename = filename
+        self.symbols = SymbolTable()
+        self.segments: list[Segment] = []
+        if text:
+            self.segments.append(
+                Segment(0, len(text), len(text), text=text, parsed=False)
+            )
+        self.length = len(text)
+        self.program = Program([])
+        # Segments from this index on count their indexes from the end of
+        # the text, like the text after the gap of a gap buffer, so an
+        # edit before them doesn't have to move them. The gap is moved to
+        # every edit, which only touches the segments between the two
+        self.gap = len(self.segments)
+        self._text: str | None = text
+        # The range of the text, which was not parsed since it was edited
+        self.damaged: tuple[int, int] | None = (0, len(text))
+
+    @property
+    def text(self) -> str:
+        # Joined only when asked for, for example to resolve a position
+        if self._text is None:
+            self._text = "".join(segment.text for segment in self.segments)
+        return self._text
+
+    @property
+    def tokens(self) -> list[Token]:
+        return [token for segment in self.segments for token in segment.tokens]
+
+    def edit(self, start: int, end: int, text: str) -> None:
+        # Replaces the text between the `start` and `end` indexes
+        first = self._find(start, _get_lookahead_end)
+        last = self._find(end, _get_start, first)
+        # The segments after the edit count from the end of the text,
+        # which doesn't change
+        self._move_gap(last)
+        # The touched segments hold the text from the start of the first
+        # one to the start of the segment after the edit
+        base = self.segments[first].start if first < last else start
+        touched = "".join(
+            segment.text for segment in self.segments[first:last]
+        )
+        touched = touched[:start - base] + text + touched[end - base:]
+        self.segments[first:last] = [Segment(
+            base,
+            base + len(touched),
+            base + len(touched),
+            text=touched,
+            parsed=False
+        )] if touched else []
+        self.gap = first + bool(touched)
+        delta = len(text) - (end - start)
+        self.length += delta
+        self._text = None
+
+        new_end = start + len(text)
+
+        def move(index: int) -> int:
+            return index if index <= start else max(index + delta, new_end)
+
+        if self.damaged is None:
+            self.damaged = (start, new_end)
+        else:
+            damaged_start, damaged_end = self.damaged
+            self.damaged = (
+                min(start, move(damaged_start)),
+                max(new_end, move(damaged_end))
+            )
+
+    def parse(self) -> Program:
+        if self.damaged is not None:
+            self._parse_damaged(*self.damaged)
+            self.damaged = None
+        return self.program
+
+    def _find(
+        self,
+        index: int,
+        key: Callable[[Segment], int],
+        low: int = 0
+    ) -> int:
+        # Index of the first segment from `low` whose index, given by
+        # `key`, isn't before the `index` of the text
+        if low < self.gap:
+            found = bisect_left(self.segments, index, low, self.gap, key=key)
+            if found < self.gap:
+                return found
+            low = self.gap
+        return bisect_left(self.segments, index - self.length, low, key=key)
+
+    def _move_gap(self, gap: int) -> None:
+        segments = self.segments
+        while self.gap < gap:
+            segments[self.gap].move(self.length)
+            segments[self.gap].from_end = False
+            self.gap += 1
+        while self.gap > gap:
+            self.gap -= 1
+            segments[self.gap].move(-self.length)
+            segments[self.gap].from_end = True
+
+    def _parse_damaged(self, damaged_start: int, damaged_end: int) -> None:
+        first = self._find(damaged_start, _get_lookahead_end)
+        self._move_gap(first)
+        after = self._find(damaged_end, _get_start, first)
+        # The text is lexed from the end of the last segment before the
+        # damage up to a few segments after it, and more of them are
+        # added if the statements go on past them
+        count = 1
+        while True:
+            last = min(after + count, len(self.segments))
+            try:
+                self._parse_window(first, last, damaged_end)
+                return
+            except _WindowTooSmall:
+                count *= 2
+
+    def _parse_window(self, first: int, last: int, damaged_end: int) -> None:
+        segments = self.segments
+        offset = segments[first - 1].end if first else 0
+        window = "".join(segment.text for segment in segments[first:last])
+        partial = last < len(segments)
+        start = 0
+        parsed = []
+        while True:
+            segment = self._parse_segment(window, start, offset, partial)
+            parsed.append(segment)
+            if segment.statement is None:
+                self._replace(first, len(segments), parsed)
+                return
+            start = segment.end - offset
+            if segment.end < damaged_end:
+                continue
+            # Everything after a statement boundary, which is also
+            # the start of a kept segment, is parsed the same as before
+            from_end = segment.end - self.length
+            index = bisect_left(segments, from_end, first, key=_get_start)
+            if (
+                index < len(segments)
+                and segments[index].start == from_end
+                and segments[index].parsed
+            ):
+                self._replace(first, index, parsed)
+                return
+
+    def _replace(self, first: int, last: int, parsed: list[Segment]) -> None:
+        # The statements before `first` and of the segments from `last`
+        # but the final one belong to the kept segments
+        statements = self.program.statements
+        kept = max(len(self.segments) - last - 1, 0)
+        statements[first:len(statements) - kept] = [
+            segment.statement for segment in parsed
+            if segment.statement is not None
+        ]
+        self.segments[first:last] = parsed
+        self.gap = first + len(parsed)
+
+    def _parse_segment(
+        self,
+        window: str,
+        start: int,
+        offset: int,
+        partial: bool
+    ) -> Segment:
+        # Parses a segment starting at the `start` index of a window of
+        # the text, which begins at the `offset` index of the whole text
+        segment = Segment(offset + start)
+        lexer = _RecordingLexer(RegexLexer(
+            window,
+            symbols=self.symbols,
+            start=start,
+            line_index=SegmentSource(self, segment)
+        ), partial)
+        parser = Parser(lexer)
+        segment.statement = parser.run(parser.parse_statement())
+        segment.lookahead_end = offset + lexer.ends[-1]
+        if segment.statement is None:
+            parser.parse_eof()
+            end = lexer.ends[-1]
+            tokens = lexer.tokens
+        else:
+            # The parser has already read the first token after the
+            # statement and possibly some more, if it peeked at them
+            last = len(lexer.tokens) - 1
+            while lexer.tokens[last] is not parser.current_token:
+                last -= 1
+            last -= 1
+            while lexer.tokens[last].type == TokenType.COMMENT:
+                last -= 1
+            end = lexer.ends[last]
+            tokens = lexer.tokens[:last + 1]
+        segment.end = offset + end
+        segment.tokens = tokens
+        segment.text = window[start:end]
+        return segment
+
+
+def _get_start(segment: Segment) -> int:
+    return segment.start
+
+
+def _get_lookahead_end(segment: Segment) -> int:
+    return segment.lookahead_end
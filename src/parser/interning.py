@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+from array import array
+from functools import cache
+from dataclasses import fields
+from typing import Iterator
+
+from lexer.streams import Position, resolve_position
+from lexer.tokens import TokenType
+
+from parser.models import (
+    Program,
+    Stmt,
+    Expr,
+    AssignmentExpr,
+    BinaryExpr,
+    UnaryExpr,
+    LogicalExpr,
+    GroupingExpr,
+    CallExpr,
+    LiteralExpr,
+    IdentifierExpr,
+    LazyBlock
+)
+
+
+def _get_node_types(node_type: type = Stmt) -> frozenset[type]:
+    return frozenset({node_type}).union(*map(
+        _get_node_types,
+        node_type.__subclasses__()
+    ))
+
+
+# Types of all the nodes, for checking fields without the slow `isinstance`
+# of abstract classes
+NODE_TYPES = _get_node_types()
+# Only children of these nodes are shared. They are all evaluated by
+# `Interpreter.evaluate` or `execute`, which find the position of an error
+# raised by a shared child
+SHARING_PARENTS = (
+    AssignmentExpr,
+    BinaryExpr,
+    UnaryExpr,
+    LogicalExpr,
+    GroupingExpr,
+    CallExpr
+)
+SHAREABLE_TYPES = (LiteralExpr, IdentifierExpr, GroupingExpr, UnaryExpr)
+
+
+class NodeTable:
+    """Keeps one node of every group of structurally equal leaves, that is
+    literals and identifiers, and of small subtrees of constants, like
+    `-1` or `(not nil)`, which can't raise errors. Shared nodes have no
+    offset, so they can be used in any place and in many programs."""
+
+    def __init__(self):
+        self.nodes: dict[tuple, Expr] = {}
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def intern(self, node: Expr, children: list[Expr | None]) -> Expr | None:
+        # Returns the shared node equal to the given one, whose children
+        # were already replaced with the shared ones (`None` if not shared),
+        # or `None` if it can't be shared
+        key = self._get_key(node, children)
+        if key is None:
+            return None
+        shared = self.nodes.get(key)
+        if shared is None:
+            shared = self.nodes[key] = self._create(node, children)
+        return shared
+
+    def _get_key(self, node: Expr, children: list[Expr | None]) -> tuple:
+        node_type = type(node)
+        if node_type is LiteralExpr:
+            # `1`, `1.0` and `true` are equal in Python, but not here
+            return node_type, type(node.value), node.value
+        if node_type is IdentifierExpr:
+            # Identifiers bound to the slot of their scope by the resolver
+            # refer to different variables in different places
+            if node.slot is not None:
+                return None
+            return node_type, node.name
+        if node_type is GroupingExpr:
+            child = children[0]
+            if _is_constant(child):
+                return node_type, id(child)
+        if node_type is UnaryExpr:
+            child = children[0]
+            if (
+                node.operator == TokenType.NOT and _is_constant(child)
+                or node.operator == TokenType.MINUS and _is_number(child)
+            ):
+                return node_type, node.operator, id(child)
+        return None
+
+    def _create(self, node: Expr, children: list[Expr | None]) -> Expr:
+        node_type = type(node)
+        if node_type is LiteralExpr:
+            return LiteralExpr(node.value)
+        if node_type is IdentifierExpr:
+            return IdentifierExpr(node.name)
+        if node_type is GroupingExpr:
+            return GroupingExpr(children[0])
+        return UnaryExpr(node.operator, children[0])
+
+
+class PositionTable:
+    """Offsets of the occurrences of shared nodes, which have none of their
+    own, in the order `share_nodes` found them. An offset is looked up by
+    walking the program again in the same order, which is slow, but it's
+    only needed for errors, and the table takes 8 bytes per occurrence."""
+
+    def __init__(self, program: Program):
+        self.program = program
+        self.offsets = array('q')
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def get(self, parent: Stmt, index: int) -> Position | None:
+        # Position of the shared child at the index among node children of
+        # the parent
+        for number, (node, child_index, _) in enumerate(
+            _iter_shared_children(self.program)
+        ):
+            if node is parent and child_index == index:
+                return self._resolve(number, parent)
+        return None
+
+    def find(self, parent: Stmt, child: Expr) -> Position | None:
+        # Position of the first occurrence of the child in the parent,
+        # which is evaluated first
+        for number, (node, _, shared) in enumerate(
+            _iter_shared_children(self.program)
+        ):
+            if node is parent and shared is child:
+                return self._resolve(number, parent)
+        return None
+
+    def _resolve(self, number: int, parent: Stmt) -> Position | None:
+        offset = self.offsets[number]
+        if offset < 0:
+            return None
+        # Shared children come from the same source as their parents
+        return resolve_position(offset, parent.source)
+
+
+def share_nodes(
+    program: Program,
+    nodes: NodeTable | None = None
+) -> PositionTable:
+    """Replaces the structurally equal leaves and small constant subtrees
+    of the program with shared nodes from the table and returns the
+    offsets of the replaced nodes. Bodies of lazy functions are left as
+    they are."""
+    nodes = NodeTable() if nodes is None else nodes
+    positions = PositionTable(program)
+    offsets = positions.offsets
+    # Shared nodes by the ids of the nodes they replace. Children are
+    # visited before their parents, without recursion
+    shared = {}
+    stack = [(node, None) for node in reversed(program.statements)]
+    while stack:
+        node, slots = stack.pop()
+        if slots is None:
+            slots = _get_child_slots(node)
+            stack.append((node, slots))
+            stack.extend((child, None) for _, _, child in reversed(slots))
+            continue
+        if type(node) in SHAREABLE_TYPES:
+            replacement = nodes.intern(
+                node,
+                [shared.get(id(child)) for _, _, child in slots]
+            )
+            if replacement is not None:
+                # Replaced by its parent, with its whole subtree
+                shared[id(node)] = replacement
+                continue
+        is_parent = type(node) in SHARING_PARENTS
+        for holder, key, child in slots:
+            replacement = shared.get(id(child)) if is_parent else None
+            # Nodes without an offset take a place in the table as well,
+            # as the lookup can't tell them from the shared ones
+            if replacement is not None or child.offset is None:
+                offset = child.offset
+                offsets.append(-1 if offset is None else offset)
+            if replacement is None:
+                continue
+            if type(holder) is list:
+                holder[key] = replacement
+            else:
+                setattr(holder, key, replacement)
+    return positions
+
+
+def _iter_shared_children(
+    program: Program
+) -> Iterator[tuple[Stmt, int, Expr]]:
+    # Parents, indexes and shared children in the order of `share_nodes`
+    stack = [(node, None) for node in reversed(program.statements)]
+    while stack:
+        node, slots = stack.pop()
+        if slots is None:
+            slots = _get_child_slots(node)
+            stack.append((node, slots))
+            stack.extend(
+                (child, None) for _, _, child in reversed(slots)
+                if child.offset is not None
+            )
+            continue
+        for index, (_, _, child) in enumerate(slots):
+            if child.offset is None:
+                yield node, index, child
+
+
+def _get_child_slots(node: Stmt) -> list[tuple[object, object, Stmt]]:
+    # Child nodes with the objects holding them and their keys there
+    slots = []
+    if type(node) is LazyBlock:
+        return slots
+    for name in _get_child_fields(type(node)):
+        value = getattr(node, name)
+        if type(value) is list:
+            slots.extend(
+                (value, index, item) for index, item in enumerate(value)
+                if type(item) in NODE_TYPES
+            )
+        elif type(value) in NODE_TYPES:
+            slots.append((node, name, value))
+    return slots
+
+
+@cache
+def _get_child_fields(node_type: type) -> tuple[str, ...]:
+    # Fields left out of comparisons, like the offset, don't hold nodes
+    return tuple(
+        node_field.name for node_field in fields(node_type)
+        if node_field.compare
+    )
+
+
+def _is_constant(node: Expr | None) -> bool:
+    # Shared nodes other than identifiers can't raise errors
+    return node is not None and type(node) is not IdentifierExpr
+
+
+def _is_number(node: Expr | None) -> bool:
+    while type(node) is GroupingExpr or type(node) is UnaryExpr:
+        if type(node) is UnaryExpr and node.operator != TokenType.MINUS:
+            return False
+        node = node.right if type(node) is UnaryExpr else node.expression
+    return (
+        type(node) is LiteralExpr
+        and type(node.value) in (int, float)
+    )
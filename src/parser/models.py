@@ -1,12 +1,14 @@
 from __future__ import annotations
+from copy import copy
 from dataclasses import dataclass, field
 from abc import ABC, abstractmethod
 
+from lexer.lexers import BaseLexer
 from lexer.tokens import TokenType
-from lexer.streams import Position
+from lexer.streams import Position, LineIndex, resolve_position
 
 
-@dataclass
+@dataclass(slots=True)
 class Program:
     statements: list[Stmt]
 
@@ -14,30 +16,42 @@ class Program:
         return visitor.visit_program(self)
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class Stmt(ABC):
-    position: Position | None = field(default=None, compare=False, repr=False)
+    # Only the offset of the node is stored, the position is resolved
+    # from the line index of the source when it's needed
+    offset: int | None = field(default=None, compare=False, repr=False)
+    source: LineIndex | Position | None = field(
+        default=None, compare=False, repr=False
+    )
+
+    @property
+    def position(self) -> Position | None:
+        return resolve_position(self.offset, self.source)
 
     @abstractmethod
     def accept(self, visitor: Visitor) -> None:
         pass
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class Expr(Stmt):
     pass
 
 
-@dataclass
+@dataclass(slots=True)
 class AssignmentExpr(Expr):
     name: str
     value: Expr
+    # Scope depth and slot of the variable, see `interpreter.resolver`
+    depth: int | None = field(default=None, compare=False, repr=False)
+    slot: int | None = field(default=None, compare=False, repr=False)
 
     def accept(self, visitor: Visitor) -> None:
         return visitor.visit_assignment_expr(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class BinaryExpr(Expr):
     left: Expr
     operator: TokenType
@@ -47,7 +61,7 @@ class BinaryExpr(Expr):
         return visitor.visit_binary(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class LiteralExpr(Expr):
     value: int | float | str | None
 
@@ -55,7 +69,7 @@ class LiteralExpr(Expr):
         return visitor.visit_literal(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class UnaryExpr(Expr):
     operator: TokenType
     right: Expr
@@ -64,7 +78,7 @@ class UnaryExpr(Expr):
         return visitor.visit_unary(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class LogicalExpr(Expr):
     left: Expr
     operator: TokenType
@@ -74,7 +88,7 @@ class LogicalExpr(Expr):
         return visitor.visit_logical(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class GroupingExpr(Expr):
     expression: Expr
 
@@ -82,15 +96,17 @@ class GroupingExpr(Expr):
         return visitor.visit_grouping(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class IdentifierExpr(Expr):
     name: str
+    depth: int | None = field(default=None, compare=False, repr=False)
+    slot: int | None = field(default=None, compare=False, repr=False)
 
     def accept(self, visitor: Visitor) -> None:
         return visitor.visit_identifier(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class CallExpr(Expr):
     callee: Expr
     arguments: list[Expr]
@@ -99,35 +115,101 @@ class CallExpr(Expr):
         return visitor.visit_call(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class BlockStmt(Stmt):
     statements: list[Stmt]
+    # Slots of the variables declared in the block
+    scope: dict[str, int] | None = field(
+        default=None, compare=False, repr=False
+    )
 
     def accept(self, visitor: Visitor) -> None:
         return visitor.visit_block_stmt(self)
 
 
-@dataclass
+class LazyBlock(BlockStmt):
+    """A function body skipped by a parser with lazy functions. It keeps
+    the span of the body between its braces and a lexer reading it from
+    the opening one, and the statements are parsed when they are first
+    used, usually at the first call of the function. Syntax errors in
+    the body are raised at that point."""
+
+    __slots__ = ("lexer", "parser_type", "end_offset", "_statements")
+
+    def __init__(
+        self,
+        lexer: BaseLexer,
+        parser_type: type,
+        end_offset: int,
+        *,
+        offset: int | None = None,
+        source: LineIndex | Position | None = None
+    ):
+        self.lexer = lexer
+        self.parser_type = parser_type
+        self.end_offset = end_offset
+        self.offset = offset
+        self.source = source
+        self.scope = None
+        self._statements: list[Stmt] | None = None
+
+    @property
+    def span(self) -> tuple[int, int]:
+        return self.offset, self.end_offset
+
+    @property
+    def statements(self) -> list[Stmt]:
+        if self._statements is None:
+            # A copy is read, so a failed parse can be repeated
+            parser = self.parser_type(copy(self.lexer), lazy_functions=True)
+            self._statements = parser.run(parser.parse_block()).statements
+            self.lexer = None
+        return self._statements
+
+    def __eq__(self, other: object) -> bool:
+        # Equal to a block parsed right away with the same statements
+        if not isinstance(other, BlockStmt):
+            return NotImplemented
+        return self.statements == other.statements
+
+    def __getstate__(self) -> tuple:
+        # The body isn't parsed for pickling, unlike by the state of
+        # a `BlockStmt`, which holds its statements
+        return (
+            self.lexer, self.parser_type, self.end_offset, self.offset,
+            self.source, self.scope, self._statements
+        )
+
+    def __setstate__(self, state: tuple) -> None:
+        (
+            self.lexer, self.parser_type, self.end_offset, self.offset,
+            self.source, self.scope, self._statements
+        ) = state
+
+
+@dataclass(slots=True)
 class FunctionStmt(Stmt):
     name: str
     params: list[Parameter]
     block: BlockStmt
+    slot: int | None = field(default=None, compare=False, repr=False)
 
     def accept(self, visitor: Visitor) -> None:
         return visitor.visit_function_stmt(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class VariableStmt(Stmt):
     name: str
     expression: Expr | None
     is_const: bool
+    slot: int | None = field(default=None, compare=False, repr=False)
 
     def accept(self, visitor: Visitor) -> None:
         return visitor.visit_variable_stmt(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class IfStmt(Stmt):
     condition: Expr
     body: Stmt
@@ -137,7 +219,7 @@ class IfStmt(Stmt):
         return visitor.visit_if_stmt(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class WhileStmt(Stmt):
     condition: Expr
     body: Stmt
@@ -146,7 +228,7 @@ class WhileStmt(Stmt):
         return visitor.visit_while_stmt(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class ReturnStmt(Stmt):
     expression: Expr | None
 
@@ -154,7 +236,7 @@ class ReturnStmt(Stmt):
         return visitor.visit_return_stmt(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class MatchStmt(Stmt):
     arguments: list[Expr]
     case_blocks: list[CaseStmt]
@@ -163,17 +245,20 @@ class MatchStmt(Stmt):
         return visitor.visit_match_stmt(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class CaseStmt(Stmt):
     patterns: list[PatternExpr]
     guard: Guard | None
     body: Stmt
+    scope: dict[str, int] | None = field(
+        default=None, compare=False, repr=False
+    )
 
     def accept(self, visitor: Visitor) -> None:
         return visitor.visit_case_stmt(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class Guard(Stmt):
     # TODO: Stmt or Expr?
     condition: Expr
@@ -182,16 +267,17 @@ class Guard(Stmt):
         return visitor.visit_guard(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class PatternExpr(Expr):
     pattern: Expr | None
     name: str | None
+    slot: int | None = field(default=None, compare=False, repr=False)
 
     def accept(self, visitor: Visitor) -> None:
         return visitor.visit_pattern_expr(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class ComparePatternExpr(Expr):
     operator: TokenType | None
     right: Expr
@@ -200,7 +286,7 @@ class ComparePatternExpr(Expr):
         return visitor.visit_compare_pattern_expr(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class TypePatternExpr(Expr):
     type: TokenType
 
@@ -208,10 +294,11 @@ class TypePatternExpr(Expr):
         return visitor.visit_type_pattern_expr(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class Parameter(Stmt):
     name: str
     is_const: bool
+    slot: int | None = field(default=None, compare=False, repr=False)
 
     def accept(self, visitor: Visitor) -> None:
         return visitor.visit_parameter(self)
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import io
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from math import inf
+
+from lexer.lexers import RegexLexer, TOKEN_PATTERN
+from lexer.streams import LineIndex
+from lexer.tokens import COMMENT_CHAR, TokenType
+from lexer.exceptions import LexerError
+
+from parser.models import Program, Stmt
+from parser.parser import Parser
+from parser.serialization import write_binary, read_binary
+from parser.exceptions import ParserError
+
+
+# Statements end with a semicolon or a closing brace outside of comments,
+# strings, parentheses and braces
+BOUNDARY_PATTERN = re.compile(
+    re.escape(COMMENT_CHAR) + r'[^\r\n]*|"(?:[^"\\]|\\.)*"?'
+    + r"|(?P<PUNCTUATION>[;{}()])",
+    re.DOTALL
+)
+DEPTH_CHANGES = {"(": 1, "{": 1, ")": -1, "}": -1, ";": 0}
+
+# Source and line index of a worker process, see `_initialize_worker`
+_text: str | None = None
+_line_index: LineIndex | None = None
+
+
+def find_boundaries(text: str, chunk_size: int) -> list[int]:
+    # Indexes of top-level statement ends about `chunk_size` chars apart,
+    # followed by the end of the text. A statement followed by `else`
+    # doesn't end there, as it's the body of an `if`
+    boundaries = []
+    next_boundary = chunk_size
+    depth = 0
+    for match in BOUNDARY_PATTERN.finditer(text):
+        punctuation = match.group("PUNCTUATION")
+        if not punctuation:
+            continue
+        depth += DEPTH_CHANGES[punctuation]
+        if (
+            depth == 0
+            and punctuation in ";}"
+            and match.end() >= next_boundary
+            and not _is_followed_by_else(text, match.end())
+        ):
+            boundaries.append(match.end())
+            next_boundary = match.end() + chunk_size
+    if not boundaries or boundaries[-1] != len(text):
+        boundaries.append(len(text))
+    return boundaries
+
+
+def parse_parallel(
+    text: str,
+    filename: str | None = None,
+    workers: int | None = None,
+    chunks_per_worker: int = 4
+) -> Program:
+    """Parses the text split at top-level statement boundaries in worker
+    processes and joins the statements in source order.
+
+    The result is the same as of `Parser(RegexLexer(text)).parse()`. If
+    a piece fails to parse, or its statements don't end where the next
+    piece begins, the text is parsed again sequentially, so that the
+    same error is raised as by the sequential parser."""
+    workers = workers or os.cpu_count() or 1
+    line_index = LineIndex.from_text(text, filename)
+    chunk_size = len(text) // (workers * chunks_per_worker) + 1
+    starts = [0, *find_boundaries(text, chunk_size)]
+    is_ascii = text.isascii()
+    chunks = []
+    offset = 0
+    for start, end in zip(starts, starts[1:]):
+        size = end - start
+        if not is_ascii:
+            size = len(text[start:end].encode('utf-8'))
+        last = end == len(text)
+        chunks.append((start, offset, inf if last else offset + size))
+        offset += size
+    with ProcessPoolExecutor(
+        workers,
+        initializer=_initialize_worker,
+        initargs=(text,)
+    ) as executor:
+        results = list(executor.map(_parse_chunk, *zip(*chunks)))
+    statements = _join_results(results, line_index)
+    if statements is None:
+        return Parser(RegexLexer(text, filename)).parse()
+    return Program(statements)
+
+
+def _join_results(
+    results: list[tuple[int, int, bytes] | None],
+    line_index: LineIndex
+) -> list[Stmt] | None:
+    statements = []
+    next_offset = None
+    for result in results:
+        if result is None:
+            return None
+        first_offset, end_offset, payload = result
+        # The previous piece must end right before the first token of
+        # this one, or its last statement went on into this piece
+        if next_offset is not None and next_offset != first_offset:
+            return None
+        next_offset = end_offset
+        statements += read_binary(io.BytesIO(payload), line_index).statements
+    return statements
+
+
+def _is_followed_by_else(text: str, index: int) -> bool:
+    match = TOKEN_PATTERN.match(text, index)
+    while match.lastgroup == "COMMENT":
+        match = TOKEN_PATTERN.match(text, match.end())
+    return match.group("IDENTIFIER") == "else"
+
+
+def _initialize_worker(text: str) -> None:
+    global _text, _line_index
+    _text = text
+    _line_index = LineIndex.from_text(text)
+
+
+def _parse_chunk(
+    start: int,
+    start_offset: int,
+    end_offset: int | float
+) -> tuple[int, int, bytes] | None:
+    # Returns the offset of the first token, of the token after the last
+    # statement and the serialized statements, or `None` on a syntax error,
+    # which is reported by the sequential parser instead. Any other error
+    # is a bug and is raised in the main process
+    try:
+        lexer = RegexLexer(_text, line_index=_line_index)
+        lexer.seek(start, start_offset)
+        parser = Parser(lexer)
+        first_offset = parser.current_token.offset
+        statements = []
+        while (
+            parser.current_token.type != TokenType.EOF
+            and parser.current_token.offset < end_offset
+        ):
+            statement = parser.run(parser.parse_statement())
+            if statement is None:
+                return None
+            statements.append(statement)
+        if end_offset == inf:
+            parser.parse_eof()
+        # The binary format is written without recursion, so statements
+        # of any depth are sent, and nodes get the line index of the main
+        # process when they're read
+        payload = io.BytesIO()
+        write_binary(Program(statements), payload)
+    except (LexerError, ParserError):
+        return None
+    return first_offset, parser.current_token.offset, payload.getvalue()
@@ -1,4 +1,5 @@
 from lexer.lexers import BaseLexer
+from lexer.streams import Position
 from lexer.tokens import Token, TokenType, LITERALS, TYPES, COMPARISON_TYPES
 
 from parser.models import (
@@ -25,7 +26,8 @@ from parser.models import (
     ComparePatternExpr,
     TypePatternExpr,
     Parameter,
-    BlockStmt
+    BlockStmt,
+    LazyBlock
 )
 from parser.exceptions import (
     ParserError,
@@ -56,82 +58,214 @@ from parser.exceptions import (
     DuplicatePatternNamesError
 )
 
-from typing import Callable
+from collections import deque
+from math import inf
+from types import GeneratorType
+from typing import Any, Callable, Generator, Iterator, TypeVar
+
+
+T = TypeVar("T")
+# A parsing step is a generator, which yields the nested steps it needs
+# and is sent their results back, see `Parser.run`. Methods, which don't
+# need any nested step for the input, return the node itself instead
+Step = Generator[Any, Any, T]
+
+# Binding power of the binary operators, the higher the tighter
+BINARY_PRECEDENCE = {
+    TokenType.OR: 1,
+    TokenType.AND: 2,
+    TokenType.BANG_EQUAL: 3,
+    TokenType.EQUAL_EQUAL: 3,
+    TokenType.GREATER: 4,
+    TokenType.GREATER_EQUAL: 4,
+    TokenType.LESS: 4,
+    TokenType.LESS_EQUAL: 4,
+    TokenType.PLUS: 5,
+    TokenType.MINUS: 5,
+    TokenType.SLASH: 6,
+    TokenType.STAR: 6
+}
+COMPARISON_PRECEDENCE = 4
+LOGICAL_OPERATORS = frozenset([TokenType.OR, TokenType.AND])
+MISSING_OPERAND_MESSAGES = {
+    TokenType.OR: "Missing expression after 'or' statement",
+    TokenType.AND: "Missing expression after 'and' statement"
+}
+LITERAL_TYPES = frozenset(LITERALS)
+KEYWORD_LITERAL_VALUES = {TokenType.TRUE: True, TokenType.FALSE: False}
+
+# FIRST sets of the alternatives of `statement` and `primary` in
+# grammar.ebnf, the tests check them against the grammar file
+EXPRESSION_FIRST = frozenset([
+    TokenType.IDENTIFIER,
+    TokenType.MINUS,
+    TokenType.NOT,
+    TokenType.LEFT_PAREN,
+    *LITERALS
+])
+STATEMENT_FIRST = {
+    "function_declaration": frozenset([TokenType.FUNCTION]),
+    "variable_declaration": frozenset([TokenType.VAR, TokenType.CONST]),
+    "expression_statement": EXPRESSION_FIRST,
+    "if_statement": frozenset([TokenType.IF]),
+    "while_statement": frozenset([TokenType.WHILE]),
+    "return_statement": frozenset([TokenType.RETURN]),
+    "match_statement": frozenset([TokenType.MATCH])
+}
+PRIMARY_FIRST = {
+    "call": frozenset([TokenType.IDENTIFIER]),
+    "IDENTIFIER": frozenset([TokenType.IDENTIFIER]),
+    "LITERAL": LITERAL_TYPES,
+    "grouping": frozenset([TokenType.LEFT_PAREN])
+}
+# Names of the parser methods for the alternatives
+STATEMENT_PARSERS = {
+    "function_declaration": "parse_function_declaration",
+    "variable_declaration": "parse_variable_declaration",
+    "expression_statement": "parse_expression_stmt",
+    "if_statement": "parse_if",
+    "while_statement": "parse_while",
+    "return_statement": "parse_return",
+    "match_statement": "parse_match"
+}
+PRIMARY_PARSERS = {
+    "call": "parse_identifier_or_call",
+    "IDENTIFIER": "parse_identifier_or_call",
+    "LITERAL": "parse_literal",
+    "grouping": "parse_grouping"
+}
+
+
+def create_dispatch_table(
+    first_sets: dict[str, frozenset[TokenType]],
+    parsers: dict[str, str]
+) -> dict[TokenType, str]:
+    # Maps every token type starting an alternative to its parser method
+    table = {}
+    for name, first in first_sets.items():
+        for token_type in first:
+            if table.setdefault(token_type, parsers[name]) != parsers[name]:
+                raise ValueError(
+                    f"Alternatives '{table[token_type]}' and '{name}' both "
+                    f"start with '{token_type}'"
+                )
+    return table
+
+
+STATEMENT_DISPATCH = create_dispatch_table(STATEMENT_FIRST, STATEMENT_PARSERS)
+PRIMARY_DISPATCH = create_dispatch_table(PRIMARY_FIRST, PRIMARY_PARSERS)
 
 
 class Parser:
-    def __init__(self, lexer: BaseLexer):
+    def __init__(self, lexer: BaseLexer, lazy_functions: bool = False):
         self.lexer = lexer
-        self.queue = []
+        # Function bodies are skipped and parsed on first use, if the lexer
+        # can skip a block
+        self.lazy_functions = lazy_functions
+        # Tokens after the current one, which were read by `peek`
+        self.lookahead: deque[Token] = deque()
         self.next_token()
 
-    def parse_statement(self) -> Stmt | None:
+    def run(self, step: Step[T]) -> T:
+        # Runs the nested steps on an explicit stack instead of the call
+        # stack, so that the depth of the input is limited only by memory.
+        # Nodes yielded instead of steps are sent back as they are
+        if type(step) is not GeneratorType:
+            return step
+        stack = []
+        value = None
+        while True:
+            try:
+                nested = step.send(value)
+            except StopIteration as stop:
+                if not stack:
+                    return stop.value
+                step = stack.pop()
+                value = stop.value
+                continue
+            if type(nested) is GeneratorType:
+                stack.append(step)
+                step = nested
+                value = None
+            else:
+                value = nested
+
+    def parse_statement(self) -> Step[Stmt | None]:
         # declaration | expression_statement | if_statement |
         # while_statement | return_statement | match_statement
-        return (
-          self.parse_function_declaration() or
-          self.parse_variable_declaration() or
-          self.parse_if() or
-          self.parse_while() or
-          self.parse_return() or
-          self.parse_match() or
-          self.parse_expression_stmt()
-        )
+        method = STATEMENT_DISPATCH.get(self.current_token.type)
+        return getattr(self, method)() if method else None
 
-    def parse_function_declaration(self) -> FunctionStmt | None:
+    def parse_function_declaration(self) -> Step[FunctionStmt | None]:
         # "fn" IDENTIFIER "(" [parameters] ")" block
-        start_position = self.current_token.position
+        start = self.current_token
         if not self.try_consume(TokenType.FUNCTION):
             return None
 
         name = self.consume(
             TokenType.IDENTIFIER,
-            MissingFunctionNameError(self.current_token.position)
+            MissingFunctionNameError
         ).value
-        self.consume(
-            TokenType.LEFT_PAREN,
-            MissingLeftParenthesisError(self.current_token.position)
-        )
+        self.consume(TokenType.LEFT_PAREN, MissingLeftParenthesisError)
         parameters = self.parse_parameters()
-        self.consume(
-            TokenType.RIGHT_PAREN,
-            MissingRightParenthesisError(self.current_token.position)
-        )
-        block = self.parse_block()
+        self.consume(TokenType.RIGHT_PAREN, MissingRightParenthesisError)
+        block = (yield self.parse_function_body())
         if not block:
             raise MissingFunctionBodyError(name, self.current_token.position)
-        return FunctionStmt(name, parameters, block, position=start_position)
+        return FunctionStmt(
+            name,
+            parameters,
+            block,
+            offset=start.offset,
+            source=start.source
+        )
 
-    def parse_variable_declaration(self) -> VariableStmt | None:
+    def parse_function_body(self) -> Step[BlockStmt | None]:
+        # block
+        start = self.current_token
+        if (
+            self.lazy_functions
+            and start.type == TokenType.LEFT_BRACE
+            and not self.lookahead
+            and hasattr(self.lexer, "skip_block")
+            and (skipped := self.lexer.skip_block())
+        ):
+            lexer, end_offset = skipped
+            self.next_token()
+            return LazyBlock(
+                lexer,
+                type(self),
+                end_offset,
+                offset=start.offset,
+                source=start.source
+            )
+        return self.parse_block()
+
+    def parse_variable_declaration(self) -> Step[VariableStmt | None]:
         # ("var" | "const") IDENTIFIER ["=" logical_or] ";"
-        start_position = self.current_token.position
+        start = self.current_token
         if self.try_consume(TokenType.VAR):
             is_const = False
         elif self.try_consume(TokenType.CONST):
             is_const = True
         else:
             return None
-        token = self.consume(
-            TokenType.IDENTIFIER,
-            MissingVariableNameError(self.current_token.position)
-        )
+        token = self.consume(TokenType.IDENTIFIER, MissingVariableNameError)
         expr = None
         if self.try_consume(TokenType.EQUAL):
-            expr = self.parse_or()
+            expr = (yield self.parse_or())
             if not expr:
                 raise MissingExpressionError(
                     "Missing expression after '='",
                     self.current_token.position
                 )
-        self.consume(
-            TokenType.SEMICOLON,
-            MissingSemicolonError(self.current_token.position)
-        )
+        self.consume(TokenType.SEMICOLON, MissingSemicolonError)
         return VariableStmt(
             token.value,
             expr,
             is_const,
-            position=start_position
+            offset=start.offset,
+            source=start.source
         )
 
     def parse_parameters(self) -> list[Parameter]:
@@ -155,190 +289,200 @@ class Parser:
 
     def parse_parameter(self) -> Parameter | None:
         # ["const"] IDENTIFIER
-        start_position = self.current_token.position
+        start = self.current_token
         if self.try_consume(TokenType.CONST):
             name = self.consume(
                 TokenType.IDENTIFIER,
-                MissingParameterNameError(self.current_token.position)
+                MissingParameterNameError
             ).value
-            return Parameter(name, True, position=start_position)
+            return Parameter(
+                name,
+                True,
+                offset=start.offset,
+                source=start.source
+            )
         if param := self.try_consume(TokenType.IDENTIFIER):
-            return Parameter(param.value, False, position=start_position)
+            return Parameter(
+                param.value,
+                False,
+                offset=start.offset,
+                source=start.source
+            )
         return None
 
-    def parse_if(self) -> IfStmt | None:
+    def parse_if(self) -> Step[IfStmt | None]:
         # "if" "(" expression ")" (statement | block)
         # ["else" (statement | block)]
-        start_position = self.current_token.position
+        start = self.current_token
         if not self.try_consume(TokenType.IF):
             return None
-        self.consume(
-            TokenType.LEFT_PAREN,
-            MissingLeftParenthesisError(self.current_token.position)
-        )
-        condition = self.parse_expression()
+        self.consume(TokenType.LEFT_PAREN, MissingLeftParenthesisError)
+        condition = (yield self.parse_expression())
         if not condition:
             raise MissingIfConditionError(
                 self.current_token.position
             )
-        self.consume(
-            TokenType.RIGHT_PAREN,
-            MissingRightParenthesisError(self.current_token.position)
-        )
-        body = self.parse_statement() or self.parse_block()
+        self.consume(TokenType.RIGHT_PAREN, MissingRightParenthesisError)
+        body = (yield self.parse_statement()) or (yield self.parse_block())
         if not body:
             raise MissingIfBodyError(
                 self.current_token.position
             )
         if not self.try_consume(TokenType.ELSE):
-            return IfStmt(condition, body, None, position=start_position)
-        else_body = self.parse_statement() or self.parse_block()
+            return IfStmt(
+                condition,
+                body,
+                None,
+                offset=start.offset,
+                source=start.source
+            )
+        else_body = (
+            (yield self.parse_statement()) or (yield self.parse_block())
+        )
         if not else_body:
             raise MissingElseBodyError(
                 self.current_token.position
             )
-        return IfStmt(condition, body, else_body, position=start_position)
+        return IfStmt(
+            condition,
+            body,
+            else_body,
+            offset=start.offset,
+            source=start.source
+        )
 
-    def parse_while(self) -> WhileStmt | None:
+    def parse_while(self) -> Step[WhileStmt | None]:
         # "while" "(" expression ")" (statement | block)
-        start_position = self.current_token.position
+        start = self.current_token
         if not self.try_consume(TokenType.WHILE):
             return None
-        self.consume(
-            TokenType.LEFT_PAREN,
-            MissingLeftParenthesisError(self.current_token.position)
-        )
-        condition = self.parse_expression()
+        self.consume(TokenType.LEFT_PAREN, MissingLeftParenthesisError)
+        condition = (yield self.parse_expression())
         if not condition:
             raise MissingWhileConditionError(
                 self.current_token.position
             )
-        self.consume(
-            TokenType.RIGHT_PAREN,
-            MissingRightParenthesisError(self.current_token.position)
-        )
-        body = self.parse_statement() or self.parse_block()
+        self.consume(TokenType.RIGHT_PAREN, MissingRightParenthesisError)
+        body = (yield self.parse_statement()) or (yield self.parse_block())
         if not body:
             raise MissingWhileBodyError(
                 self.current_token.position
             )
-        return WhileStmt(condition, body, position=start_position)
+        return WhileStmt(
+            condition,
+            body,
+            offset=start.offset,
+            source=start.source
+        )
 
-    def parse_block(self) -> BlockStmt | None:
+    def parse_block(self) -> Step[BlockStmt | None]:
         # "{" {statement} "}"
-        start_position = self.current_token.position
+        start = self.current_token
         if not self.try_consume(TokenType.LEFT_BRACE):
             return None
         statements = []
-        while statement := self.parse_statement():
+        while statement := (yield self.parse_statement()):
             statements.append(statement)
-        self.consume(
-            TokenType.RIGHT_BRACE,
-            MissingRightBraceError(self.current_token.position)
+        self.consume(TokenType.RIGHT_BRACE, MissingRightBraceError)
+        return BlockStmt(
+            statements,
+            offset=start.offset,
+            source=start.source
         )
-        return BlockStmt(statements, position=start_position)
 
-    def parse_return(self) -> ReturnStmt | None:
+    def parse_return(self) -> Step[ReturnStmt | None]:
         # "return" [expression] ";"
-        start_position = self.current_token.position
+        start = self.current_token
         if not self.try_consume(TokenType.RETURN):
             return None
-        expr = self.parse_expression()
-        self.consume(
-            TokenType.SEMICOLON,
-            MissingSemicolonError(self.current_token.position)
+        expr = (yield self.parse_expression())
+        self.consume(TokenType.SEMICOLON, MissingSemicolonError)
+        return ReturnStmt(
+            expr,
+            offset=start.offset,
+            source=start.source
         )
-        return ReturnStmt(expr, position=start_position)
 
-    def parse_match(self) -> MatchStmt | None:
+    def parse_match(self) -> Step[MatchStmt | None]:
         # "match" "(" arguments ")" "{" {case_block} "}"
-        start_position = self.current_token.position
+        start = self.current_token
         if not self.try_consume(TokenType.MATCH):
             return None
-        self.consume(
-            TokenType.LEFT_PAREN,
-            MissingLeftParenthesisError(self.current_token.position)
-        )
-        arguments = self.parse_arguments()
+        self.consume(TokenType.LEFT_PAREN, MissingLeftParenthesisError)
+        arguments = (yield self.parse_arguments())
         if not arguments:
             raise MissingMatchArgumentsError(self.current_token.position)
-        self.consume(
-            TokenType.RIGHT_PAREN,
-            MissingRightParenthesisError(self.current_token.position)
-        )
-        self.consume(
-            TokenType.LEFT_BRACE,
-            MissingLeftBraceError(self.current_token.position)
-        )
-        case_blocks = self.parse_case_blocks()
-        self.consume(
-            TokenType.RIGHT_BRACE,
-            MissingRightBraceError(self.current_token.position)
+        self.consume(TokenType.RIGHT_PAREN, MissingRightParenthesisError)
+        self.consume(TokenType.LEFT_BRACE, MissingLeftBraceError)
+        case_blocks = (yield self.parse_case_blocks())
+        self.consume(TokenType.RIGHT_BRACE, MissingRightBraceError)
+        return MatchStmt(
+            arguments,
+            case_blocks,
+            offset=start.offset,
+            source=start.source
         )
-        return MatchStmt(arguments, case_blocks, position=start_position)
 
-    def parse_case_blocks(self) -> list[CaseStmt]:
+    def parse_case_blocks(self) -> Step[list[CaseStmt]]:
         # {case_block}
         blocks = []
-        while block := self.parse_case_block():
+        while block := (yield self.parse_case_block()):
             blocks.append(block)
         return blocks
 
-    def parse_case_block(self) -> CaseStmt | None:
+    def parse_case_block(self) -> Step[CaseStmt | None]:
         # "(" pattern_expression {"," pattern_expression} ")"
         # [guard] ":" (statement | block)
-        start_position = self.current_token.position
+        start = self.current_token
         if not self.try_consume(TokenType.LEFT_PAREN):
             return None
-        patterns = self.parse_patterns()
+        patterns = (yield self.parse_patterns())
         if not patterns:
             raise MissingExpressionError(
                 "Missing pattern",
                 self.current_token.position
             )
-        self.consume(
-            TokenType.RIGHT_PAREN,
-            MissingRightParenthesisError(self.current_token.position)
-        )
-        guard = self.parse_guard()
-        self.consume(
-            TokenType.COLON,
-            MissingColonError(self.current_token.position)
-        )
-        body = self.parse_statement() or self.parse_block()
+        self.consume(TokenType.RIGHT_PAREN, MissingRightParenthesisError)
+        guard = (yield self.parse_guard())
+        self.consume(TokenType.COLON, MissingColonError)
+        body = (yield self.parse_statement()) or (yield self.parse_block())
         if not body:
             raise MissingCaseBodyError(
                 self.current_token.position
             )
-        return CaseStmt(patterns, guard, body, position=start_position)
+        return CaseStmt(
+            patterns,
+            guard,
+            body,
+            offset=start.offset,
+            source=start.source
+        )
 
-    def parse_guard(self) -> Guard | None:
+    def parse_guard(self) -> Step[Guard | None]:
         # "if" "(" expression ")"
-        start_position = self.current_token.position
+        start = self.current_token
         if not self.try_consume(TokenType.IF):
             return None
-        self.consume(
-            TokenType.LEFT_PAREN,
-            MissingLeftParenthesisError(self.current_token.position)
-        )
-        condition = self.parse_expression()
+        self.consume(TokenType.LEFT_PAREN, MissingLeftParenthesisError)
+        condition = (yield self.parse_expression())
         if not condition:
             raise MissingIfConditionError(self.current_token.position)
-        self.consume(
-            TokenType.RIGHT_PAREN,
-            MissingRightParenthesisError(self.current_token.position)
+        self.consume(TokenType.RIGHT_PAREN, MissingRightParenthesisError)
+        return Guard(
+            condition,
+            offset=start.offset,
+            source=start.source
         )
-        return Guard(condition, position=start_position)
 
-    def parse_patterns(self) -> list[PatternExpr]:
+    def parse_patterns(self) -> Step[list[PatternExpr]]:
         # pattern_expression {"," pattern_expression}
         patterns = []
-        pattern = self.parse_pattern_expr()
+        pattern = (yield self.parse_pattern_expr())
         if not pattern:
             return patterns
         patterns.append(pattern)
         while self.try_consume(TokenType.COMMA):
-            pattern = self.parse_pattern_expr()
+            pattern = (yield self.parse_pattern_expr())
             if not pattern:
                 raise MissingPatternError(self.current_token.position)
             if pattern.name and pattern.name in [
@@ -351,34 +495,44 @@ class Parser:
             patterns.append(pattern)
         return patterns
 
-    def parse_pattern_expr(self) -> PatternExpr | None:
+    def parse_pattern_expr(self) -> Step[PatternExpr | None]:
         # ("_" | pattern) ["as" IDENTIFIER]
-        start_position = self.current_token.position
+        start = self.current_token
         if self.try_consume(TokenType.UNDERSCORE):
             pattern = None
         else:
-            pattern = self.parse_pattern()
+            pattern = (yield self.parse_pattern())
             if not pattern:
                 return None
         if not self.try_consume(TokenType.AS):
-            return PatternExpr(pattern, None, position=start_position)
+            return PatternExpr(
+                pattern,
+                None,
+                offset=start.offset,
+                source=start.source
+            )
         identifier = self.consume(
             TokenType.IDENTIFIER,
-            MissingPatternIdentifierError(self.current_token.position)
+            MissingPatternIdentifierError
+        )
+        return PatternExpr(
+            pattern,
+            identifier.value,
+            offset=start.offset,
+            source=start.source
         )
-        return PatternExpr(pattern, identifier.value, position=start_position)
 
-    def parse_pattern(self) -> Expr | None:
+    def parse_pattern(self) -> Step[Expr | None]:
         # or_pattern
         return self.parse_or_pattern()
 
-    def parse_or_pattern(self) -> Expr | None:
+    def parse_or_pattern(self) -> Step[Expr | None]:
         # and_pattern {"or" and_pattern}
-        expr = self.parse_and_pattern()
+        expr = (yield self.parse_and_pattern())
         if not expr:
             return None
         while operator := self.try_consume(TokenType.OR):
-            right = self.parse_and_pattern()
+            right = (yield self.parse_and_pattern())
             if not right:
                 raise MissingExpressionError(
                     "Missing expression after 'or' statement",
@@ -388,18 +542,24 @@ class Parser:
                 expr,
                 operator.type,
                 right,
-                position=operator.position
+                offset=operator.offset,
+                source=operator.source
             )
         return expr
 
-    def parse_and_pattern(self) -> Expr | None:
+    def parse_and_pattern(self) -> Step[Expr | None]:
         # closed_pattern {"and" closed_pattern}
         # closed_pattern = compare_pattern | type_pattern
-        expr = self.parse_type_pattern() or self.parse_compare_pattern()
+        expr = (
+            self.parse_type_pattern() or (yield self.parse_compare_pattern())
+        )
         if not expr:
             return None
         while operator := self.try_consume(TokenType.AND):
-            right = self.parse_type_pattern() or self.parse_compare_pattern()
+            right = (
+                self.parse_type_pattern()
+                or (yield self.parse_compare_pattern())
+            )
             if not right:
                 raise MissingExpressionError(
                     "Missing expression after 'and' statement",
@@ -409,18 +569,18 @@ class Parser:
                 expr,
                 operator.type,
                 right,
-                position=operator.position
+                offset=operator.offset,
+                source=operator.source
             )
         return expr
 
-    def parse_compare_pattern(self) -> Expr | None:
+    def parse_compare_pattern(self) -> Step[Expr | None]:
         #  ["!=" | COMPARISON_SIGN] unary
-        start_position = self.current_token.position
-        if any(
-            operator := self.try_consume(expected)
-            for expected in COMPARISON_TYPES + [TokenType.BANG_EQUAL]
+        start = self.current_token
+        if operator := self.try_consume(
+            *COMPARISON_TYPES, TokenType.BANG_EQUAL
         ):
-            right = self.parse_unary()
+            right = (yield self.parse_unary())
             if not right:
                 raise MissingExpressionError(
                     "Missing expression",
@@ -429,200 +589,204 @@ class Parser:
             return ComparePatternExpr(
                 operator.type,
                 right,
-                position=operator.position
+                offset=operator.offset,
+                source=operator.source
             )
-        expr = self.parse_unary()
+        expr = (yield self.parse_unary())
         if not expr:
             return None
         return ComparePatternExpr(
             TokenType.EQUAL_EQUAL,
             expr,
-            position=start_position
+            offset=start.offset,
+            source=start.source
         )
 
     def parse_type_pattern(self) -> TypePatternExpr | None:
         # TYPE
-        if not any(
-            token := self.try_consume(expected)
-            for expected in TYPES
-        ):
+        if not (token := self.try_consume(*TYPES)):
             return None
-        return TypePatternExpr(token.type, position=token.position)
+        return TypePatternExpr(
+            token.type,
+            offset=token.offset,
+            source=token.source
+        )
 
-    def parse_expression_stmt(self) -> Expr | None:
+    def parse_expression_stmt(self) -> Step[Expr | None]:
         # expression ";"
-        expr = self.parse_expression()
+        expr = (yield self.parse_expression())
         if not expr:
             return None
-        self.consume(
-            TokenType.SEMICOLON,
-            MissingSemicolonError(self.current_token.position)
-        )
+        self.consume(TokenType.SEMICOLON, MissingSemicolonError)
         return expr
 
-    def parse_expression(self) -> Expr | None:
+    def parse_expression(self) -> Step[Expr | None]:
         # assignment
         return self.parse_assignment()
 
-    def parse_assignment(self) -> Expr | None:
+    def parse_assignment(self) -> Step[Expr | None]:
         # [IDENTIFIER "="] logical_or
-        if not (token := self.try_consume(TokenType.IDENTIFIER)):
+        if not (
+            self.current_token.type == TokenType.IDENTIFIER
+            and self.peek().type == TokenType.EQUAL
+        ):
             return self.parse_or()
-        if self.try_consume(TokenType.EQUAL):
-            value = self.parse_or()
-            if not value:
-                raise MissingExpressionError(
-                    "Missing expression after '='",
-                    self.current_token.position
-                )
-            return AssignmentExpr(token.value, value, position=token.position)
-        self.queue.append(self.current_token)
-        self.current_token = token
-        return self.parse_or()
+        return self.finish_assignment()
 
-    def parse_or(self) -> Expr | None:
-        # logical_and {"or" logical_and}
-        expr = self.parse_and()
-        if not expr:
-            return None
-        while operator := self.try_consume(TokenType.OR):
-            right = self.parse_and()
-            if not right:
-                raise MissingExpressionError(
-                    "Missing expression after 'or' statement",
-                    self.current_token.position
-                )
-            expr = LogicalExpr(
-                expr,
-                operator.type,
-                right,
-                position=operator.position
-            )
-        return expr
-
-    def parse_and(self) -> Expr | None:
-        # equality {"and" equality}
-        expr = self.parse_equality()
-        if not expr:
-            return None
-        while operator := self.try_consume(TokenType.AND):
-            right = self.parse_equality()
-            if not right:
-                raise MissingExpressionError(
-                    "Missing expression after 'and' statement",
-                    self.current_token.position
-                )
-            expr = LogicalExpr(
-                expr,
-                operator.type,
-                right,
-                position=operator.position
+    def finish_assignment(self) -> Step[AssignmentExpr]:
+        token = self.current_token
+        self.next_token()
+        self.next_token()
+        value = (yield self.parse_or())
+        if not value:
+            raise MissingExpressionError(
+                "Missing expression after '='",
+                self.current_token.position
             )
-        return expr
-
-    def parse_equality(self) -> Expr | None:
-        # comparison {EQUALITY_SIGN comparison}
-        return self._parse_binary(
-            self.parse_comparison,
-            [TokenType.BANG_EQUAL, TokenType.EQUAL_EQUAL]
+        return AssignmentExpr(
+            token.value,
+            value,
+            offset=token.offset,
+            source=token.source
         )
 
-    def parse_comparison(self) -> Expr | None:
-        # term [COMPARISON_SIGN term]
-        expr = self.parse_term()
+    def parse_or(self) -> Step[Expr | None]:
+        # logical_and {"or" logical_and}
+        return self.parse_binary(BINARY_PRECEDENCE[TokenType.OR])
+
+    def parse_binary(self, min_precedence: int) -> Step[Expr | None]:
+        # Precedence climbing over the binary operators:
+        # logical_and = equality {"and" equality}
+        # equality = comparison {EQUALITY_SIGN comparison}
+        # comparison = term [COMPARISON_SIGN term]
+        # term = factor {("-" | "+") factor}
+        # factor = unary {("/" | "*") unary}
+        expr = self.parse_unary()
+        if type(expr) is not GeneratorType and not (
+            expr
+            and BINARY_PRECEDENCE.get(self.current_token.type, 0)
+            >= min_precedence
+        ):
+            return expr
+        return self.finish_binary(expr, min_precedence)
+
+    def finish_binary(
+        self,
+        expr: Step[Expr | None] | Expr,
+        min_precedence: int
+    ) -> Step[Expr | None]:
+        # An operator binding tighter than the previous one starts a right
+        # operand, which is kept on a stack together with the operators
+        # waiting for it instead of being parsed by a nested call
+        expr = (yield expr)
         if not expr:
             return None
-        if any(
-            operator := self.try_consume(token_type)
-            for token_type in [
-                TokenType.GREATER, TokenType.GREATER_EQUAL,
-                TokenType.LESS, TokenType.LESS_EQUAL
-            ]
-        ):
-            right = self.parse_term()
-            if not right:
-                raise MissingExpressionError(
-                    "Missing second expression",
-                    self.current_token.position
-                )
-            expr = BinaryExpr(
-                expr,
+        # Left operand, operator and minimal precedence of the enclosing
+        # operands
+        pending = []
+        last_precedence = inf
+        while True:
+            precedence = BINARY_PRECEDENCE.get(self.current_token.type)
+            # Only an operator binding looser or equally can follow,
+            # comparisons are not chained
+            if (
+                precedence and precedence >= min_precedence
+                and precedence <= last_precedence
+                and not precedence == last_precedence == COMPARISON_PRECEDENCE
+            ):
+                operator = self.current_token
+                self.next_token()
+                pending.append((expr, operator, min_precedence))
+                min_precedence = precedence + 1
+                last_precedence = inf
+                expr = (yield self.parse_unary())
+                if not expr:
+                    raise MissingExpressionError(
+                        MISSING_OPERAND_MESSAGES.get(
+                            operator.type,
+                            "Missing second expression"
+                        ),
+                        self.current_token.position
+                    )
+                continue
+            if not pending:
+                return expr
+            left, operator, min_precedence = pending.pop()
+            node_type = (
+                LogicalExpr if operator.type in LOGICAL_OPERATORS
+                else BinaryExpr
+            )
+            expr = node_type(
+                left,
                 operator.type,
-                right,
-                position=operator.position
+                expr,
+                offset=operator.offset,
+                source=operator.source
             )
-        return expr
+            last_precedence = BINARY_PRECEDENCE[operator.type]
 
-    def parse_term(self) -> Expr | None:
-        # factor {("-" | "+") factor}
-        return self._parse_binary(
-            self.parse_factor,
-            [TokenType.PLUS, TokenType.MINUS]
-        )
-
-    def parse_factor(self) -> Expr | None:
-        # unary {("/" | "*") unary}
-        return self._parse_binary(
-            self.parse_unary,
-            [TokenType.SLASH, TokenType.STAR]
-        )
-
-    def parse_unary(self) -> Expr | None:
+    def parse_unary(self) -> Step[Expr | None]:
         # ["not" | "-"] primary
-        if (
-            operator := self.try_consume(TokenType.MINUS) or
-            self.try_consume(TokenType.NOT)
-        ):
-            right = self.parse_primary()
-            if not right:
-                raise MissingExpressionError(
-                    "Missing unary expression",
-                    self.current_token.position
-                )
-            return UnaryExpr(operator.type, right, position=operator.position)
+        if operator := self.try_consume(TokenType.MINUS, TokenType.NOT):
+            return self.finish_unary(operator)
         return self.parse_primary()
 
-    def parse_primary(self) -> Expr | None:
-        # call | IDENTIFIER | LITERAL | "(" expression ")"
-        return (
-            self.parse_identifier_or_call() or
-            self.parse_literal() or
-            self.parse_grouping()
+    def finish_unary(self, operator: Token) -> Step[UnaryExpr]:
+        right = (yield self.parse_primary())
+        if not right:
+            raise MissingExpressionError(
+                "Missing unary expression",
+                self.current_token.position
+            )
+        return UnaryExpr(
+            operator.type,
+            right,
+            offset=operator.offset,
+            source=operator.source
         )
 
-    def parse_identifier_or_call(self) -> IdentifierExpr | CallExpr | None:
+    def parse_primary(self) -> Step[Expr | None]:
+        # call | IDENTIFIER | LITERAL | grouping
+        method = PRIMARY_DISPATCH.get(self.current_token.type)
+        return getattr(self, method)() if method else None
+
+    def parse_identifier_or_call(
+        self
+    ) -> Step[IdentifierExpr | CallExpr | None]:
         # call = IDENTIFIER "(" [arguments] ")" {"(" [arguments] ")"}
         if not (identifier := self.try_consume(TokenType.IDENTIFIER)):
             return None
         identifier = IdentifierExpr(
             identifier.value,
-            position=identifier.position
+            offset=identifier.offset,
+            source=identifier.source
         )
-        if not (expr := self.finish_call(identifier)):
+        if self.current_token.type != TokenType.LEFT_PAREN:
             return identifier
-        while new_expr := self.finish_call(expr):
-            expr = new_expr
+        return self.finish_calls(identifier)
+
+    def finish_calls(self, expr: IdentifierExpr) -> Step[CallExpr]:
+        # Every call in a chain is applied to the result of the previous one
+        while self.try_consume(TokenType.LEFT_PAREN):
+            arguments = (yield self.parse_arguments())
+            self.consume(TokenType.RIGHT_PAREN, MissingRightParenthesisError)
+            expr = CallExpr(
+                expr,
+                arguments,
+                offset=expr.offset,
+                source=expr.source
+            )
         return expr
 
-    def finish_call(self, expr: IdentifierExpr | CallExpr) -> CallExpr | None:
-        if not self.try_consume(TokenType.LEFT_PAREN):
-            return None
-        arguments = self.parse_arguments()
-        self.consume(
-            TokenType.RIGHT_PAREN,
-            MissingRightParenthesisError(self.current_token.position)
-        )
-        return CallExpr(expr, arguments, position=expr.position)
-
-    def parse_arguments(self) -> list[Expr]:
+    def parse_arguments(self) -> Step[list[Expr]]:
         # expression {"," expression}
         arguments = []
-        argument = self.parse_expression()
+        argument = (yield self.parse_expression())
         if not argument:
             return arguments
         arguments.append(argument)
         while self.try_consume(TokenType.COMMA):
-            argument = self.parse_expression()
+            argument = (yield self.parse_expression())
             if not argument:
                 raise MissingArgumentError(self.current_token.position)
             arguments.append(argument)
@@ -630,85 +794,88 @@ class Parser:
 
     def parse_literal(self) -> LiteralExpr | None:
         # NUMBER | STRING | BOOLEAN | "nil"
-        start_position = self.current_token.position
-        if self.try_consume(TokenType.TRUE):
-            return LiteralExpr(True, position=start_position)
-        if self.try_consume(TokenType.FALSE):
-            return LiteralExpr(False, position=start_position)
-        if any(
-            token := self.try_consume(token_type)
-            for token_type in LITERALS
-        ):
-            return LiteralExpr(token.value, position=start_position)
-        return None
+        token = self.current_token
+        if token.type not in LITERAL_TYPES:
+            return None
+        self.next_token()
+        return LiteralExpr(
+            KEYWORD_LITERAL_VALUES.get(token.type, token.value),
+            offset=token.offset,
+            source=token.source
+        )
 
-    def parse_grouping(self) -> GroupingExpr | None:
-        # "(" expression ")"
-        start_position = self.current_token.position
+    def parse_grouping(self) -> Step[GroupingExpr | None]:
+        # grouping = "(" expression ")"
+        start = self.current_token
         if not self.try_consume(TokenType.LEFT_PAREN):
             return None
-        expr = self.parse_expression()
-        self.consume(
-            TokenType.RIGHT_PAREN,
-            MissingRightParenthesisError(self.current_token.position)
+        expr = (yield self.parse_expression())
+        self.consume(TokenType.RIGHT_PAREN, MissingRightParenthesisError)
+        return GroupingExpr(
+            expr,
+            offset=start.offset,
+            source=start.source
         )
-        return GroupingExpr(expr, position=start_position)
 
     def parse(self) -> Program:
+        return self.run(self.parse_program())
+
+    def parse_program(self) -> Step[Program]:
         # {statement}, EOF
         statements = []
-        while statement := self.parse_statement():
+        while statement := (yield self.parse_statement()):
             statements.append(statement)
+        self.parse_eof()
+        return Program(statements)
+
+    def parse_statements(self) -> Iterator[Stmt]:
+        # Top-level statements one by one, as soon as each is parsed, so
+        # that a script can be executed while it's still being read
+        while statement := self.run(self.parse_statement()):
+            yield statement
+        self.parse_eof()
+
+    def parse_eof(self) -> None:
         if not self.current_token.type == TokenType.EOF:
             raise InvalidSyntaxError(
                 f"Unexpected token of type '{self.current_token.type}'",
                 self.current_token.position
             )
-        return Program(statements)
 
-    def _parse_binary(
-        self,
-        parse_operand: Callable[[], None],
-        operator_types: list[TokenType]
-    ) -> Expr | None:
-        expr = parse_operand()
-        if not expr:
-            return None
-        while any(
-            operator := self.try_consume(token_type)
-            for token_type in operator_types
-        ):
-            right = parse_operand()
-            if not right:
-                raise MissingExpressionError(
-                    "Missing second expression",
-                    self.current_token.position
-                )
-            expr = BinaryExpr(
-                expr,
-                operator.type,
-                right,
-                position=operator.position
-            )
-        return expr
-
-    def try_consume(self, expected_type: TokenType) -> Token | None:
-        try:
-            return self.consume(expected_type, ParserError(None, None))
-        except ParserError:
+    def try_consume(self, *expected_types: TokenType) -> Token | None:
+        if self.current_token.type not in expected_types:
             return None
+        current = self.current_token
+        self.next_token()
+        return current
 
-    def consume(self, expected_type: TokenType, error: ParserError) -> Token:
+    def consume(
+        self,
+        expected_type: TokenType,
+        error_type: Callable[[Position], ParserError]
+    ) -> Token:
+        # The error is created only if the token doesn't match
         if not self.current_token.type == expected_type:
-            raise error
+            raise error_type(self.current_token.position)
         current = self.current_token
         self.next_token()
         return current
 
+    def peek(self, k: int = 1) -> Token:
+        # Returns the k-th token after the current one
+        while len(self.lookahead) < k:
+            self.lookahead.append(self._read_token())
+        return self.lookahead[k - 1]
+
     def next_token(self) -> Token:
-        if self.queue:
-            self.current_token = self.queue.pop(0)
+        if self.lookahead:
+            self.current_token = self.lookahead.popleft()
         else:
-            self.current_token = self.lexer.next_token()
-        if self.current_token.type == TokenType.COMMENT:
-            self.next_token()
+            self.current_token = self._read_token()
+        return self.current_token
+
+    def _read_token(self) -> Token:
+        token = self.lexer.next_token()
+        while token.type == TokenType.COMMENT:
+            token = self.lexer.next_token()
+        return token
@@ -0,0 +1,435 @@
+from __future__ import annotations
+
+import json
+import struct
+from dataclasses import fields, is_dataclass
+from inspect import isabstract
+from typing import IO, Any, Callable, Iterator, TextIO
+
+from lexer.streams import LineIndex, Position
+from lexer.tokens import TokenType
+
+from parser import models
+from parser.models import Program, Stmt, BlockStmt, LazyBlock
+
+
+# Kinds of node fields
+NODE = "node"
+NODES = "nodes"
+TOKEN = "token"
+VALUE = "value"
+
+MAGIC = b"ASTB"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sH")
+FLOAT = struct.Struct("<d")
+# Tags of values in the binary format
+NONE_TAG, FALSE_TAG, TRUE_TAG, INT_TAG, FLOAT_TAG, STR_TAG = range(6)
+CHUNK_SIZE = 1 << 16
+LINES_PER_WRITE = 1024
+JSON_ENCODER = json.JSONEncoder(ensure_ascii=False)
+
+
+class SerializationError(Exception):
+    pass
+
+
+def _get_node_classes() -> list[type]:
+    # All the node classes, a lazy block is written as a block. They are
+    # taken from the module, as `__subclasses__` may still list classes
+    # replaced by their slotted versions
+    return [
+        value for value in vars(models).values()
+        if isinstance(value, type) and issubclass(value, Stmt)
+        and value is not LazyBlock
+    ]
+
+
+def _get_field_kind(annotation: str) -> str:
+    if annotation.startswith("list["):
+        return NODES
+    if "TokenType" in annotation:
+        return TOKEN
+    if any(
+        node_type.__name__ in annotation.split(" | ")
+        for node_type in _get_node_classes()
+    ):
+        return NODE
+    return VALUE
+
+
+# Classes ordered by name, the index is their code in the binary format
+NODE_CLASSES = sorted(
+    [
+        node_type for node_type in [Program, *_get_node_classes()]
+        if not isabstract(node_type)
+    ],
+    key=lambda node_type: node_type.__name__
+)
+NODE_NAMES = {node_type.__name__: node_type for node_type in NODE_CLASSES}
+NODE_CODES = {node_type: code for code, node_type in enumerate(NODE_CLASSES)}
+NODE_CODES[LazyBlock] = NODE_CODES[BlockStmt]
+# Names and kinds of the fields of every node class except the ones left
+# out of comparisons: the offset, the source and the slots of variables
+SCHEMAS = {
+    node_type: tuple(
+        (node_field.name, _get_field_kind(node_field.type))
+        for node_field in fields(node_type)
+        if node_field.compare
+    )
+    for node_type in NODE_CLASSES
+    if is_dataclass(node_type)
+}
+SCHEMAS[LazyBlock] = SCHEMAS[BlockStmt]
+# Indexes and kinds of the node fields, last first
+CHILD_FIELDS = {
+    node_type: tuple(
+        (index, kind) for index, (_, kind) in reversed(
+            list(enumerate(schema))
+        )
+        if kind in (NODE, NODES)
+    )
+    for node_type, schema in SCHEMAS.items()
+}
+# Lazy blocks are read as single nodes, see `read_binary`
+CHILD_FIELDS[LazyBlock] = ()
+# Code of a function body not parsed yet, written as its span
+LAZY_BLOCK_CODE = len(NODE_CLASSES)
+TOKEN_TYPES = list(TokenType)
+
+
+def write_json_lines(program: Program, file: TextIO) -> int:
+    """Writes the nodes of the program to a text file, one JSON object
+    per line, and returns their number. Nodes are written parents first:
+    an object holds the class of the node, its offset and its fields, with
+    the number of child nodes in place of the node fields, and the
+    children follow in the order of the fields. Token types are written
+    by name. Lazy function bodies are parsed and written as blocks."""
+    lines = []
+    count = 0
+    for node, schema in _iter_nodes(program):
+        record = {"node": NODE_CLASSES[NODE_CODES[type(node)]].__name__}
+        if type(node) is not Program:
+            record["offset"] = node.offset
+        for name, kind in schema:
+            value = getattr(node, name)
+            if kind == NODES:
+                value = len(value)
+            elif kind == NODE:
+                value = int(value is not None)
+            elif kind == TOKEN and value is not None:
+                value = value.name
+            record[name] = value
+        lines.append(JSON_ENCODER.encode(record))
+        count += 1
+        if len(lines) >= LINES_PER_WRITE:
+            lines.append("")
+            file.write("\n".join(lines))
+            lines.clear()
+    if lines:
+        lines.append("")
+        file.write("\n".join(lines))
+    return count
+
+
+def read_json_lines(
+    file: TextIO,
+    source: LineIndex | Position | None = None
+) -> Program:
+    """Rebuilds the program written by `write_json_lines`. The nodes get
+    the given source, so that their positions can be resolved."""
+    def records() -> Iterator[tuple[type, int | None, list[Any]]]:
+        for line in file:
+            record = json.loads(line)
+            node_type = NODE_NAMES.get(record.pop("node", None))
+            if node_type is None:
+                raise SerializationError("Unknown node type")
+            offset = record.pop("offset", None)
+            values = []
+            for name, kind in SCHEMAS[node_type]:
+                value = record[name]
+                if kind == TOKEN and value is not None:
+                    value = TokenType[value]
+                values.append(value)
+            yield node_type, offset, values
+
+    return _build_program(records(), source)
+
+
+def write_binary(
+    program: Program,
+    file: IO[bytes],
+    lazy_blocks: bool = False
+) -> int:
+    """Writes the nodes of the program to a binary file in the order of
+    `write_json_lines` and returns their number. A node is its class
+    code, its offset plus one (zero for none) and its fields: child
+    counts and tagged values as variable-length integers, floats as
+    8 bytes and strings as their UTF-8 length and bytes. With
+    `lazy_blocks`, function bodies which aren't parsed yet are written
+    as their span instead of being parsed."""
+    file.write(HEADER.pack(MAGIC, FORMAT_VERSION))
+    buffer = bytearray()
+    count = 0
+    for node, schema in _iter_nodes(program, lazy_blocks):
+        if schema is None:
+            buffer.append(LAZY_BLOCK_CODE)
+            _write_varint(buffer, node.offset + 1)
+            _write_varint(buffer, node.end_offset)
+            count += 1
+            continue
+        buffer.append(NODE_CODES[type(node)])
+        offset = None if type(node) is Program else node.offset
+        _write_varint(buffer, 0 if offset is None else offset + 1)
+        for name, kind in schema:
+            value = getattr(node, name)
+            if kind == NODES:
+                _write_varint(buffer, len(value))
+            elif kind == NODE:
+                buffer.append(value is not None)
+            elif kind == TOKEN:
+                _write_varint(buffer, 0 if value is None else value.value)
+            else:
+                _write_value(buffer, value)
+        count += 1
+        if len(buffer) >= CHUNK_SIZE:
+            file.write(buffer)
+            buffer.clear()
+    file.write(buffer)
+    return count
+
+
+def read_binary(
+    file: IO[bytes],
+    source: LineIndex | Position | None = None,
+    open_block: Callable[[int, int], LazyBlock] | None = None
+) -> Program:
+    """Rebuilds the program written by `write_binary`. Function bodies
+    written as their span are created by `open_block` from the offsets
+    of their braces."""
+    header = file.read(HEADER.size)
+    if len(header) < HEADER.size or HEADER.unpack(header) != (
+        MAGIC, FORMAT_VERSION
+    ):
+        raise SerializationError("Not a binary syntax tree")
+    reader = _BinaryReader(file)
+
+    def records() -> Iterator[tuple[type, int | None, list[Any]]]:
+        while not reader.at_end():
+            code = reader.read_byte()
+            if code == LAZY_BLOCK_CODE and open_block is not None:
+                offset = reader.read_varint() - 1
+                block = open_block(offset, reader.read_varint())
+                yield LazyBlock, offset, [block]
+                continue
+            if code >= len(NODE_CLASSES):
+                raise SerializationError("Unknown node type")
+            node_type = NODE_CLASSES[code]
+            offset = reader.read_varint() - 1
+            values = []
+            for _, kind in SCHEMAS[node_type]:
+                if kind == NODES:
+                    values.append(reader.read_varint())
+                elif kind == NODE:
+                    values.append(reader.read_byte())
+                elif kind == TOKEN:
+                    value = reader.read_varint()
+                    values.append(TOKEN_TYPES[value - 1] if value else None)
+                else:
+                    values.append(reader.read_value())
+            yield node_type, None if offset < 0 else offset, values
+
+    return _build_program(records(), source)
+
+
+def _iter_nodes(
+    program: Program,
+    lazy_blocks: bool = False
+) -> Iterator[tuple[Stmt, tuple | None]]:
+    # Nodes with their schemas, parents before children, without
+    # recursion. The stack holds an iterator over the children of every
+    # node on the path to the current one. With `lazy_blocks`, function
+    # bodies which aren't parsed yet are given without a schema and
+    # without their statements
+    stack = [iter((program,))]
+    while stack:
+        node = next(stack[-1], None)
+        if node is None:
+            stack.pop()
+            continue
+        if (
+            lazy_blocks and type(node) is LazyBlock
+            and node.lexer is not None
+        ):
+            yield node, None
+            continue
+        schema = SCHEMAS[type(node)]
+        yield node, schema
+        stack.append(_iter_children(node, schema))
+
+
+def _iter_children(node: Stmt, schema: tuple) -> Iterator[Stmt]:
+    for name, kind in schema:
+        if kind == NODES:
+            yield from getattr(node, name)
+        elif kind == NODE:
+            child = getattr(node, name)
+            if child is not None:
+                yield child
+
+
+def _build_program(
+    records: Iterator[tuple[type, int | None, list[Any]]],
+    source: LineIndex | Position | None
+) -> Program:
+    # Nodes waiting for their children, with the values of their fields
+    # and the node fields still to be filled in, the next one last, as
+    # [index, number of children left], where -1 stands for a single node
+    stack: list[tuple[type, int | None, list[Any], list[list[int]]]] = []
+    for node_type, offset, values in records:
+        pending = []
+        for index, kind in CHILD_FIELDS[node_type]:
+            count = values[index]
+            if kind == NODES:
+                values[index] = []
+                if count:
+                    pending.append([index, count])
+            else:
+                values[index] = None
+                if count:
+                    pending.append([index, -1])
+        if pending:
+            stack.append((node_type, offset, values, pending))
+            continue
+        node = _build_node(node_type, offset, values, source)
+        # Completed nodes are handed over to their parents
+        while stack:
+            node_type, offset, values, pending = stack[-1]
+            field = pending[-1]
+            if field[1] < 0:
+                values[field[0]] = node
+                pending.pop()
+            else:
+                values[field[0]].append(node)
+                field[1] -= 1
+                if not field[1]:
+                    pending.pop()
+            if pending:
+                break
+            stack.pop()
+            node = _build_node(node_type, offset, values, source)
+        else:
+            return node
+    raise SerializationError("Unexpected end of the syntax tree")
+
+
+def _build_node(
+    node_type: type,
+    offset: int | None,
+    values: list[Any],
+    source: LineIndex | Position | None
+) -> Stmt | Program:
+    if node_type is Program:
+        return Program(*values)
+    if node_type is LazyBlock:
+        return values[0]
+    return node_type(*values, offset=offset, source=source)
+
+
+def _write_varint(buffer: bytearray, value: int) -> None:
+    while value >= 0x80:
+        buffer.append(value & 0x7f | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def _write_value(buffer: bytearray, value: Any) -> None:
+    if value is None:
+        buffer.append(NONE_TAG)
+    elif value is True or value is False:
+        buffer.append(TRUE_TAG if value else FALSE_TAG)
+    elif type(value) is int:
+        buffer.append(INT_TAG)
+        # Zigzag encoding keeps small negative numbers short
+        _write_varint(buffer, value << 1 if value >= 0 else ~value << 1 | 1)
+    elif type(value) is float:
+        buffer.append(FLOAT_TAG)
+        buffer += FLOAT.pack(value)
+    elif type(value) is str:
+        data = value.encode('utf-8')
+        buffer.append(STR_TAG)
+        _write_varint(buffer, len(data))
+        buffer += data
+    else:
+        raise SerializationError(f"Can't write a value of type {type(value)}")
+
+
+class _BinaryReader:
+    # Reads a file in chunks, so that small reads don't call the file
+    def __init__(self, file: IO[bytes]):
+        self.file = file
+        self.buffer = b""
+        self.index = 0
+
+    def at_end(self) -> bool:
+        return self.index >= len(self.buffer) and not self._fill(1)
+
+    def read(self, size: int) -> bytes:
+        if self.index + size > len(self.buffer) and not self._fill(size):
+            raise SerializationError("Unexpected end of the syntax tree")
+        data = self.buffer[self.index:self.index + size]
+        self.index += size
+        return data
+
+    def read_byte(self) -> int:
+        index = self.index
+        if index >= len(self.buffer):
+            if not self._fill(1):
+                raise SerializationError("Unexpected end of the syntax tree")
+            index = 0
+        self.index = index + 1
+        return self.buffer[index]
+
+    def read_varint(self) -> int:
+        byte = self.read_byte()
+        if byte < 0x80:
+            return byte
+        value = byte & 0x7f
+        shift = 7
+        while True:
+            byte = self.read_byte()
+            value |= (byte & 0x7f) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+
+    def read_value(self) -> Any:
+        tag = self.read_byte()
+        if tag == NONE_TAG:
+            return None
+        if tag == FALSE_TAG or tag == TRUE_TAG:
+            return tag == TRUE_TAG
+        if tag == INT_TAG:
+            value = self.read_varint()
+            return ~(value >> 1) if value & 1 else value >> 1
+        if tag == FLOAT_TAG:
+            return FLOAT.unpack(self.read(FLOAT.size))[0]
+        if tag == STR_TAG:
+            return self.read(self.read_varint()).decode('utf-8')
+        raise SerializationError("Unknown value tag")
+
+    def _fill(self, size: int) -> bool:
+        # Keeps the unread rest of the buffer and reads at least `size`
+        # more bytes, unless the file ends
+        rest = self.buffer[self.index:]
+        chunks = [rest]
+        while len(rest) < size:
+            chunk = self.file.read(max(CHUNK_SIZE, size))
+            if not chunk:
+                break
+            chunks.append(chunk)
+            rest = b"".join(chunks)
+            chunks = [rest]
+        self.buffer = rest
+        self.index = 0
+        return len(rest) >= size
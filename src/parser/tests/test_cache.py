@@ -0,0 +1,202 @@
+import io
+import os
+import pickle
+import time
+import zlib
+
+import pytest
+
+from lexer.lexers import RegexLexer
+from lexer.streams import Position
+from parser import cache as cache_module
+from parser.parser import Parser
+from parser.models import LazyBlock
+from parser.cache import ProgramCache, HEADER, FORMAT_VERSION
+from parser.serialization import write_binary
+from parser.tests.utils import create_parser
+
+
+SOURCE = 'fn f(a) {\n    return a * "€";\n}\nprint(f(2));\n'
+
+
+def parse(text: str = SOURCE):
+    return create_parser(text).parse()
+
+
+def parse_forbidden():
+    raise AssertionError("The program should be loaded from the cache")
+
+
+def binary(program) -> bytes:
+    file = io.BytesIO()
+    write_binary(program, file)
+    return file.getvalue()
+
+
+def entries(cache: ProgramCache) -> list:
+    return sorted(cache.directory.glob("*.prg"))
+
+
+def test_cache_miss_parses_and_stores(tmp_path):
+    cache = ProgramCache(tmp_path)
+    source = SOURCE.encode()
+    assert cache.load(source) is None
+    program = cache.get_or_parse(source, parse)
+    assert program == parse()
+    assert len(entries(cache)) == 1
+
+
+def test_cache_hit_loads_program(tmp_path):
+    cache = ProgramCache(tmp_path)
+    source = SOURCE.encode()
+    cache.store(source, parse())
+    program = cache.get_or_parse(source, parse_forbidden, "script.txt")
+    assert program == parse()
+    call = program.statements[1]
+    assert call.position == Position(4, 1, 34, "script.txt")
+    body = program.statements[0].block.statements[0]
+    assert body.expression.right.position == Position(2, 16, 25, "script.txt")
+
+
+def test_cache_key_depends_on_source(tmp_path):
+    cache = ProgramCache(tmp_path)
+    cache.store(SOURCE.encode(), parse())
+    assert cache.load((SOURCE + " ").encode()) is None
+
+
+def test_cache_key_depends_on_options(tmp_path):
+    cache = ProgramCache(tmp_path)
+    source = SOURCE.encode()
+    cache.store(source, parse(), {"lazy_functions": False})
+    assert cache.load(source, options={"lazy_functions": True}) is None
+    assert cache.load(source) is None
+    assert cache.load(source, options={"lazy_functions": False}) is not None
+
+
+def test_cache_key_depends_on_format_version(tmp_path, monkeypatch):
+    cache = ProgramCache(tmp_path)
+    cache.store(SOURCE.encode(), parse())
+    monkeypatch.setattr(cache_module, "FORMAT_VERSION", 0)
+    assert cache.load(SOURCE.encode()) is None
+
+
+def test_cache_key_depends_on_version(tmp_path, monkeypatch):
+    cache = ProgramCache(tmp_path)
+    cache.store(SOURCE.encode(), parse())
+    monkeypatch.setattr(cache_module, "__version__", "0.0.0-other")
+    assert cache.load(SOURCE.encode()) is None
+
+
+@pytest.mark.parametrize("corrupt", [
+    lambda data: data[:HEADER.size - 1],
+    lambda data: b"XXXX" + data[4:],
+    lambda data: data[:-1],
+    lambda data: data[:-1] + bytes([data[-1] ^ 0xff]),
+    lambda data: data[:4] + b"\xff\xff" + data[6:],
+])
+def test_cache_invalid_entry_is_removed(tmp_path, corrupt):
+    cache = ProgramCache(tmp_path)
+    source = SOURCE.encode()
+    cache.store(source, parse())
+    path, = entries(cache)
+    path.write_bytes(corrupt(path.read_bytes()))
+    assert cache.load(source) is None
+    assert not path.exists()
+    assert cache.get_or_parse(source, parse) == parse()
+    assert cache.load(source) is not None
+
+
+def record_unpickled():
+    UNPICKLED.append(True)
+
+
+class Unpickled:
+    def __reduce__(self):
+        return record_unpickled, ()
+
+
+UNPICKLED = []
+
+
+def test_cache_never_unpickles_entries(tmp_path):
+    cache = ProgramCache(tmp_path)
+    source = SOURCE.encode()
+    digest = cache.get_digest(source)
+    payload = zlib.compress(pickle.dumps(Unpickled()))
+    cache.get_path(digest).write_bytes(HEADER.pack(
+        b"PRGC", FORMAT_VERSION, digest, len(payload), zlib.crc32(payload)
+    ) + payload)
+    assert cache.load(source) is None
+    assert UNPICKLED == []
+    assert entries(cache) == []
+
+
+def test_cache_evicts_old_entries(tmp_path):
+    cache = ProgramCache(tmp_path, max_age=60)
+    cache.store(b"print(1);", parse("print(1);"))
+    old, = entries(cache)
+    past = time.time() - 120
+    os.utime(old, (past, past))
+    cache.store(b"print(2);", parse("print(2);"))
+    assert not old.exists()
+    assert cache.load(b"print(2);") is not None
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = ProgramCache(tmp_path)
+    sources = [f"print({i});".encode() for i in range(3)]
+    for age, source in zip((30, 20, 10), sources):
+        cache.store(source, parse(source.decode()))
+        path = cache.get_path(cache.get_digest(source))
+        past = time.time() - age
+        os.utime(path, (past, past))
+    # Loading refreshes the entry, so the second one is the oldest now
+    assert cache.load(sources[0]) is not None
+    sizes = [path.stat().st_size for path in entries(cache)]
+    cache.max_size = sum(sizes) - 1
+    cache.evict()
+    assert cache.load(sources[1]) is None
+    assert cache.load(sources[0]) is not None
+    assert cache.load(sources[2]) is not None
+
+
+def test_cache_deep_programs(tmp_path):
+    cache = ProgramCache(tmp_path)
+    text = "print(" + "1 + " * 20000 + "1);"
+    cache.store(text.encode(), parse(text))
+    loaded = cache.load(text.encode())
+    assert binary(loaded) == binary(parse(text))
+
+
+def test_cache_lazy_functions(tmp_path):
+    cache = ProgramCache(tmp_path)
+    program = Parser(RegexLexer(SOURCE), lazy_functions=True).parse()
+    cache.store(SOURCE.encode(), program)
+    loaded = cache.load(SOURCE.encode(), "script.txt")
+    block = loaded.statements[0].block
+    assert isinstance(block, LazyBlock)
+    assert loaded == parse()
+    assert block.statements[0].position == Position(2, 5, 14, "script.txt")
+
+
+def test_cache_lazy_functions_after_wide_chars(tmp_path):
+    cache = ProgramCache(tmp_path)
+    text = SOURCE + 'fn g() { return "ł€"; }\nfn h(b) { return b - 1; }\n'
+    program = Parser(RegexLexer(text), lazy_functions=True).parse()
+    cache.store(text.encode(), program)
+    loaded = cache.load(text.encode(), "script.txt")
+    assert isinstance(loaded.statements[3].block, LazyBlock)
+    assert loaded == parse(text)
+    expected = Parser(RegexLexer(text, filename="script.txt")).parse()
+    for index in (2, 3):
+        body = loaded.statements[index].block.statements[0]
+        expected_body = expected.statements[index].block.statements[0]
+        assert body.position == expected_body.position
+        assert body.expression.position == expected_body.expression.position
+
+
+def test_cache_clear(tmp_path):
+    cache = ProgramCache(tmp_path)
+    cache.store(SOURCE.encode(), parse())
+    cache.clear()
+    assert entries(cache) == []
@@ -0,0 +1,84 @@
+from pathlib import Path
+
+import pytest
+
+from lexer.tokens import TokenType
+
+from parser.grammar import Grammar, GrammarError
+from parser.parser import (
+    STATEMENT_FIRST,
+    STATEMENT_PARSERS,
+    STATEMENT_DISPATCH,
+    PRIMARY_FIRST,
+    PRIMARY_PARSERS,
+    PRIMARY_DISPATCH,
+    EXPRESSION_FIRST,
+    Parser,
+    create_dispatch_table
+)
+
+
+GRAMMAR_PATH = Path(__file__).parents[3] / "grammar.ebnf"
+
+
+@pytest.fixture(scope="module")
+def grammar() -> Grammar:
+    return Grammar(GRAMMAR_PATH.read_text())
+
+
+def test_statement_first_sets_match_grammar(grammar):
+    assert grammar.get_alternatives_first("statement") == STATEMENT_FIRST
+
+
+def test_primary_first_sets_match_grammar(grammar):
+    assert grammar.get_alternatives_first("primary") == PRIMARY_FIRST
+
+
+def test_expression_first_set_matches_grammar(grammar):
+    assert grammar.get_first("expression") == EXPRESSION_FIRST
+
+
+@pytest.mark.parametrize("first_sets, parsers, dispatch", [
+    (STATEMENT_FIRST, STATEMENT_PARSERS, STATEMENT_DISPATCH),
+    (PRIMARY_FIRST, PRIMARY_PARSERS, PRIMARY_DISPATCH)
+])
+def test_dispatch_tables(first_sets, parsers, dispatch):
+    assert parsers.keys() == first_sets.keys()
+    assert all(hasattr(Parser, method) for method in parsers.values())
+    assert dispatch.keys() == frozenset().union(*first_sets.values())
+
+
+@pytest.mark.parametrize("text, name, first", [
+    ("a = IDENTIFIER b ;", "a", {TokenType.IDENTIFIER}),
+    ('a = ["var"] "(" ;', "a", {TokenType.VAR, TokenType.LEFT_PAREN}),
+    ('a = {"-"}, b ; b = "fn" | "+" ;', "a", {
+        TokenType.MINUS, TokenType.FUNCTION, TokenType.PLUS
+    }),
+    ('(* comment *) a = ("!=" | "\\=") ;', "a", {
+        TokenType.BANG_EQUAL, TokenType.EQUAL
+    }),
+    ('a = X ; X = "if" | ... | "while" ;', "a", {
+        TokenType.IF, TokenType.WHILE
+    }),
+])
+def test_grammar_first(text, name, first):
+    assert Grammar(text).get_first(name) == first
+
+
+@pytest.mark.parametrize("text", [
+    "a = b ;",
+    "a = a ;",
+    'a = "?" ;',
+    'a = "if" ',
+])
+def test_grammar_error(text):
+    with pytest.raises(GrammarError):
+        Grammar(text).get_first("a")
+
+
+def test_dispatch_table_conflict():
+    with pytest.raises(ValueError):
+        create_dispatch_table(
+            {"a": frozenset([TokenType.IF]), "b": frozenset([TokenType.IF])},
+            {"a": "parse_if", "b": "parse_while"}
+        )
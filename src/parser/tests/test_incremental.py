@@ -0,0 +1,181 @@
+import random
+from dataclasses import fields, is_dataclass
+
+import pytest
+
+from lexer.lexers import RegexLexer
+from lexer.tokens import TokenType
+from lexer.exceptions import LexerError
+
+from parser.parser import Parser
+from parser.exceptions import ParserError
+from parser.incremental import IncrementalParser
+
+
+SOURCE = """// ł€ functions
+fn add(a, const b) {
+    if (a > b) return a + b; else { return "€" + b; }
+}
+var total = add(1, 2);
+while (total < 10) total = total + 1.5;
+if (total) print("big");
+match (total, "x") {
+    (Num and >0 as x, _) if (x > 1): print(x);
+    (_, Str): print("str");
+}
+// trailing comment
+"""
+
+SNIPPETS = [
+    "a", "1", " ", "\n", ";", "}", "{", "(", ")", '"', "//", "else",
+    "else print(1);", "var x = 2;", "fn f() { return 1; }", "€", "ż = 3;",
+    "if (a) b;", "/", "=", "print(total);", "\n// comment ł\n",
+]
+
+
+def positions(node) -> list:
+    # Types and positions of all the nodes of a tree
+    if isinstance(node, list):
+        return [position for item in node for position in positions(item)]
+    if not is_dataclass(node):
+        return []
+    result = [(type(node).__name__, getattr(node, "position", None))]
+    for node_field in fields(node):
+        if node_field.name not in ("offset", "source"):
+            result += positions(getattr(node, node_field.name))
+    return result
+
+
+def parse_or_error(parse) -> tuple:
+    try:
+        program = parse()
+    except (LexerError, ParserError) as e:
+        return None, (type(e), str(e), e.position)
+    return program, None
+
+
+def full_parse(text: str) -> tuple:
+    return parse_or_error(
+        lambda: Parser(RegexLexer(text, filename="script.txt")).parse()
+    )
+
+
+def all_tokens(text: str) -> list:
+    lexer = RegexLexer(text, filename="script.txt")
+    tokens = [lexer.next_token()]
+    while tokens[-1].type != TokenType.EOF:
+        tokens.append(lexer.next_token())
+    return tokens
+
+
+def assert_same_as_full_parse(parser: IncrementalParser) -> None:
+    program, error = parse_or_error(parser.parse)
+    expected_program, expected_error = full_parse(parser.text)
+    assert error == expected_error
+    if expected_error is None:
+        assert program == expected_program
+        assert positions(program) == positions(expected_program)
+        assert parser.tokens == all_tokens(parser.text)
+
+
+def test_incremental_initial_parse():
+    parser = IncrementalParser(SOURCE, "script.txt")
+    assert_same_as_full_parse(parser)
+    assert len(parser.segments) == 6
+
+
+@pytest.mark.parametrize("text", ["", " \n ", "// only comment", "a;"])
+def test_incremental_small_sources(text):
+    parser = IncrementalParser(text, "script.txt")
+    assert_same_as_full_parse(parser)
+
+
+def test_incremental_reuses_untouched_statements():
+    parser = IncrementalParser(SOURCE, "script.txt")
+    program = parser.parse()
+    before = list(program.statements)
+    index = SOURCE.index("1, 2")
+    parser.edit(index, index + 1, "100")
+    assert parser.parse() is program
+    after = program.statements
+    assert_same_as_full_parse(parser)
+    assert after[1] is not before[1]
+    assert all(after[i] is before[i] for i in (0, 2, 3, 4))
+
+
+def test_incremental_edit_leaves_later_segments():
+    parser = IncrementalParser(SOURCE, "script.txt")
+    parser.parse()
+    index = SOURCE.index("1, 2")
+    parser.edit(index, index + 1, "100")
+    parser.parse()
+    # Once the gap is at the edited statement, further edits there don't
+    # change the segments after it
+    later = [vars(segment).copy() for segment in parser.segments[2:]]
+    parser.edit(index, index + 3, "7")
+    parser.parse()
+    assert [vars(segment) for segment in parser.segments[2:]] == later
+    assert_same_as_full_parse(parser)
+
+
+def test_incremental_edit_after_if_joins_else():
+    text = "if (a) b;\nc;"
+    parser = IncrementalParser(text, "script.txt")
+    parser.parse()
+    parser.edit(len("if (a) b;\n"), len(text), "else c;")
+    assert_same_as_full_parse(parser)
+    assert len(parser.parse().statements) == 1
+
+
+def test_incremental_statement_spans_kept_segments():
+    text = "x;\n" * 20
+    parser = IncrementalParser(text, "script.txt")
+    parser.parse()
+    parser.edit(0, 0, "fn f() {")
+    assert_same_as_full_parse(parser)
+    parser.edit(len(parser.text), len(parser.text), "}")
+    assert_same_as_full_parse(parser)
+    assert len(parser.parse().statements) == 1
+
+
+def test_incremental_recovers_after_error():
+    parser = IncrementalParser(SOURCE, "script.txt")
+    parser.parse()
+    index = SOURCE.index("var total")
+    parser.edit(index, index, '"')
+    assert_same_as_full_parse(parser)
+    parser.edit(len(parser.text), len(parser.text), "x;")
+    assert_same_as_full_parse(parser)
+    parser.edit(index, index + 1, "")
+    assert_same_as_full_parse(parser)
+    assert parser.damaged is None
+
+
+def test_incremental_batched_edits():
+    parser = IncrementalParser(SOURCE, "script.txt")
+    parser.parse()
+    parser.edit(0, 0, "var first = 1;\n")
+    parser.edit(len(parser.text), len(parser.text), "var last = 2;\n")
+    assert_same_as_full_parse(parser)
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_incremental_random_edits(seed):
+    generator = random.Random(seed)
+    parser = IncrementalParser(SOURCE, "script.txt")
+    parser.parse()
+    for _ in range(30):
+        start = generator.randint(0, len(parser.text))
+        end = min(len(parser.text), start + generator.choice([0, 0, 1, 5]))
+        text = generator.choice(SNIPPETS + [""])
+        removed = parser.text[start:end]
+        parser.edit(start, end, text)
+        if generator.random() < 0.8:
+            assert_same_as_full_parse(parser)
+        # Most of the broken edits are undone, so that the edits are
+        # applied to valid programs as well
+        if full_parse(parser.text)[1] and generator.random() < 0.8:
+            parser.edit(start, start + len(text), removed)
+            if generator.random() < 0.8:
+                assert_same_as_full_parse(parser)
+    assert_same_as_full_parse(parser)
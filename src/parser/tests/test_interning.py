@@ -0,0 +1,117 @@
+import pytest
+
+from lexer.lexers import RegexLexer
+from lexer.streams import Position
+
+from parser.parser import Parser
+from parser.models import LiteralExpr, IdentifierExpr
+from parser.interning import NodeTable, share_nodes
+
+
+SOURCE = """var a = 1;
+print(a + 1, a * 1.0, -1, (not nil), -(-(1)), a - "1");
+fn f(b) { return b + 1 + true; }
+print(f(a), f(-a), "" + "");
+"""
+
+
+def parse(text: str):
+    return Parser(RegexLexer(text, "script.txt")).parse()
+
+
+def call_arguments(program, index: int) -> list:
+    return program.statements[index].arguments
+
+
+def test_shared_program_is_equal():
+    program = parse(SOURCE)
+    positions = share_nodes(program)
+    assert program == parse(SOURCE)
+    assert len(positions) == 20
+
+
+def test_equal_leaves_are_shared():
+    program = parse(SOURCE)
+    share_nodes(program)
+    first = call_arguments(program, 1)
+    last = call_arguments(program, 3)
+    assert first[0].left is first[1].left is last[0].arguments[0]
+    assert first[0].right is first[4].right.expression.right.expression
+    assert first[2] is not first[0].right
+    assert first[0].right.offset is None
+    assert last[2].left is last[2].right
+
+
+@pytest.mark.parametrize("value, other", [
+    (1, 1.0), (1, True), (0, False), (0, None), ("1", 1),
+])
+def test_different_types_are_not_shared(value, other):
+    nodes = NodeTable()
+    assert nodes.intern(LiteralExpr(value), []) is not nodes.intern(
+        LiteralExpr(other), []
+    )
+
+
+@pytest.mark.parametrize("text, shared", [
+    ("print(-1);", True),
+    ("print(-(-1.5));", True),
+    ("print((not nil));", True),
+    ("print(not a);", False),
+    ('print(-"1");', False),
+    ("print(-true);", False),
+    ("print((a));", False),
+    ("print((1 + 2));", False),
+])
+def test_constant_subtrees_are_shared(text, shared):
+    program = parse(text)
+    share_nodes(program)
+    assert (call_arguments(program, 0)[0].offset is None) == shared
+
+
+def test_statement_children_are_not_shared():
+    program = parse("var a = 1; var b = a; return a;")
+    positions = share_nodes(program)
+    assert len(positions) == 0
+    assert program.statements[1].expression.offset is not None
+
+
+def test_nodes_are_shared_between_programs():
+    nodes = NodeTable()
+    first, second = parse("print(x);"), parse("print(x);")
+    share_nodes(first, nodes)
+    share_nodes(second, nodes)
+    assert len(nodes) == 2
+    assert (
+        call_arguments(first, 0)[0] is call_arguments(second, 0)[0]
+        is nodes.nodes[IdentifierExpr, "x"]
+    )
+
+
+def test_lazy_bodies_are_not_shared():
+    program = Parser(
+        RegexLexer("fn f() { print(1); }"),
+        lazy_functions=True
+    ).parse()
+    assert len(share_nodes(program)) == 0
+    assert program.statements[0].block.statements[0].arguments[0].offset == 15
+
+
+def test_positions_of_shared_nodes():
+    program = parse(SOURCE)
+    positions = share_nodes(program)
+    first = call_arguments(program, 1)
+    assert positions.get(first[0], 0) == Position(2, 7, 17, "script.txt")
+    assert positions.get(first[0], 1) == Position(2, 11, 21, "script.txt")
+    assert positions.find(first[1], first[0].left) == (
+        Position(2, 14, 24, "script.txt")
+    )
+    assert positions.get(first[0], 2) is None
+    assert positions.find(first[0], first[1].right) is None
+
+
+def test_shared_twice():
+    program = parse(SOURCE)
+    share_nodes(program)
+    positions = share_nodes(program)
+    assert program == parse(SOURCE)
+    assert positions.get(call_arguments(program, 1)[0], 0) is None
@@ -0,0 +1,94 @@
+import pytest
+
+from lexer.lexers import Lexer, RegexLexer
+from lexer.streams import Position, TextStream
+from lexer.exceptions import LexerError, InvalidEscapeSequenceError
+
+from parser.parser import Parser
+from parser.models import BlockStmt, LazyBlock
+from parser.exceptions import (
+    ParserError,
+    MissingRightBraceError,
+    MissingVariableNameError
+)
+
+
+SOURCE = """// ł€ helpers
+fn outer(a, const b) {
+    fn inner(c) { return "}" + c; } // }
+    if (a) { return inner(b); } else { return "{"; }
+}
+fn empty() {}
+print(outer(1, 2));
+"""
+
+
+def parse(text: str, lazy_functions: bool = False):
+    return Parser(RegexLexer(text), lazy_functions=lazy_functions).parse()
+
+
+def parse_error(parse) -> tuple:
+    with pytest.raises((LexerError, ParserError)) as e:
+        parse()
+    return type(e.value), e.value.position
+
+
+def test_lazy_functions_same_program():
+    program = parse(SOURCE, lazy_functions=True)
+    outer = program.statements[0]
+    assert isinstance(outer.block, LazyBlock)
+    assert program == parse(SOURCE)
+    assert isinstance(outer.block.statements[0].block, LazyBlock)
+
+
+def test_lazy_body_is_parsed_on_first_use():
+    program = parse(SOURCE, lazy_functions=True)
+    block = program.statements[0].block
+    assert block._statements is None
+    statements = block.statements
+    assert block.statements is statements
+    assert block.lexer is None
+
+
+def test_lazy_body_span():
+    program = parse(SOURCE, lazy_functions=True)
+    start = SOURCE.encode().index(b"{")
+    end = SOURCE.encode().index(b"}\nfn empty") + 1
+    assert program.statements[0].block.span == (start, end)
+    assert program.statements[0].block.position == Position(2, 22, start)
+
+
+@pytest.mark.parametrize("body, error", [
+    ("var;", MissingVariableNameError),
+    ('print("\\q");', InvalidEscapeSequenceError),
+    ("a; )", MissingRightBraceError),
+])
+def test_lazy_body_error_is_deferred(body, error):
+    text = SOURCE + "fn broken() {\n    " + body + "\n}\n"
+    program = parse(text, lazy_functions=True)
+    eager_error = parse_error(lambda: parse(text))
+    assert eager_error[0] == error
+    assert parse_error(lambda: program.statements[-1].block.statements) == (
+        eager_error
+    )
+    # The body can be parsed again
+    assert parse_error(lambda: program.statements[-1].block.statements) == (
+        eager_error
+    )
+
+
+@pytest.mark.parametrize("text", [
+    "fn f() { a; ",
+    'fn f() { "}" ',
+    "fn f() { // }",
+])
+def test_unclosed_lazy_body_is_parsed_right_away(text):
+    assert parse_error(lambda: parse(text, lazy_functions=True)) == (
+        parse_error(lambda: parse(text))
+    )
+
+
+def test_lazy_functions_need_a_skipping_lexer():
+    parser = Parser(Lexer(TextStream(SOURCE)), lazy_functions=True)
+    block = parser.parse().statements[0].block
+    assert type(block) is BlockStmt
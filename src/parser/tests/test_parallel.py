@@ -0,0 +1,99 @@
+import pytest
+
+from lexer.lexers import RegexLexer
+from lexer.exceptions import LexerError
+
+from parser.parser import Parser
+from parser.exceptions import ParserError
+from parser.parallel import parse_parallel, find_boundaries
+from parser.tests.test_incremental import positions
+from parser.tests.test_serialization import dump
+
+
+STATEMENTS = [
+    "// ł€ helpers\nfn add(a, const b) {\n    return a + b;\n}\n",
+    'var text = "; } ł";\n',
+    "if (a) print(1); // }\n else { print(2); }\n",
+    "while (a < 10) { a = a + 1; }\n",
+    "match (a) {\n    (Num and >0 as x): print(x);\n    (_): print(0);\n}\n",
+    "print(add(1, (2)));\n",
+]
+SOURCE = "".join(STATEMENTS * 5) + "// trailing comment\n"
+DEPTH = 5000
+
+
+def parse(text: str):
+    return Parser(RegexLexer(text, "script.txt")).parse()
+
+
+def parse_or_error(parse) -> tuple:
+    try:
+        program = parse()
+    except (LexerError, ParserError) as e:
+        return None, (type(e), str(e), e.position)
+    return program, None
+
+
+@pytest.mark.parametrize("text", [
+    SOURCE,
+    "",
+    "// only comment",
+    "a;",
+])
+def test_parallel_same_as_sequential(text):
+    program = parse_parallel(
+        text,
+        "script.txt",
+        workers=2,
+        chunks_per_worker=8
+    )
+    expected = parse(text)
+    assert program == expected
+    assert positions(program) == positions(expected)
+
+
+@pytest.mark.parametrize("error_text", [
+    "var;",
+    "print(1) print(2);",
+    "@",
+    '"unterminated',
+    "}",
+    "else print(1);",
+    "if (a) { b; ",
+])
+def test_parallel_errors_same_as_sequential(error_text):
+    # Errors both in the middle of the source and before a later one
+    index = len(SOURCE) // 2
+    text = SOURCE[:index] + error_text + SOURCE[index:] + error_text
+    assert parse_or_error(
+        lambda: parse_parallel(text, "script.txt", 2, chunks_per_worker=8)
+    ) == parse_or_error(lambda: parse(text))
+
+
+def test_parallel_deep_statements():
+    text = ("print(" + "(" * DEPTH + "1" + ")" * DEPTH + ");\n") * 4
+    program = parse_parallel(text, "script.txt", 2, chunks_per_worker=2)
+    assert dump(program) == dump(parse(text))
+
+
+def test_parallel_raises_other_errors(monkeypatch):
+    # Only syntax errors make the text be parsed again sequentially
+    def parse_eof(self):
+        raise ValueError("bug")
+
+    monkeypatch.setattr(Parser, "parse_eof", parse_eof)
+    with pytest.raises(ValueError, match="bug"):
+        parse_parallel(SOURCE, "script.txt", workers=1)
+
+
+@pytest.mark.parametrize("text, boundaries", [
+    ("a; b; c;", [2, 5, 8]),
+    ("a; b; c; // end", [2, 5, 8, 15]),
+    ("fn f() { a; } b;", [13, 16]),
+    ("if (a) b; else c; d;", [17, 20]),
+    ("if (a) {} // comment\n else {} d;", [29, 32]),
+    ('print("; }"); f(g(); h;', [13, 23]),
+    ("// a; }\n a;", [11]),
+])
+def test_find_boundaries(text, boundaries):
+    assert find_boundaries(text, 1) == boundaries
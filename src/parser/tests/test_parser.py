@@ -6,6 +6,8 @@ from lexer.tokens import TokenType
 from parser.parser import Parser
 from parser.tests.utils import create_parser, test_text_raises_error
 
+from lexer.streams import Position
+
 from parser.models import (
     Expr,
     AssignmentExpr,
@@ -229,6 +231,68 @@ def test_binary_success(
     assert binary.right == right
 
 
+def _ident(name: str) -> IdentifierExpr:
+    return IdentifierExpr(name)
+
+
+@pytest.mark.parametrize('text, expected', (
+    ("a - b - c", BinaryExpr(
+        BinaryExpr(_ident("a"), TokenType.MINUS, _ident("b")),
+        TokenType.MINUS,
+        _ident("c")
+    )),
+    ("a + b * c - d", BinaryExpr(
+        BinaryExpr(
+            _ident("a"),
+            TokenType.PLUS,
+            BinaryExpr(_ident("b"), TokenType.STAR, _ident("c"))
+        ),
+        TokenType.MINUS,
+        _ident("d")
+    )),
+    ("a < b == c < d", BinaryExpr(
+        BinaryExpr(_ident("a"), TokenType.LESS, _ident("b")),
+        TokenType.EQUAL_EQUAL,
+        BinaryExpr(_ident("c"), TokenType.LESS, _ident("d"))
+    )),
+    ("a or b and not c == d", LogicalExpr(
+        _ident("a"),
+        TokenType.OR,
+        LogicalExpr(
+            _ident("b"),
+            TokenType.AND,
+            BinaryExpr(
+                UnaryExpr(TokenType.NOT, _ident("c")),
+                TokenType.EQUAL_EQUAL,
+                _ident("d")
+            )
+        )
+    )),
+    ("x = a / -b", AssignmentExpr(
+        "x",
+        BinaryExpr(
+            _ident("a"),
+            TokenType.SLASH,
+            UnaryExpr(TokenType.MINUS, _ident("b"))
+        )
+    )),
+))
+def test_binary_precedence(text: str, expected: Expr):
+    program = create_parser(text + ";").parse()
+    assert program.statements == [expected]
+
+
+@pytest.mark.parametrize('text, position', (
+    ("a < b < c;", Position(1, 7, 6)),
+    ("x == a < b < c;", Position(1, 12, 11)),
+    ("a + b <= c * d > e;", Position(1, 16, 15)),
+))
+def test_comparison_is_not_chained(text: str, position: Position):
+    with pytest.raises(MissingSemicolonError) as error:
+        create_parser(text).parse()
+    assert error.value.position == position
+
+
 @pytest.mark.parametrize('text', (
     '"7.5"*', '"string"/', "2+", '"7.5"-', '"greater">',
     '5<', '15>=', '15<=', '-5==', '00.100!='
@@ -728,3 +792,104 @@ def test_match_success(
 ))
 def test_match_error(text: str, error: type[ParserError]):
     test_text_raises_error(text, error)
+
+
+@pytest.mark.parametrize("text, error, position", (
+    ('var a = 1;\nvar b = 2\nprint(b);', MissingSemicolonError,
+     Position(3, 1, 21)),
+    ('fn f(a, a) {}', DuplicateParametersError, Position(1, 10, 9)),
+    ('if (true) {\n  print(1);\n', MissingRightBraceError,
+     Position(3, 1, 24)),
+    ('match (1) {\n  (1 as x, 2 as x): print(1);\n}',
+     DuplicatePatternNamesError, Position(2, 18, 29)),
+    ('var a = "€ł";\nvar b = ;', MissingExpressionError,
+     Position(2, 9, 25)),
+))
+def test_error_position(text: str, error: type[ParserError], position):
+    parser = create_parser(text)
+    with pytest.raises(error) as e:
+        parser.parse()
+    assert e.value.position == position
+
+
+def test_node_position():
+    program = create_parser('var a = "€";\n  print(a + 1);').parse()
+    call = program.statements[1]
+    assert program.statements[0].position == Position(1, 1, 0)
+    assert call.position == Position(2, 3, 17)
+    assert call.arguments[0].position == Position(2, 11, 25)
+    assert call.arguments[0].left.position == Position(2, 9, 23)
+
+
+def test_peek():
+    parser = create_parser("a // comment\n = // comment\n 5;")
+    assert parser.peek().type == TokenType.EQUAL
+    assert parser.peek(2).type == TokenType.NUMBER
+    assert parser.current_token.type == TokenType.IDENTIFIER
+    parser.next_token()
+    assert parser.current_token.type == TokenType.EQUAL
+    assert parser.peek(2).type == TokenType.SEMICOLON
+    assert parser.peek(3).type == TokenType.EOF
+
+
+def test_failed_match_does_not_resolve_position():
+    class Unresolvable:
+        def resolve(self, offset):
+            raise AssertionError("Position should not be resolved")
+
+    parser = create_parser("var a = b;")
+    for token in [parser.current_token, parser.peek(), parser.peek(2)]:
+        token.source = Unresolvable()
+    assert parser.try_consume(TokenType.CONST) is None
+    assert parser.try_consume(TokenType.VAR)
+    assert parser.consume(TokenType.IDENTIFIER, ParserError).value == "a"
+
+
+DEPTH = 5000
+
+
+@pytest.mark.parametrize("text", [
+    "print(" + "(" * DEPTH + "1" + ")" * DEPTH + ");",
+    "f(" * DEPTH + ")" * DEPTH + ";",
+    "f" + "()" * DEPTH + ";",
+    "a = " + "-(" * DEPTH + "1" + ")" * DEPTH + ";",
+    "1" + " + (1" * DEPTH + ")" * DEPTH + ";",
+    "while (a) {" * DEPTH + "}" * DEPTH,
+    "if (a) " * DEPTH + "b;",
+    "match (a) { (" + "(" * DEPTH + "1" + ")" * DEPTH + "): b; }",
+    "// comment\n" * DEPTH + "a;",
+], ids=[
+    "groupings", "calls", "call_chain", "unary", "binary", "blocks", "ifs",
+    "patterns", "comments"
+])
+def test_deep_nesting(text):
+    program = create_parser(text).parse()
+    assert len(program.statements) == 1
+
+
+def test_deep_nesting_error():
+    text = "print(" + "(" * DEPTH + "1" + ")" * (DEPTH - 1) + ";"
+    with pytest.raises(MissingRightParenthesisError) as e:
+        create_parser(text).parse()
+    assert e.value.position == Position(1, len(text), len(text) - 1)
+
+
+def test_nodes_have_no_instance_dict():
+    # Nodes keep their fields in slots to be small, so a big program takes
+    # less memory
+    program = create_parser(
+        "fn f(const a) { return -a; }"
+        "var b = f(1) + (2 * 3) or true;"
+        "if (b) while (b) b = nil; else {}"
+        "match (b) { (>1 and Num as x) if (x): print(x); }"
+    ).parse()
+    nodes = list(program.statements)
+    while nodes:
+        node = nodes.pop()
+        assert not hasattr(node, "__dict__"), type(node).__name__
+        for value in node.__getstate__():
+            if isinstance(value, Stmt):
+                nodes.append(value)
+            elif isinstance(value, list):
+                nodes.extend(value)
+    assert not hasattr(program, "__dict__")
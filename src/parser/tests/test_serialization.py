@@ -0,0 +1,150 @@
+import io
+
+import pytest
+
+from lexer.lexers import RegexLexer
+from lexer.streams import Position
+
+from parser.parser import Parser
+from parser.models import BlockStmt
+from parser.serialization import (
+    SerializationError,
+    write_json_lines,
+    read_json_lines,
+    write_binary,
+    read_binary
+)
+
+
+SOURCE = """// ł€ header
+fn add(a, const b) { return a + -b * (2.5 - 1); }
+var text = "ł\\t\\"quoted\\"";
+const answer = 100000000000000000000000;
+if (not (answer >= 1) or false) print(nil); else { print(text); }
+while (answer < 0) answer = answer + 1;
+match (add(1, -2), text) {
+    (Num and >0 as x, _) if (x != 3): print(x);
+    (<=-1 or Bool, Str as y): return y;
+    (_, _): {}
+}
+print(add(1, 2), true, "");
+"""
+DEPTH = 5000
+
+
+def parse(text: str, lazy_functions: bool = False):
+    return Parser(
+        RegexLexer(text, "script.txt"),
+        lazy_functions=lazy_functions
+    ).parse()
+
+
+def write_and_read(program, binary: bool, source=None):
+    if binary:
+        file = io.BytesIO()
+        write_binary(program, file)
+        file.seek(0)
+        return read_binary(file, source)
+    file = io.StringIO()
+    write_json_lines(program, file)
+    file.seek(0)
+    return read_json_lines(file, source)
+
+
+def dump(program) -> str:
+    file = io.StringIO()
+    write_json_lines(program, file)
+    return file.getvalue()
+
+
+@pytest.mark.parametrize("binary", [False, True], ids=["json", "binary"])
+@pytest.mark.parametrize("text", [SOURCE, "", "print(1);"])
+def test_same_program(text, binary):
+    program = parse(text)
+    source = program.statements[0].source if program.statements else None
+    loaded = write_and_read(program, binary, source)
+    assert loaded == program
+    assert dump(loaded) == dump(program)
+    assert [statement.position for statement in loaded.statements] == [
+        statement.position for statement in program.statements
+    ]
+
+
+def test_positions():
+    program = parse(SOURCE)
+    loaded = write_and_read(program, True, program.statements[0].source)
+    assert loaded.statements[-1].arguments[1].position == Position(
+        12, 18, 391, "script.txt"
+    )
+    assert write_and_read(program, True).statements[0].offset == 16
+
+
+@pytest.mark.parametrize("binary", [False, True], ids=["json", "binary"])
+def test_lazy_bodies_are_written_as_blocks(binary):
+    loaded = write_and_read(parse(SOURCE, lazy_functions=True), binary)
+    assert type(loaded.statements[0].block) is BlockStmt
+    assert loaded == parse(SOURCE)
+
+
+def test_lazy_bodies_are_written_as_spans():
+    program = parse(SOURCE, lazy_functions=True)
+    block = program.statements[0].block
+    file = io.BytesIO()
+    write_binary(program, file, lazy_blocks=True)
+    file.seek(0)
+    spans = []
+
+    def open_block(offset, end_offset):
+        spans.append((offset, end_offset))
+        return block
+
+    loaded = read_binary(file, open_block=open_block)
+    assert spans == [block.span]
+    assert loaded.statements[0].block is block
+    assert loaded == parse(SOURCE)
+
+
+def test_json_lines():
+    lines = dump(parse("var a = -1;")).splitlines()
+    assert lines == [
+        '{"node": "Program", "statements": 1}',
+        '{"node": "VariableStmt", "offset": 0, "name": "a", "expression": 1,'
+        ' "is_const": false}',
+        '{"node": "UnaryExpr", "offset": 8, "operator": "MINUS", "right": 1}',
+        '{"node": "LiteralExpr", "offset": 9, "value": 1}',
+    ]
+
+
+@pytest.mark.parametrize("binary", [False, True], ids=["json", "binary"])
+@pytest.mark.parametrize("text", [
+    "print(" + "(" * DEPTH + "1" + ")" * DEPTH + ");",
+    "while (a) {" * DEPTH + "}" * DEPTH,
+    "a;" * DEPTH,
+], ids=["groupings", "blocks", "statements"])
+def test_deep_and_wide_programs(text, binary):
+    program = parse(text)
+    assert dump(write_and_read(program, binary)) == dump(program)
+
+
+@pytest.mark.parametrize("data", [
+    b"",
+    b"ASTX\x01\x00",
+    b"ASTB\x01\x00",
+    b"ASTB\x01\x00\xff\x00",
+    b"ASTB\x01\x00\x10\x00\x02",
+    b"ASTB\x01\x00\x10\x00\x01\x0b\x01\x09",
+])
+def test_invalid_binary(data):
+    with pytest.raises(SerializationError):
+        read_binary(io.BytesIO(data))
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    '{"node": "Unknown"}',
+    '{"node": "Program", "statements": 2}\n'
+    '{"node": "LiteralExpr", "offset": 0, "value": 1}',
+])
+def test_invalid_json_lines(text):
+    with pytest.raises(SerializationError):
+        read_json_lines(io.StringIO(text))
@@ -0,0 +1,2 @@
+# Version of the interpreter, a part of the keys of cached programs
+__version__ = "0.1.0"